@@ -0,0 +1,124 @@
+"""
+In-process cache for serialized JSON responses
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Optional, Union
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+from app.metrics import timed
+from app.worker_pool import WorkerPool
+
+
+@dataclass
+class CachedResponse:
+    """Serialized response body with its ETag and the catalog version it reflects"""
+
+    body: bytes
+    etag: str
+    version: int
+    expires_at: float
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with a TTL for serialized response bodies
+
+    Entries remember the catalog version they were built from; an entry
+    whose version no longer matches is treated as a miss and dropped.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, version: int) -> Optional[CachedResponse]:
+        """Get a fresh entry for `key` built from catalog `version`"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.version != version or entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: Hashable, version: int, body: bytes) -> CachedResponse:
+        """Store a serialized body, evicting the least recently used entries"""
+        entry = CachedResponse(
+            body=body,
+            etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+            version=version,
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Get hit/miss/eviction counters and the current size"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+async def cached_json_response(
+    request: Request,
+    cache: ResponseCache,
+    key: Hashable,
+    version: int,
+    build: Callable[[], Union[BaseModel, bytes]],
+    pool: WorkerPool,
+) -> Response:
+    """Serve `build()` as JSON through the cache, honouring If-None-Match
+
+    `build` returns a model or an already encoded body. It is only called
+    on a cache miss, and runs with its serialization on the worker pool.
+    """
+
+    def serialize() -> bytes:
+        built = build()
+        if isinstance(built, bytes):
+            return built
+        with timed("model_dump_json", "encode"):
+            return built.model_dump_json().encode()
+
+    entry = cache.get(key, version)
+    if entry is None:
+        body = await pool.run(serialize)
+        entry = cache.set(key, version, body)
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and entry.etag in (
+        tag.strip() for tag in if_none_match.split(",")
+    ):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
@@ -23,8 +23,64 @@ class Settings(BaseSettings):
         "http://localhost:3000,http://localhost:5173,http://localhost:8000,http://127.0.0.1:3000,http://127.0.0.1:5173,http://127.0.0.1:8000",
     ).split(",")
 
-    # Database Settings (for future use)
+    # Database Settings
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./playlist_generator.db")
+    DATABASE_POOL_SIZE: int = os.getenv("DATABASE_POOL_SIZE", 5)
+
+    # Response Cache Settings
+    RESPONSE_CACHE_MAX_ENTRIES: int = os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1024)
+    RESPONSE_CACHE_TTL_SECONDS: float = os.getenv("RESPONSE_CACHE_TTL_SECONDS", 60)
+
+    # Similarity Index Settings
+    SIMILARITY_INDEX_PATH: str = os.getenv(
+        "SIMILARITY_INDEX_PATH", "./song_similarity_index.npz"
+    )
+    SIMILARITY_NLIST: int = os.getenv("SIMILARITY_NLIST", 256)
+    SIMILARITY_NPROBE: int = os.getenv("SIMILARITY_NPROBE", 8)
+
+    # Worker Pool Settings (0 workers runs heavy calls on the event loop)
+    WORKER_POOL_SIZE: int = os.getenv("WORKER_POOL_SIZE", 4)
+    WORKER_POOL_QUEUE_SIZE: int = os.getenv("WORKER_POOL_QUEUE_SIZE", 64)
+
+    # Metrics Settings: every request is counted; latency, response size and
+    # the service/encode split are recorded for this fraction of requests
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", True)
+    METRICS_SAMPLE_RATE: float = os.getenv("METRICS_SAMPLE_RATE", 0.01)
+
+    # Deployment Settings: "standalone" runs everything in one process; the
+    # multi-worker mode started by `python run.py --workers N` runs one
+    # "writer" process and N "reader" workers sharing its published catalog
+    CATALOG_ROLE: str = os.getenv("CATALOG_ROLE", "standalone")
+    CATALOG_SHARED_DIR: str = os.getenv(
+        "CATALOG_SHARED_DIR",
+        "/dev/shm/playlist-generator" if os.path.isdir("/dev/shm") else "./catalog",
+    )
+    CATALOG_WRITER_URL: str = os.getenv("CATALOG_WRITER_URL", "http://127.0.0.1:8001")
+    CATALOG_PUBLISH_INTERVAL_MS: int = os.getenv("CATALOG_PUBLISH_INTERVAL_MS", 200)
+    # Saved by the writer on shutdown so readers can serve at once on the next
+    # start; empty disables it
+    CATALOG_SNAPSHOT_PATH: str = os.getenv(
+        "CATALOG_SNAPSHOT_PATH", "./catalog_snapshot.bin"
+    )
+
+    # Change Log Settings: every write is appended to a segmented log served
+    # by /api/v1/changes; segments a checkpoint snapshot (saved to
+    # CATALOG_SNAPSHOT_PATH) covers are compacted away beyond the newest
+    # CHANGE_LOG_RETAIN_SEGMENTS. An empty directory disables the log
+    CHANGE_LOG_DIR: str = os.getenv("CHANGE_LOG_DIR", "./changes")
+    CHANGE_LOG_SEGMENT_MB: int = os.getenv("CHANGE_LOG_SEGMENT_MB", 16)
+    CHANGE_LOG_RETAIN_SEGMENTS: int = os.getenv("CHANGE_LOG_RETAIN_SEGMENTS", 4)
+    CHANGE_LOG_CHECKPOINT_INTERVAL_S: float = os.getenv(
+        "CHANGE_LOG_CHECKPOINT_INTERVAL_S", 60
+    )
+    CHANGE_LOG_FSYNC: bool = os.getenv("CHANGE_LOG_FSYNC", False)
+    # Rebuild the database from the snapshot plus the log on startup
+    CHANGE_LOG_REPLAY: bool = os.getenv("CHANGE_LOG_REPLAY", False)
+
+    # Playlist Generator Settings
+    PLAYLIST_GENERATOR_TIME_BUDGET_MS: int = os.getenv(
+        "PLAYLIST_GENERATOR_TIME_BUDGET_MS", 250
+    )
 
     # Security Settings
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
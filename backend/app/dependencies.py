@@ -0,0 +1,192 @@
+"""
+Shared service dependencies
+
+All routers read from one process-wide PlaylistService so that categories
+and recommendations see playlists created through the API. Reader workers
+in the multi-worker mode read a SharedCatalog published by the writer
+process instead.
+
+The cached builders create each singleton on first use; the get_* route
+dependencies are async so FastAPI returns them on the event loop instead
+of hopping to its threadpool for every dependency of every request.
+"""
+
+from functools import lru_cache
+from typing import Optional, Union
+from app.cache import ResponseCache
+from app.config import settings
+from app.repositories.sqlite_repository import SQLitePlaylistRepository
+from app.services.catalog_publisher import CatalogPublisher, LogCheckpointer
+from app.services.change_log import ChangeLog, replay_catalog
+from app.services.playlist_generator import PlaylistGenerator
+from app.services.playlist_service import PlaylistService
+from app.services.category_service import CategoryService
+from app.services.category_stats_service import CategoryStatsService
+from app.services.cooccurrence_service import CooccurrenceService
+from app.services.recommendation_service import RecommendationService
+from app.services.search_service import SearchService
+from app.services.shared_catalog import SharedCatalog
+from app.services.similarity_service import SimilarityService
+from app.worker_pool import WorkerPool
+from app.writer_proxy import WriterProxy
+
+
+@lru_cache
+def playlist_repository() -> SQLitePlaylistRepository:
+    """Get the persistent repository configured by DATABASE_URL"""
+    return SQLitePlaylistRepository(settings.DATABASE_URL, settings.DATABASE_POOL_SIZE)
+
+
+@lru_cache
+def change_log() -> Optional[ChangeLog]:
+    """Get the writer's change log, or None when CHANGE_LOG_DIR is empty"""
+    if not settings.CHANGE_LOG_DIR or settings.CATALOG_ROLE == "reader":
+        return None
+    return ChangeLog(
+        settings.CHANGE_LOG_DIR,
+        settings.CHANGE_LOG_SEGMENT_MB * 2**20,
+        settings.CHANGE_LOG_RETAIN_SEGMENTS,
+        fsync=settings.CHANGE_LOG_FSYNC,
+    )
+
+
+@lru_cache
+def playlist_service() -> Union[PlaylistService, SharedCatalog]:
+    """Get the shared playlist catalog"""
+    if settings.CATALOG_ROLE == "reader":
+        return SharedCatalog(settings.CATALOG_SHARED_DIR)
+    if settings.CHANGE_LOG_REPLAY and change_log() is not None:
+        playlist_repository().replace_playlists(
+            replay_catalog(settings.CATALOG_SNAPSHOT_PATH, change_log())
+        )
+    return PlaylistService(playlist_repository(), change_log())
+
+
+@lru_cache
+def log_checkpointer() -> LogCheckpointer:
+    """Get the checkpointer that lets the change log be compacted"""
+    return LogCheckpointer(
+        playlist_service(),
+        change_log(),
+        settings.CATALOG_SNAPSHOT_PATH,
+        settings.CHANGE_LOG_CHECKPOINT_INTERVAL_S,
+    )
+
+
+@lru_cache
+def catalog_publisher() -> CatalogPublisher:
+    """Get the publisher that shares the writer's catalog with reader workers"""
+    return CatalogPublisher(
+        playlist_service(),
+        settings.CATALOG_SHARED_DIR,
+        settings.CATALOG_PUBLISH_INTERVAL_MS / 1000,
+    )
+
+
+@lru_cache
+def writer_proxy() -> WriterProxy:
+    """Get the client reader workers use to forward requests to the writer"""
+    return WriterProxy(settings.CATALOG_WRITER_URL)
+
+
+@lru_cache
+def playlist_generator() -> PlaylistGenerator:
+    """Get the playlist generator backed by the shared catalog"""
+    return PlaylistGenerator(
+        playlist_service(), settings.PLAYLIST_GENERATOR_TIME_BUDGET_MS / 1000
+    )
+
+
+@lru_cache
+def category_service() -> CategoryService:
+    """Get the category service backed by the shared catalog"""
+    return CategoryService(playlist_service())
+
+
+@lru_cache
+def category_stats_service() -> CategoryStatsService:
+    """Get the per-genre aggregates kept in sync with the shared catalog"""
+    return CategoryStatsService(playlist_service())
+
+
+@lru_cache
+def cooccurrence_service() -> CooccurrenceService:
+    """Get the playlist co-occurrence counts kept in sync with the shared catalog"""
+    return CooccurrenceService(playlist_service())
+
+
+@lru_cache
+def recommendation_service() -> RecommendationService:
+    """Get the recommendation service backed by the shared catalog"""
+    return RecommendationService(playlist_service(), cooccurrence_service())
+
+
+@lru_cache
+def response_cache() -> ResponseCache:
+    """Get the process-wide cache for serialized category/recommendation responses"""
+    return ResponseCache(
+        settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL_SECONDS
+    )
+
+
+@lru_cache
+def worker_pool() -> WorkerPool:
+    """Get the process-wide pool that runs CPU-heavy service calls"""
+    return WorkerPool(settings.WORKER_POOL_SIZE, settings.WORKER_POOL_QUEUE_SIZE)
+
+
+@lru_cache
+def similarity_service() -> SimilarityService:
+    """Get the song similarity index kept in sync with the shared catalog"""
+    return SimilarityService(
+        playlist_service(),
+        settings.SIMILARITY_INDEX_PATH,
+        settings.SIMILARITY_NLIST,
+        settings.SIMILARITY_NPROBE,
+    )
+
+
+@lru_cache
+def search_service() -> SearchService:
+    """Get the song search index kept in sync with the shared catalog"""
+    return SearchService(playlist_service())
+
+
+async def get_playlist_service() -> Union[PlaylistService, SharedCatalog]:
+    return playlist_service()
+
+
+async def get_change_log() -> Optional[ChangeLog]:
+    return change_log()
+
+
+async def get_playlist_generator() -> PlaylistGenerator:
+    return playlist_generator()
+
+
+async def get_category_service() -> CategoryService:
+    return category_service()
+
+
+async def get_category_stats_service() -> CategoryStatsService:
+    return category_stats_service()
+
+
+async def get_recommendation_service() -> RecommendationService:
+    return recommendation_service()
+
+
+async def get_response_cache() -> ResponseCache:
+    return response_cache()
+
+
+async def get_worker_pool() -> WorkerPool:
+    return worker_pool()
+
+
+async def get_similarity_service() -> SimilarityService:
+    return similarity_service()
+
+
+async def get_search_service() -> SearchService:
+    return search_service()
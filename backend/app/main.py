@@ -2,17 +2,88 @@
 Main FastAPI application entry point
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.routers import playlists, categories, recommendations
+from app.dependencies import (
+    catalog_publisher,
+    category_stats_service,
+    change_log,
+    cooccurrence_service,
+    log_checkpointer,
+    playlist_repository,
+    playlist_service,
+    response_cache,
+    search_service,
+    similarity_service,
+    worker_pool,
+    writer_proxy,
+)
+from app.metrics import PROMETHEUS_MEDIA_TYPE, REGISTRY, MetricsMiddleware
+from app.routers import (
+    playlists,
+    categories,
+    category_stats,
+    changes,
+    recommendations,
+    search,
+)
+from app.services.catalog_publisher import save_snapshot
+from app.writer_proxy import WriterProxyMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the catalog before serving; checkpoint it, save the index and release the database on shutdown"""
+    if settings.CATALOG_ROLE == "reader":
+        # Attach to the writer's published catalog; it owns everything else
+        playlist_service()
+        yield
+        worker_pool().shutdown()
+        await writer_proxy().aclose()
+        return
+
+    playlist_service()
+    similarity_service()
+    cooccurrence_service()
+    search_service()
+    category_stats_service()
+    if settings.CATALOG_ROLE == "writer":
+        catalog_publisher().start()
+    checkpointing = change_log() is not None and settings.CATALOG_SNAPSHOT_PATH
+    if checkpointing:
+        log_checkpointer().start()
+    yield
+    if settings.CATALOG_ROLE == "writer":
+        catalog_publisher().stop()
+    if checkpointing:
+        log_checkpointer().stop()
+        log_checkpointer().checkpoint()
+    elif settings.CATALOG_ROLE == "writer" and settings.CATALOG_SNAPSHOT_PATH:
+        save_snapshot(playlist_service(), settings.CATALOG_SNAPSHOT_PATH)
+    if change_log() is not None:
+        change_log().close()
+    worker_pool().shutdown()
+    similarity_service().save()
+    playlist_repository().close()
+
 
 app = FastAPI(
     title="Playlist Generator API",
     description="API for generating and managing playlists",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+# Inside the writer proxy, so each request is measured by the process that serves it
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, sample_rate=settings.METRICS_SAMPLE_RATE)
+
+if settings.CATALOG_ROLE == "reader":
+    app.add_middleware(WriterProxyMiddleware, proxy=writer_proxy())
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -25,9 +96,14 @@ app.add_middleware(
 # Include routers
 app.include_router(playlists.router, prefix="/api/v1/playlists", tags=["playlists"])
 app.include_router(categories.router, prefix="/api/v1/categories", tags=["categories"])
+app.include_router(
+    category_stats.router, prefix="/api/v1/category-stats", tags=["categories"]
+)
 app.include_router(
     recommendations.router, prefix="/api/v1/recommendations", tags=["recommendations"]
 )
+app.include_router(search.router, prefix="/api/v1/search", tags=["search"])
+app.include_router(changes.router, prefix="/api/v1/changes", tags=["changes"])
 
 
 @app.get("/")
@@ -44,3 +120,60 @@ async def root():
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Response cache hit/miss/eviction counters"""
+    return response_cache().stats()
+
+
+@app.get("/workers/stats")
+async def worker_stats():
+    """Worker pool size, load and rejection counters"""
+    return worker_pool().stats()
+
+
+_CACHE_STATS = REGISTRY.gauge(
+    "response_cache_stats", "Response cache size and counters", ("stat",)
+)
+_WORKER_POOL_STATS = REGISTRY.gauge(
+    "worker_pool_stats", "Worker pool size, load and counters", ("stat",)
+)
+_CATALOG_VERSION = REGISTRY.gauge(
+    "catalog_version", "Catalog version (generation on reader workers) being served"
+)
+
+
+def _collect_stats():
+    for stat, value in response_cache().stats().items():
+        _CACHE_STATS.set((stat,), value)
+    for stat, value in worker_pool().stats().items():
+        _WORKER_POOL_STATS.set((stat,), value)
+    _CATALOG_VERSION.set((), playlist_service().version)
+
+
+REGISTRY.add_collector(_collect_stats)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Request, service timing, cache and worker pool metrics for Prometheus"""
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_MEDIA_TYPE)
+
+
+@app.get("/catalog/stats")
+async def catalog_stats():
+    """Deployment role, and the catalog version and generation this process serves"""
+    catalog = playlist_service()
+    if settings.CATALOG_ROLE == "reader":
+        generation = catalog.generation
+    elif settings.CATALOG_ROLE == "writer":
+        generation = catalog_publisher().generation
+    else:
+        generation = None
+    return {
+        "role": settings.CATALOG_ROLE,
+        "version": catalog.version,
+        "generation": generation,
+    }
@@ -0,0 +1,374 @@
+"""
+Request and service timing metrics, exposed in the Prometheus text format
+"""
+
+import bisect
+import functools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+T = TypeVar("T")
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SIZE_BUCKETS = tuple(256 * 4**power for power in range(10))  # 256 B to 64 MB
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """A named metric family with one series per combination of label values"""
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, value in series:
+            lines.extend(self._render_series(labels, value))
+        return lines
+
+    def _render_series(self, labels: Tuple[str, ...], value) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+        ]
+
+
+class Counter(_Metric):
+    """A value that only goes up"""
+
+    kind = "counter"
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def set(self, labels: Tuple[str, ...], value: float):
+        """Set a series outright, for values counted elsewhere and copied in"""
+        with self._lock:
+            self._series[labels] = value
+
+
+class Gauge(Counter):
+    """A value that can go up and down"""
+
+    kind = "gauge"
+
+    def dec(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    """Observations counted into fixed buckets, plus their count and sum"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        # Per-bucket counts, a count for values above the last bound, then the sum
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._series.get(labels)
+            if counts is None:
+                counts = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def _render_series(self, labels: Tuple[str, ...], counts) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            bucket_labels = _format_labels(
+                self.labelnames + ("le",), labels + (_format_value(float(bound)),)
+            )
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        series_labels = _format_labels(self.labelnames, labels)
+        lines.append(f"{self.name}_sum{series_labels} {_format_value(counts[-1])}")
+        lines.append(f"{self.name}_count{series_labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metric families a process exposes, rendered on scrape"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect: Callable[[], None]):
+        """Call `collect` before each scrape, to refresh gauges read from elsewhere"""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        """Get every metric in the Prometheus text exposition format"""
+        for collect in self._collectors:
+            collect()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUESTS = REGISTRY.counter(
+    "http_requests_total",
+    "HTTP requests served, by method, route template and status code",
+    ("method", "route", "status"),
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time to serve sampled HTTP requests, including streaming the body",
+    ("method", "route"),
+)
+RESPONSE_BYTES = REGISTRY.histogram(
+    "http_response_size_bytes",
+    "Response body size of sampled HTTP requests",
+    ("method", "route"),
+    SIZE_BUCKETS,
+)
+PHASE_SECONDS = REGISTRY.counter(
+    "http_request_phase_seconds_total",
+    "Time sampled requests spent in service code, in encoding responses, and"
+    " elsewhere (routing, validation, waiting for a worker, response_model"
+    " serialization)",
+    ("route", "phase"),
+)
+OPERATION_SECONDS = REGISTRY.histogram(
+    "app_operation_duration_seconds",
+    "Time spent in instrumented service and encoding calls of sampled requests",
+    ("operation", "stage"),
+)
+
+
+class _RequestTimings:
+    """Service and encoding time accumulated by one sampled request"""
+
+    __slots__ = ("service", "encode", "active")
+
+    def __init__(self):
+        self.service = 0.0
+        self.encode = 0.0
+        # Set while a timed call runs; calls nested in it are not timed again
+        self.active = False
+
+
+_request_timings: ContextVar[Optional[_RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+class timed:
+    """Time a service or encoding call made while serving a sampled request
+
+    Works as a decorator or, with a fresh instance per block, as a context
+    manager. Only the outermost timed call of a request is recorded, so
+    per-item calls inside a timed listing cost one context variable lookup,
+    as do calls outside sampled requests.
+    """
+
+    def __init__(self, operation: str, stage: str = "service"):
+        self.labels = (operation, stage)
+        self._timings: Optional[_RequestTimings] = None
+        self._start = 0.0
+
+    def __call__(self, func: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = _request_timings.get()
+            if timings is None or timings.active:
+                return func(*args, **kwargs)
+            timings.active = True
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._record(timings, time.perf_counter() - start)
+
+        return wrapper
+
+    def __enter__(self) -> "timed":
+        timings = _request_timings.get()
+        if timings is not None and not timings.active:
+            timings.active = True
+            self._timings = timings
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._timings is not None:
+            self._record(self._timings, time.perf_counter() - self._start)
+            self._timings = None
+
+    def _record(self, timings: _RequestTimings, elapsed: float):
+        timings.active = False
+        stage = self.labels[1]
+        setattr(timings, stage, getattr(timings, stage) + elapsed)
+        OPERATION_SECONDS.observe(self.labels, elapsed)
+
+
+def _route_label(scope: Scope) -> str:
+    """The matched route's path template, to keep one series per endpoint"""
+    # FastAPI keeps included routers nested, and their routes' own paths lack
+    # the prefix; the route context it leaves in the scope has the full one
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Counts every HTTP request and times a sample of them
+
+    Request counts and the in-flight gauge cover every request. Latency,
+    response size and the service/encode/framework split are recorded for
+    one in every round(1 / sample_rate) requests; 0 turns sampling off.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float = 1.0):
+        self.app = app
+        self.sample_every = round(1 / sample_rate) if sample_rate > 0 else 0
+        self._until_sample = 1
+        # Only touched on the event loop thread, so kept without locks and
+        # copied into the registry when it is scraped
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        REGISTRY.add_collector(self._collect)
+
+    def _collect(self):
+        IN_FLIGHT.set((), self.in_flight)
+        for (method, route, status_code), count in list(self.requests.items()):
+            REQUESTS.set((method, route, str(status_code)), count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self.sample_every:
+            self._until_sample -= 1
+            if self._until_sample == 0:
+                self._until_sample = self.sample_every
+                await self._call_sampled(scope, receive, send)
+                return
+
+        status_code = 500
+
+        async def send_counted(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send_counted)
+        finally:
+            self.in_flight -= 1
+            key = (scope["method"], _route_label(scope), status_code)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    async def _call_sampled(self, scope: Scope, receive: Receive, send: Send):
+        status_code = 500
+        size = 0
+
+        async def send_measured(message: Message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        self.in_flight += 1
+        timings = _RequestTimings()
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_measured)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_timings.reset(token)
+            self.in_flight -= 1
+            method, route = scope["method"], _route_label(scope)
+            key = (method, route, status_code)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            REQUEST_SECONDS.observe((method, route), elapsed)
+            RESPONSE_BYTES.observe((method, route), size)
+            PHASE_SECONDS.inc((route, "service"), timings.service)
+            PHASE_SECONDS.inc((route, "encode"), timings.encode)
+            PHASE_SECONDS.inc(
+                (route, "framework"),
+                max(elapsed - timings.service - timings.encode, 0.0),
+            )
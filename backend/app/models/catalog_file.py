@@ -0,0 +1,353 @@
+"""
+Memory-mapped columnar catalog files, shared read-only between processes
+"""
+
+import json
+import mmap
+import os
+import struct
+from datetime import datetime
+from typing import (
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+)
+import numpy as np
+from app.models.playlist import Playlist, Song
+from app.models.song_columns import MISSING_CODE, MISSING_DURATION, SongColumns
+
+MAGIC = b"PLCATLG\0"
+FORMAT_VERSION = 1
+# Magic, format version, length of the JSON table of contents that follows
+_HEADER = struct.Struct("<8sII")
+# Columns start on cache-line boundaries so NumPy views are aligned
+_ALIGNMENT = 64
+
+
+class StringColumn:
+    """Strings packed into one UTF-8 heap, row i at heap[offsets[i]:offsets[i + 1]]
+
+    Rows whose `missing` flag is set decode to None.
+    """
+
+    def __init__(
+        self,
+        offsets: np.ndarray,
+        heap: memoryview,
+        missing: Optional[np.ndarray] = None,
+    ):
+        self.offsets = offsets
+        self.heap = heap
+        self.missing = missing
+
+    @staticmethod
+    def encode(values: Sequence[Optional[str]]) -> Dict[str, np.ndarray]:
+        """Encode strings as offsets, heap and (if any are None) missing columns"""
+        encoded = [value.encode() if value is not None else b"" for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        columns = {
+            "offsets": offsets,
+            "heap": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        }
+        if any(value is None for value in values):
+            columns["missing"] = np.fromiter(
+                (value is None for value in values), dtype=np.uint8, count=len(values)
+            )
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        if self.missing is not None and self.missing[row]:
+            return None
+        return str(self.heap[self.offsets[row] : self.offsets[row + 1]], "utf-8")
+
+    def take(self, rows: np.ndarray) -> List[Optional[str]]:
+        """Decode several rows at once"""
+        starts = self.offsets[rows].tolist()
+        ends = self.offsets[rows + 1].tolist()
+        heap = self.heap
+        values = [str(heap[start:end], "utf-8") for start, end in zip(starts, ends)]
+        if self.missing is not None:
+            for position in np.flatnonzero(self.missing[rows]).tolist():
+                values[position] = None
+        return values
+
+    def tolist(self) -> List[Optional[str]]:
+        return self.take(np.arange(len(self)))
+
+
+def _aligned(size: int) -> int:
+    return -(-size // _ALIGNMENT) * _ALIGNMENT
+
+
+def _timestamp(value: datetime) -> int:
+    """Microseconds since the epoch, exactly"""
+    return int(value.replace(microsecond=0).timestamp()) * 1_000_000 + value.microsecond
+
+
+def _datetime(timestamp: int) -> datetime:
+    seconds, microseconds = divmod(int(timestamp), 1_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=microseconds)
+
+
+def _category_columns(
+    prefix: str,
+    index: Mapping[str, Collection[int]],
+    song_rows: Callable[[np.ndarray], np.ndarray],
+) -> Dict[str, np.ndarray]:
+    """Encode a category index as names, CSR offsets and song rows in bucket order"""
+    names = list(index)
+    sizes = [len(index[name]) for name in names]
+    offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    song_ids = np.fromiter(
+        (song_id for name in names for song_id in index[name]),
+        dtype=np.int64,
+        count=int(offsets[-1]),
+    )
+    columns = {
+        f"{prefix}.{key}": value for key, value in StringColumn.encode(names).items()
+    }
+    columns[f"{prefix}_offsets"] = offsets
+    columns[f"{prefix}_rows"] = song_rows(song_ids)
+    return columns
+
+
+def encode_catalog(
+    playlists: Iterable[Playlist],
+    genre_index: Mapping[str, Collection[int]],
+    artist_index: Mapping[str, Collection[int]],
+) -> Dict[str, np.ndarray]:
+    """Encode a catalog as named columns
+
+    Songs are stored in playlist order, so each playlist is a contiguous
+    range of song rows. Genre and artist indexes map each name to the IDs
+    of its songs, and keep their bucket order.
+    """
+    playlists = list(playlists)
+    songs = SongColumns.from_songs(
+        song for playlist in playlists for song in playlist.songs
+    )
+    columns: Dict[str, np.ndarray] = {
+        "song_ids": np.frombuffer(songs.column("ids"), dtype=np.int64),
+        "song_durations": np.frombuffer(songs.column("durations"), dtype=np.int32),
+        "song_genres": np.frombuffer(songs.column("genre_codes"), dtype=np.int32),
+        "song_artists": np.frombuffer(songs.column("artist_codes"), dtype=np.int32),
+    }
+    for name, values in (
+        ("song_titles", songs.titles),
+        ("genre_names", songs.genres.values),
+        ("artist_names", songs.artists.values),
+        ("playlist_names", [playlist.name for playlist in playlists]),
+        ("playlist_descriptions", [playlist.description for playlist in playlists]),
+    ):
+        for key, value in StringColumn.encode(values).items():
+            columns[f"{name}.{key}"] = value
+
+    # Song IDs are not in row order once tracks are inserted mid-playlist
+    by_id = np.argsort(columns["song_ids"], kind="stable")
+    columns["song_id_sorted"] = columns["song_ids"][by_id]
+    columns["song_id_rows"] = by_id
+
+    def song_rows(song_ids: np.ndarray) -> np.ndarray:
+        return by_id[np.searchsorted(columns["song_id_sorted"], song_ids)]
+
+    columns["playlist_ids"] = np.fromiter(
+        (playlist.id for playlist in playlists), dtype=np.int64, count=len(playlists)
+    )
+    song_offsets = np.zeros(len(playlists) + 1, dtype=np.int64)
+    np.cumsum([len(playlist.songs) for playlist in playlists], out=song_offsets[1:])
+    columns["playlist_song_offsets"] = song_offsets
+    columns["playlist_durations"] = np.fromiter(
+        (playlist.total_duration for playlist in playlists),
+        dtype=np.int64,
+        count=len(playlists),
+    )
+    columns["playlist_created"] = np.fromiter(
+        (_timestamp(playlist.created_at) for playlist in playlists),
+        dtype=np.int64,
+        count=len(playlists),
+    )
+    columns["playlist_updated"] = np.fromiter(
+        (_timestamp(playlist.updated_at) for playlist in playlists),
+        dtype=np.int64,
+        count=len(playlists),
+    )
+    columns.update(_category_columns("genre_categories", genre_index, song_rows))
+    columns.update(_category_columns("artist_categories", artist_index, song_rows))
+    return columns
+
+
+def write_catalog(path: str, columns: Mapping[str, np.ndarray], **metadata):
+    """Write encoded columns and JSON-serializable metadata to a catalog file
+
+    The file is written next to `path` and renamed into place, so readers
+    never see a partial file.
+    """
+    table = {}
+    offset = 0
+    for name, column in columns.items():
+        table[name] = [column.dtype.str, offset, len(column)]
+        offset += _aligned(column.nbytes)
+    contents = json.dumps({"metadata": metadata, "columns": table}).encode()
+    data_start = _aligned(_HEADER.size + len(contents))
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(contents)))
+        file.write(contents)
+        for name, column in columns.items():
+            file.seek(data_start + table[name][1])
+            file.write(np.ascontiguousarray(column).data)
+        file.truncate(data_start + offset)
+    os.replace(temporary, path)
+
+
+class CatalogFile:
+    """Read-only, zero-copy view of a catalog file
+
+    Columns are NumPy views straight onto a shared memory map, so every
+    process that opens the same file shares one copy of it in the page
+    cache. Playlists and songs are materialized only when asked for.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a catalog file")
+        _, format_version, contents_size = _HEADER.unpack_from(self._map)
+        if format_version != FORMAT_VERSION:
+            raise ValueError(
+                f"{path} has format version {format_version}, expected {FORMAT_VERSION}"
+            )
+        contents = json.loads(self._map[_HEADER.size : _HEADER.size + contents_size])
+        self.metadata: Dict = contents["metadata"]
+        data_start = _aligned(_HEADER.size + contents_size)
+        view = memoryview(self._map)
+        self._columns: Dict[str, np.ndarray] = {}
+        self._heaps: Dict[str, memoryview] = {}
+        for name, (dtype, offset, count) in contents["columns"].items():
+            start = data_start + offset
+            if name.endswith(".heap"):
+                self._heaps[name] = view[start : start + count]
+            else:
+                self._columns[name] = np.frombuffer(
+                    self._map, dtype=dtype, count=count, offset=start
+                )
+
+        self.song_ids = self._columns["song_ids"]
+        self.song_durations = self._columns["song_durations"]
+        self.song_genres = self._columns["song_genres"]
+        self.song_artists = self._columns["song_artists"]
+        self.song_titles = self._strings("song_titles")
+        self.playlist_ids = self._columns["playlist_ids"]
+        self.playlist_names = self._strings("playlist_names")
+        self.playlist_descriptions = self._strings("playlist_descriptions")
+        self.genre_categories = self._strings("genre_categories")
+        self.artist_categories = self._strings("artist_categories")
+        # Distinct genre and artist spellings are few; decode them once
+        self.genre_names = self._strings("genre_names").tolist()
+        self.artist_names = self._strings("artist_names").tolist()
+
+    def _strings(self, name: str) -> StringColumn:
+        return StringColumn(
+            self._columns[f"{name}.offsets"],
+            self._heaps[f"{name}.heap"],
+            self._columns.get(f"{name}.missing"),
+        )
+
+    def songs(self, rows: np.ndarray) -> List[Song]:
+        """Materialize the songs at the given rows"""
+        genre_names = self.genre_names
+        artist_names = self.artist_names
+        return [
+            Song(
+                id=song_id,
+                title=title,
+                artist=artist_names[artist],
+                genre=genre_names[genre] if genre != MISSING_CODE else None,
+                duration=duration if duration != MISSING_DURATION else None,
+            )
+            for song_id, title, artist, genre, duration in zip(
+                self.song_ids[rows].tolist(),
+                self.song_titles.take(rows),
+                self.song_artists[rows].tolist(),
+                self.song_genres[rows].tolist(),
+                self.song_durations[rows].tolist(),
+            )
+        ]
+
+    def song_row(self, song_id: int) -> Optional[int]:
+        """Row of the song with the given ID"""
+        ids = self._columns["song_id_sorted"]
+        position = int(np.searchsorted(ids, song_id))
+        if position == len(ids) or ids[position] != song_id:
+            return None
+        return int(self._columns["song_id_rows"][position])
+
+    def song_playlist_row(self, row: int) -> int:
+        """Row of the playlist a song row belongs to"""
+        offsets = self._columns["playlist_song_offsets"]
+        return int(np.searchsorted(offsets, row, "right")) - 1
+
+    def playlist_row(self, playlist_id: int) -> Optional[int]:
+        """Row of the playlist with the given ID; playlist IDs are stored ascending"""
+        position = int(np.searchsorted(self.playlist_ids, playlist_id))
+        if (
+            position == len(self.playlist_ids)
+            or self.playlist_ids[position] != playlist_id
+        ):
+            return None
+        return position
+
+    def playlist(self, row: int, lazy: bool = False) -> Playlist:
+        """Materialize the playlist at a row
+
+        A lazy playlist reads only the playlist columns; its songs are
+        materialized from the song columns each time they are asked for.
+        """
+        offsets = self._columns["playlist_song_offsets"]
+        first, end = int(offsets[row]), int(offsets[row + 1])
+        fields = dict(
+            id=int(self.playlist_ids[row]),
+            name=self.playlist_names[row],
+            description=self.playlist_descriptions[row],
+            created_at=_datetime(self._columns["playlist_created"][row]),
+            updated_at=_datetime(self._columns["playlist_updated"][row]),
+        )
+        if not lazy:
+            return Playlist(songs=self.songs(np.arange(first, end)), **fields)
+        return Playlist(
+            song_loader=lambda start, stop: self.songs(
+                np.arange(first + start, first + stop)
+            ),
+            song_count=end - first,
+            total_duration=self.playlist_duration(row),
+            **fields,
+        )
+
+    def playlist_duration(self, row: int) -> int:
+        """Total duration of the playlist at a row"""
+        durations = self._columns.get("playlist_durations")
+        if durations is not None:
+            return int(durations[row])
+        # Files written before the column existed: sum the song durations
+        offsets = self._columns["playlist_song_offsets"]
+        songs = self.song_durations[offsets[row] : offsets[row + 1]]
+        return int(songs[songs != MISSING_DURATION].sum())
+
+    def category_rows(self, kind: str, position: int) -> np.ndarray:
+        """Song rows of the position-th genre or artist category, in index order"""
+        offsets = self._columns[f"{kind}_categories_offsets"]
+        rows = self._columns[f"{kind}_categories_rows"]
+        return rows[offsets[position] : offsets[position + 1]]
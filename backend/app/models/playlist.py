@@ -2,12 +2,21 @@
 Database models for Playlist (for future database integration)
 """
 
+import sys
 from datetime import datetime
-from typing import List, Optional
+from typing import Callable, List, NamedTuple, Optional, Tuple
 
 
 class Song:
-    """Song model"""
+    """Song model
+
+    Uses __slots__ and interns artist and genre names, which repeat across
+    many songs, to keep large catalogs compact. The track fingerprint is
+    computed on use unless it was set; the track table sets it on canonical
+    tracks, sharing the tuple it indexes them by.
+    """
+
+    __slots__ = ("id", "title", "artist", "genre", "duration", "_fingerprint")
 
     def __init__(
         self,
@@ -16,16 +25,69 @@ class Song:
         artist: str,
         genre: Optional[str] = None,
         duration: Optional[int] = None,
+        fingerprint: Optional["TrackFingerprint"] = None,
     ):
         self.id = id
         self.title = title
-        self.artist = artist
-        self.genre = genre
+        self.artist = sys.intern(artist)
+        self.genre = sys.intern(genre) if genre is not None else None
         self.duration = duration
+        self._fingerprint = fingerprint
+
+    @property
+    def fingerprint(self) -> "TrackFingerprint":
+        """Normalized identity of the track; see track_fingerprint"""
+        if self._fingerprint is None:
+            return track_fingerprint(self)
+        return self._fingerprint
+
+    @fingerprint.setter
+    def fingerprint(self, fingerprint: "TrackFingerprint"):
+        self._fingerprint = fingerprint
+
+
+def track_key(song: Song) -> Tuple[str, str]:
+    """Normalized title and artist, shared by every version of a track"""
+    return song.title.strip().lower(), song.artist.strip().lower()
+
+
+TrackFingerprint = Tuple[str, str, Optional[str], Optional[int]]
+
+
+def track_fingerprint(song) -> TrackFingerprint:
+    """Normalized (title, artist, genre, duration) of a Song or song payload
+
+    Songs with the same fingerprint are one canonical track.
+    """
+    return (
+        song.title.strip().lower(),
+        song.artist.strip().lower(),
+        song.genre.strip().lower() if song.genre is not None else None,
+        song.duration,
+    )
+
+
+class TrackEdit(NamedTuple):
+    """One track-level edit as applied to a playlist
+
+    `song` is the canonical song an insert or replace put in place.
+    """
+
+    op: str
+    position: int
+    to_position: Optional[int] = None
+    song: Optional[Song] = None
 
 
 class Playlist:
-    """Playlist model"""
+    """Playlist model
+
+    Track count and total duration are kept as a summary, computed when the
+    song list is set, so listings can report them without touching songs.
+    A playlist built with a `song_loader` instead of songs is lazy: it
+    holds only that summary, and each read of `songs` or `song_slice`
+    loads the songs from the backing store again.
+    """
 
     def __init__(
         self,
@@ -35,10 +97,39 @@ class Playlist:
         songs: Optional[List[Song]] = None,
         created_at: Optional[datetime] = None,
         updated_at: Optional[datetime] = None,
+        song_loader: Optional[Callable[[int, int], List[Song]]] = None,
+        song_count: int = 0,
+        total_duration: int = 0,
     ):
         self.id = id
         self.name = name
         self.description = description
-        self.songs = songs or []
         self.created_at = created_at or datetime.now()
         self.updated_at = updated_at or datetime.now()
+        # Loads the songs at positions [start, stop) of a lazy playlist
+        self._song_loader = song_loader
+        if song_loader is None:
+            self.songs = songs or []
+        else:
+            self._songs = None
+            self.song_count = song_count
+            self.total_duration = total_duration
+
+    @property
+    def songs(self) -> List[Song]:
+        if self._songs is None:
+            return self._song_loader(0, self.song_count)
+        return self._songs
+
+    @songs.setter
+    def songs(self, songs: List[Song]):
+        self._songs = songs
+        self._song_loader = None
+        self.song_count = len(songs)
+        self.total_duration = sum(song.duration or 0 for song in songs)
+
+    def song_slice(self, start: int, stop: int) -> List[Song]:
+        """Songs at positions [start, stop), loading only those of a lazy playlist"""
+        if self._songs is None:
+            return self._song_loader(start, min(stop, self.song_count))
+        return self._songs[start:stop]
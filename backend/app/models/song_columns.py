@@ -0,0 +1,114 @@
+"""
+Columnar, array-backed song storage for large catalogs
+"""
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+from app.models.playlist import Song
+
+# Durations are optional; -1 marks a missing value in the typed column
+MISSING_DURATION = -1
+# Code used for songs without a genre
+MISSING_CODE = -1
+
+
+class StringDictionary:
+    """Dictionary encoding: maps each distinct string to a small integer code"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        """Get the code for a value, assigning the next code if it is new"""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: str) -> Optional[int]:
+        """Get the code for a value without assigning one"""
+        return self._codes.get(value)
+
+    def decode(self, code: int) -> Optional[str]:
+        return self.values[code] if code != MISSING_CODE else None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class SongColumns:
+    """Songs stored column by column
+
+    IDs and durations live in typed arrays and genre/artist are stored as
+    dictionary-encoded integer codes, so a song costs a few machine words
+    plus its title instead of a Python object per field. Genres and artists
+    are encoded case-sensitively; normalize before lookup if needed.
+    """
+
+    def __init__(self):
+        self.ids = array("q")
+        self.durations = array("i")
+        self.genre_codes = array("i")
+        self.artist_codes = array("i")
+        self.titles: List[str] = []
+        self.genres = StringDictionary()
+        self.artists = StringDictionary()
+
+    @classmethod
+    def from_songs(cls, songs: Iterable[Song]) -> "SongColumns":
+        """Build a columnar copy of the given songs"""
+        columns = cls()
+        for song in songs:
+            columns.append(song)
+        return columns
+
+    def append(self, song: Song):
+        """Append one song as a new row"""
+        self.ids.append(song.id)
+        self.durations.append(
+            song.duration if song.duration is not None else MISSING_DURATION
+        )
+        self.genre_codes.append(
+            self.genres.encode(song.genre) if song.genre is not None else MISSING_CODE
+        )
+        self.artist_codes.append(self.artists.encode(song.artist))
+        self.titles.append(song.title)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def song(self, row: int) -> Song:
+        """Materialize the song stored at a row"""
+        duration = self.durations[row]
+        return Song(
+            id=self.ids[row],
+            title=self.titles[row],
+            artist=self.artists.decode(self.artist_codes[row]),
+            genre=self.genres.decode(self.genre_codes[row]),
+            duration=duration if duration != MISSING_DURATION else None,
+        )
+
+    def __iter__(self) -> Iterator[Song]:
+        for row in range(len(self)):
+            yield self.song(row)
+
+    def column(self, name: str) -> memoryview:
+        """Get a zero-copy view of a typed column, e.g. for NumPy via frombuffer"""
+        if name not in ("ids", "durations", "genre_codes", "artist_codes"):
+            raise KeyError(f"Unknown column: {name}")
+        return memoryview(getattr(self, name))
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the typed columns"""
+        return sum(
+            column.itemsize * len(column)
+            for column in (
+                self.ids,
+                self.durations,
+                self.genre_codes,
+                self.artist_codes,
+            )
+        )
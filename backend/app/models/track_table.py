@@ -0,0 +1,102 @@
+"""
+Canonical tracks shared by every playlist entry of the same song
+"""
+
+from typing import Dict, List, Optional
+from app.models.playlist import Song, TrackFingerprint
+
+
+class TrackTable:
+    """Canonical tracks, hash-indexed by fingerprint and reference counted
+
+    Every playlist entry with the same fingerprint refers to one Song, so a
+    track added to many playlists is held once. A track joins the table
+    with its first reference and leaves it with its last. Lookups take no
+    lock; everything that changes the table must be called under the
+    owner's write lock.
+
+    Tracks loaded by ID (from storage written before songs were merged)
+    may share a fingerprint; the first one loaded is the one new entries
+    resolve to.
+    """
+
+    def __init__(self):
+        self._by_fingerprint: Dict[TrackFingerprint, Song] = {}
+        self._by_id: Dict[int, Song] = {}
+        # Track ID -> ID of each playlist with entries referring to it, in
+        # the order they first did, mapped to its number of such entries;
+        # the counts sum to the reference count
+        self._holders: Dict[int, Dict[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def get(self, track_id: int) -> Optional[Song]:
+        """Get a track by ID"""
+        return self._by_id.get(track_id)
+
+    def find(self, fingerprint: TrackFingerprint) -> Optional[Song]:
+        """Get the canonical track with a fingerprint"""
+        return self._by_fingerprint.get(fingerprint)
+
+    def first_holder(self, track_id: int) -> Optional[int]:
+        """ID of the earliest-added playlist still holding a track"""
+        holders = self._holders.get(track_id)
+        return next(iter(holders)) if holders else None
+
+    def resolve(self, songs: List[Song]) -> List[Song]:
+        """Replace each song with the canonical track of its fingerprint
+
+        Songs new to the table stand for their fingerprint themselves; a
+        fingerprint repeated within `songs` resolves to its first song.
+        """
+        batch: Dict[TrackFingerprint, Song] = {}
+        resolved = []
+        for song in songs:
+            fingerprint = song.fingerprint
+            canonical = self._by_fingerprint.get(fingerprint)
+            if canonical is None:
+                canonical = batch.setdefault(fingerprint, song)
+            resolved.append(canonical)
+        return resolved
+
+    def add_references(self, playlist_id: int, songs: List[Song]) -> List[Song]:
+        """Count one reference per entry of a playlist; returns the tracks new to the table"""
+        added = []
+        for song in songs:
+            holders = self._holders.get(song.id)
+            if holders is not None:
+                holders[playlist_id] = holders.get(playlist_id, 0) + 1
+                continue
+            self._holders[song.id] = {playlist_id: 1}
+            self._by_id[song.id] = song
+            fingerprint = song.fingerprint
+            if self._by_fingerprint.setdefault(fingerprint, song) is song:
+                # Kept on the track so it is not computed again
+                song.fingerprint = fingerprint
+            added.append(song)
+        return added
+
+    def remove_references(self, playlist_id: int, songs: List[Song]) -> List[Song]:
+        """Drop one reference per entry of a playlist; returns the tracks no entry refers to now"""
+        removed = []
+        for song in songs:
+            holders = self._holders.get(song.id)
+            if holders is None:
+                continue
+            count = holders.get(playlist_id)
+            if count is None:
+                continue
+            if count > 1:
+                holders[playlist_id] = count - 1
+                continue
+            del holders[playlist_id]
+            if holders:
+                continue
+            del self._holders[song.id]
+            track = self._by_id.pop(song.id)
+            fingerprint = track.fingerprint
+            if self._by_fingerprint.get(fingerprint) is track:
+                del self._by_fingerprint[fingerprint]
+            removed.append(track)
+        return removed
@@ -0,0 +1,54 @@
+"""
+Cursor pagination and NDJSON streaming helpers shared by the list endpoints
+"""
+
+import base64
+import json
+from typing import Any, Callable, Dict, Iterable, Optional
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(position: Dict[str, int]) -> str:
+    """Encode a position such as {"after_id": 42} as an opaque, URL-safe cursor"""
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key: str) -> int:
+    """Read `key` back out of a cursor produced by encode_cursor
+
+    Raises a 400 HTTPException for cursors that were not issued by this API.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded))
+        value = position[key]
+    except (ValueError, TypeError, KeyError):
+        value = None
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    return value
+
+
+def ndjson_response(
+    items: Iterable[Any], encode: Optional[Callable[[Any], bytes]] = None
+) -> StreamingResponse:
+    """Stream items as newline-delimited JSON, serializing one item at a time
+
+    Items are models unless `encode` is given to turn each one into JSON.
+    """
+
+    def lines():
+        for item in items:
+            if encode is not None:
+                yield encode(item) + b"\n"
+            else:
+                yield item.model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
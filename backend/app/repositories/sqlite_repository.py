@@ -0,0 +1,394 @@
+"""
+SQLite-backed persistent storage for playlists and songs
+"""
+
+import queue
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Tuple
+from app.models.playlist import (
+    Playlist,
+    Song,
+    TrackEdit,
+    TrackFingerprint,
+    track_fingerprint,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlists (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS songs (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    artist TEXT NOT NULL,
+    genre TEXT,
+    duration INTEGER
+);
+CREATE TABLE IF NOT EXISTS playlist_songs (
+    playlist_id INTEGER NOT NULL REFERENCES playlists(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    song_id INTEGER NOT NULL REFERENCES songs(id),
+    PRIMARY KEY (playlist_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_playlist_songs_song_id ON playlist_songs(song_id);
+-- Category lookups are served from the in-memory catalog, never by a query
+DROP INDEX IF EXISTS ix_songs_genre;
+DROP INDEX IF EXISTS ix_songs_artist;
+"""
+
+# Stored positions are spaced this far apart, so a track can be inserted
+# between two others without renumbering the rest of the playlist
+POSITION_GAP = 1 << 20
+
+
+def sqlite_path_from_url(database_url: str) -> str:
+    """Convert a `sqlite:///path` URL into a path sqlite3 can open"""
+    prefix = "sqlite:///"
+    if database_url in ("sqlite://", "sqlite:///:memory:"):
+        return ":memory:"
+    if not database_url.startswith(prefix):
+        raise ValueError(f"Unsupported database URL: {database_url}")
+    return database_url[len(prefix) :]
+
+
+class SQLiteConnectionPool:
+    """Fixed-size pool of SQLite connections opened in WAL mode"""
+
+    def __init__(self, path: str, size: int = 5):
+        self._path = path
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=size)
+        if path == ":memory:":
+            # Each in-memory connection is its own database, so share one
+            size = 1
+        for _ in range(size):
+            self._pool.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection, committing on success and rolling back on error"""
+        conn = self._pool.get()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        """Close every pooled connection"""
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+class SQLitePlaylistRepository:
+    """Persists playlists, songs and their ordering in SQLite
+
+    `songs` holds canonical tracks, which any number of playlist entries
+    may refer to. A song row is written with the first entry referring to
+    it and deleted once no entry does.
+
+    `playlist_songs.position` only orders a playlist's entries: positions
+    are written POSITION_GAP apart and an insert takes the midpoint of its
+    neighbours, so a track edit writes only the rows it touches. A
+    playlist is renumbered when two neighbours have no gap left between
+    them.
+    """
+
+    def __init__(self, database_url: str, pool_size: int = 5):
+        self._pool = SQLiteConnectionPool(sqlite_path_from_url(database_url), pool_size)
+        with self._pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def load_playlists(self) -> Iterator[Playlist]:
+        """Load every playlist with its songs, in ID order"""
+        with self._pool.connection() as conn:
+            songs_by_playlist: Dict[int, List[Song]] = {}
+            # One Song per row of `songs`, shared by every entry referring to it
+            songs: Dict[int, Song] = {}
+            rows = conn.execute(
+                "SELECT ps.playlist_id, s.id, s.title, s.artist, s.genre, s.duration "
+                "FROM playlist_songs ps JOIN songs s ON s.id = ps.song_id "
+                "ORDER BY ps.playlist_id, ps.position"
+            )
+            for playlist_id, song_id, *fields in rows:
+                song = songs.get(song_id)
+                if song is None:
+                    song = songs[song_id] = Song(song_id, *fields)
+                songs_by_playlist.setdefault(playlist_id, []).append(song)
+
+            rows = conn.execute(
+                "SELECT id, name, description, created_at, updated_at "
+                "FROM playlists ORDER BY id"
+            )
+            for id, name, description, created_at, updated_at in rows:
+                yield Playlist(
+                    id=id,
+                    name=name,
+                    description=description,
+                    songs=songs_by_playlist.get(id, []),
+                    created_at=datetime.fromisoformat(created_at),
+                    updated_at=datetime.fromisoformat(updated_at),
+                )
+
+    def save_playlist(self, playlist: Playlist):
+        """Insert or replace a playlist and its songs in a single transaction"""
+        with self._pool.connection() as conn:
+            conn.execute(
+                "INSERT INTO playlists (id, name, description, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET name = excluded.name, "
+                "description = excluded.description, updated_at = excluded.updated_at",
+                (
+                    playlist.id,
+                    playlist.name,
+                    playlist.description,
+                    playlist.created_at.isoformat(),
+                    playlist.updated_at.isoformat(),
+                ),
+            )
+            old_song_ids = self._playlist_song_ids(conn, playlist.id)
+            conn.execute(
+                "DELETE FROM playlist_songs WHERE playlist_id = ?", (playlist.id,)
+            )
+            self._insert_songs(conn, playlist.songs)
+            conn.executemany(
+                "INSERT INTO playlist_songs (playlist_id, position, song_id) "
+                "VALUES (?, ?, ?)",
+                [
+                    (playlist.id, position * POSITION_GAP, song.id)
+                    for position, song in enumerate(playlist.songs)
+                ],
+            )
+            self._delete_unreferenced_songs(conn, old_song_ids)
+
+    def append_playlist_songs(self, playlist: Playlist, songs: List[Song]):
+        """Append songs to the end of a playlist with one executemany per table"""
+        with self._pool.connection() as conn:
+            conn.execute(
+                "UPDATE playlists SET updated_at = ? WHERE id = ?",
+                (playlist.updated_at.isoformat(), playlist.id),
+            )
+            self._insert_songs(conn, songs)
+            (last,) = conn.execute(
+                "SELECT MAX(position) FROM playlist_songs WHERE playlist_id = ?",
+                (playlist.id,),
+            ).fetchone()
+            start = 0 if last is None else last + POSITION_GAP
+            conn.executemany(
+                "INSERT INTO playlist_songs (playlist_id, position, song_id) "
+                "VALUES (?, ?, ?)",
+                [
+                    (playlist.id, start + offset * POSITION_GAP, song.id)
+                    for offset, song in enumerate(songs)
+                ],
+            )
+
+    def patch_playlist_songs(self, playlist: Playlist, edits: List[TrackEdit]):
+        """Apply track-level edits in order, writing only the entries they touch
+
+        Songs that no playlist refers to once the edits are applied are
+        deleted.
+        """
+        with self._pool.connection() as conn:
+            conn.execute(
+                "UPDATE playlists SET updated_at = ? WHERE id = ?",
+                (playlist.updated_at.isoformat(), playlist.id),
+            )
+            self._insert_songs(conn, [edit.song for edit in edits if edit.song])
+            taken = set()
+            for edit in edits:
+                if edit.op == "insert":
+                    self._insert_entry(conn, playlist.id, edit.position, edit.song.id)
+                    continue
+                position, song_id = self._entry_at(conn, playlist.id, edit.position)
+                if edit.op == "replace":
+                    taken.add(song_id)
+                    conn.execute(
+                        "UPDATE playlist_songs SET song_id = ? "
+                        "WHERE playlist_id = ? AND position = ?",
+                        (edit.song.id, playlist.id, position),
+                    )
+                    continue
+                conn.execute(
+                    "DELETE FROM playlist_songs WHERE playlist_id = ? AND position = ?",
+                    (playlist.id, position),
+                )
+                if edit.op == "move":
+                    self._insert_entry(conn, playlist.id, edit.to_position, song_id)
+                else:
+                    taken.add(song_id)
+            self._delete_unreferenced_songs(conn, taken)
+
+    def replace_playlists(self, playlists: Iterable[Playlist]):
+        """Replace every stored playlist and song in a single transaction"""
+        with self._pool.connection() as conn:
+            conn.execute("DELETE FROM playlist_songs")
+            conn.execute("DELETE FROM songs")
+            conn.execute("DELETE FROM playlists")
+            for playlist in playlists:
+                conn.execute(
+                    "INSERT INTO playlists (id, name, description, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        playlist.id,
+                        playlist.name,
+                        playlist.description,
+                        playlist.created_at.isoformat(),
+                        playlist.updated_at.isoformat(),
+                    ),
+                )
+                self._insert_songs(conn, playlist.songs)
+                conn.executemany(
+                    "INSERT INTO playlist_songs (playlist_id, position, song_id) "
+                    "VALUES (?, ?, ?)",
+                    [
+                        (playlist.id, position * POSITION_GAP, song.id)
+                        for position, song in enumerate(playlist.songs)
+                    ],
+                )
+
+    def delete_playlist(self, playlist_id: int):
+        """Delete a playlist together with the songs no other playlist holds"""
+        with self._pool.connection() as conn:
+            song_ids = self._playlist_song_ids(conn, playlist_id)
+            conn.execute(
+                "DELETE FROM playlist_songs WHERE playlist_id = ?", (playlist_id,)
+            )
+            conn.execute("DELETE FROM playlists WHERE id = ?", (playlist_id,))
+            self._delete_unreferenced_songs(conn, song_ids)
+
+    def merge_duplicate_songs(self) -> Tuple[int, int]:
+        """Point every playlist entry at one song per track fingerprint
+
+        Songs with the same fingerprint are merged into the one with the
+        lowest ID and the others are deleted, in one transaction. Returns
+        the number of songs before and after.
+        """
+        with self._pool.connection() as conn:
+            canonical: Dict[TrackFingerprint, int] = {}
+            merged = []
+            rows = conn.execute(
+                "SELECT id, title, artist, genre, duration FROM songs ORDER BY id"
+            ).fetchall()
+            for row in rows:
+                kept = canonical.setdefault(track_fingerprint(Song(*row)), row[0])
+                if kept != row[0]:
+                    merged.append((kept, row[0]))
+            conn.executemany(
+                "UPDATE playlist_songs SET song_id = ? WHERE song_id = ?", merged
+            )
+            conn.executemany(
+                "DELETE FROM songs WHERE id = ?", [(song_id,) for _, song_id in merged]
+            )
+        return len(rows), len(canonical)
+
+    @staticmethod
+    def _insert_songs(conn: sqlite3.Connection, songs: Iterable[Song]):
+        """Insert songs, skipping those another entry already wrote"""
+        conn.executemany(
+            "INSERT INTO songs (id, title, artist, genre, duration) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT(id) DO NOTHING",
+            [
+                (song.id, song.title, song.artist, song.genre, song.duration)
+                for song in songs
+            ],
+        )
+
+    @staticmethod
+    def _entry_at(
+        conn: sqlite3.Connection, playlist_id: int, index: int
+    ) -> Tuple[int, int]:
+        """Stored position and song ID of the index-th entry of a playlist"""
+        return conn.execute(
+            "SELECT position, song_id FROM playlist_songs WHERE playlist_id = ? "
+            "ORDER BY position LIMIT 1 OFFSET ?",
+            (playlist_id, index),
+        ).fetchone()
+
+    @classmethod
+    def _insert_entry(
+        cls, conn: sqlite3.Connection, playlist_id: int, index: int, song_id: int
+    ):
+        """Insert an entry so that it becomes the index-th of its playlist"""
+        # The entries before and at `index`, whichever exist
+        neighbours = [
+            position
+            for (position,) in conn.execute(
+                "SELECT position FROM playlist_songs WHERE playlist_id = ? "
+                "ORDER BY position LIMIT ? OFFSET ?",
+                (playlist_id, 2 if index else 1, max(index - 1, 0)),
+            )
+        ]
+        before = neighbours.pop(0) if index and neighbours else None
+        after = neighbours[0] if neighbours else None
+        if before is None:
+            position = 0 if after is None else after - POSITION_GAP
+        elif after is None:
+            position = before + POSITION_GAP
+        elif after - before > 1:
+            position = (before + after) // 2
+        else:
+            cls._renumber(conn, playlist_id)
+            cls._insert_entry(conn, playlist_id, index, song_id)
+            return
+        conn.execute(
+            "INSERT INTO playlist_songs (playlist_id, position, song_id) "
+            "VALUES (?, ?, ?)",
+            (playlist_id, position, song_id),
+        )
+
+    @staticmethod
+    def _renumber(conn: sqlite3.Connection, playlist_id: int):
+        """Space a playlist's positions POSITION_GAP apart again"""
+        song_ids = [
+            song_id
+            for (song_id,) in conn.execute(
+                "SELECT song_id FROM playlist_songs WHERE playlist_id = ? "
+                "ORDER BY position",
+                (playlist_id,),
+            )
+        ]
+        conn.execute("DELETE FROM playlist_songs WHERE playlist_id = ?", (playlist_id,))
+        conn.executemany(
+            "INSERT INTO playlist_songs (playlist_id, position, song_id) "
+            "VALUES (?, ?, ?)",
+            [
+                (playlist_id, position * POSITION_GAP, song_id)
+                for position, song_id in enumerate(song_ids)
+            ],
+        )
+
+    @staticmethod
+    def _playlist_song_ids(conn: sqlite3.Connection, playlist_id: int) -> List[int]:
+        return [
+            song_id
+            for (song_id,) in conn.execute(
+                "SELECT DISTINCT song_id FROM playlist_songs WHERE playlist_id = ?",
+                (playlist_id,),
+            )
+        ]
+
+    @staticmethod
+    def _delete_unreferenced_songs(conn: sqlite3.Connection, song_ids: Iterable[int]):
+        """Delete those of the songs that no playlist entry refers to any more"""
+        conn.executemany(
+            "DELETE FROM songs WHERE id = ? AND NOT EXISTS "
+            "(SELECT 1 FROM playlist_songs WHERE song_id = songs.id)",
+            [(song_id,) for song_id in song_ids],
+        )
+
+    def close(self):
+        """Release all pooled connections"""
+        self._pool.close()
@@ -2,44 +2,133 @@
 Category router endpoints
 """
 
-from fastapi import APIRouter, HTTPException, status
-from typing import List
-from app.schemas.category import CategoryResponse, CategoryListResponse
+import itertools
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from typing import List, Literal, Optional
+from app.cache import ResponseCache, cached_json_response
+from app.dependencies import (
+    get_category_service,
+    get_response_cache,
+    get_worker_pool,
+)
+from app.pagination import (
+    NDJSON_MEDIA_TYPE,
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_cursor,
+    ndjson_response,
+)
+from app.schemas.category import CategoryListResponse, CategoryResponse
 from app.schemas.playlist import SongResponse
+from app.serialization import dump_category, dump_category_list, dump_songs
 from app.services.category_service import CategoryService
+from app.worker_pool import WorkerPool
 
 router = APIRouter()
-category_service = CategoryService()
 
 
-@router.get("/", response_model=CategoryListResponse)
-async def get_all_categories():
-    """Get all categories (genres and artists)"""
-    categories = category_service.get_all_categories()
-    return CategoryListResponse(categories=categories, total=len(categories))
+@router.get(
+    "/",
+    response_model=CategoryListResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def get_all_categories(
+    limit: Optional[int] = Query(
+        None, ge=1, le=1000, description="Page size; omit to list every category"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor from a previous page's next_cursor"
+    ),
+    include_songs: bool = Query(
+        True, description="Embed songs; when false only song_count is returned"
+    ),
+    format: Literal["json", "ndjson"] = Query(
+        "json", description="'ndjson' streams one category per line"
+    ),
+    category_service: CategoryService = Depends(get_category_service),
+    pool: WorkerPool = Depends(get_worker_pool),
+):
+    """Get all categories (genres and artists), optionally paginated or streamed"""
+    offset = decode_cursor(cursor, "offset") if cursor else 0
+    if offset < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    if format == "ndjson":
+        buckets = category_service.iter_category_buckets(offset)
+        if limit is not None:
+            buckets = itertools.islice(buckets, limit)
+        streamed = ndjson_response(
+            buckets, lambda bucket: dump_category(*bucket, include_songs)
+        )
+        if limit is None:
+            return streamed
+        if offset + limit < category_service.count_categories():
+            streamed.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                {"offset": offset + limit}
+            )
+        return streamed
+
+    def build() -> bytes:
+        buckets = category_service.get_category_buckets(offset, limit)
+        total = category_service.count_categories()
+        next_cursor = None
+        if limit is not None and offset + limit < total:
+            next_cursor = encode_cursor({"offset": offset + limit})
+        return dump_category_list(buckets, total, next_cursor, include_songs)
+
+    # Aggregating and serializing categories is heavy; keep it off the loop
+    return await pool.json_response(build)
 
 
 @router.get("/{category_name}", response_model=CategoryResponse)
-async def get_category(category_name: str):
+async def get_category(
+    category_name: str,
+    request: Request,
+    category_service: CategoryService = Depends(get_category_service),
+    cache: ResponseCache = Depends(get_response_cache),
+    pool: WorkerPool = Depends(get_worker_pool),
+):
     """Get songs in a specific category (genre or artist name)"""
-    category = category_service.get_category_by_name(category_name)
-    if not category:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Category '{category_name}' not found",
-        )
-    return category
+
+    def build() -> bytes:
+        category = category_service.find_category(category_name)
+        if not category:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Category '{category_name}' not found",
+            )
+        return dump_category(*category)
+
+    return await cached_json_response(
+        request,
+        cache,
+        ("category", category_name.lower()),
+        category_service.playlist_service.version,
+        build,
+        pool,
+    )
 
 
 @router.get("/genre/{genre}", response_model=List[SongResponse])
-async def get_songs_by_genre(genre: str):
+async def get_songs_by_genre(
+    genre: str,
+    category_service: CategoryService = Depends(get_category_service),
+    pool: WorkerPool = Depends(get_worker_pool),
+):
     """Get all songs of a specific genre"""
-    songs = category_service.get_songs_by_genre(genre)
-    return songs
+    return await pool.json_response(
+        lambda: dump_songs(category_service.get_songs_by_genre(genre))
+    )
 
 
 @router.get("/artist/{artist}", response_model=List[SongResponse])
-async def get_songs_by_artist(artist: str):
+async def get_songs_by_artist(
+    artist: str,
+    category_service: CategoryService = Depends(get_category_service),
+    pool: WorkerPool = Depends(get_worker_pool),
+):
     """Get all songs by a specific artist"""
-    songs = category_service.get_songs_by_artist(artist)
-    return songs
+    return await pool.json_response(
+        lambda: dump_songs(category_service.get_songs_by_artist(artist))
+    )
@@ -0,0 +1,37 @@
+"""
+Category stats router endpoints
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Optional
+from app.dependencies import get_category_stats_service
+from app.schemas.category import CategoryStatsResponse
+from app.services.category_stats_service import CategoryStatsService
+
+router = APIRouter()
+
+
+@router.get("/", response_model=CategoryStatsResponse)
+async def get_category_stats(
+    genre: Optional[str] = Query(None, description="Only this genre"),
+    top_artists: int = Query(
+        10, ge=0, le=100, description="Number of top artists per genre"
+    ),
+    stats_service: CategoryStatsService = Depends(get_category_stats_service),
+):
+    """Get song count, total and average duration and artist counts per genre
+
+    Served from counters updated on every write, so the cost depends on
+    the number of genres and `top_artists`, not on the number of songs.
+    """
+    if genre is None:
+        return CategoryStatsResponse(
+            genres=stats_service.get_all_genre_stats(top_artists)
+        )
+    stats = stats_service.get_genre_stats(genre, top_artists)
+    if stats is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Genre '{genre}' not found",
+        )
+    return CategoryStatsResponse(genres=[stats])
@@ -0,0 +1,56 @@
+"""
+Change feed router endpoints
+"""
+
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from app.dependencies import get_change_log
+from app.schemas.change import ChangeFeedResponse
+from app.services.change_log import ChangeLog, ChangesCompacted
+
+router = APIRouter()
+
+
+@router.get("/", response_model=ChangeFeedResponse)
+async def get_changes(
+    since: int = Query(
+        0, ge=0, description="Last sequence number already seen; 0 for the oldest"
+    ),
+    limit: int = Query(1000, ge=1, le=10000, description="Maximum number of changes"),
+    wait: float = Query(
+        0,
+        ge=0,
+        le=60,
+        description="Seconds to wait for a change when there is none after `since`",
+    ),
+    change_log: Optional[ChangeLog] = Depends(get_change_log),
+):
+    """Get the catalog changes after `since`, oldest first
+
+    Consumers load the catalog once, then follow it by passing the returned
+    last_seq back as `since`, with `wait` set to long-poll. 410 Gone means
+    the changes after `since` were compacted away and the catalog must be
+    loaded again.
+    """
+    if change_log is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="The change log is disabled",
+        )
+    if since > change_log.last_seq:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"since {since} is ahead of the last change, {change_log.last_seq}",
+        )
+    if wait and since == change_log.last_seq:
+        await change_log.wait(since, wait)
+    try:
+        # Catching up from older segments reads files
+        records = await run_in_threadpool(change_log.read, since, limit)
+    except ChangesCompacted as e:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(e))
+    last_seq = since + len(records)
+    # Records are stored as JSON already; join them rather than re-encoding
+    body = b'{"changes":[' + b",".join(records) + b'],"last_seq":%d}' % last_seq
+    return Response(body, media_type="application/json")
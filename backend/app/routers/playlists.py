@@ -2,23 +2,151 @@
 Playlist router endpoints
 """
 
-from fastapi import APIRouter, HTTPException, status
-from typing import List
-from app.schemas.playlist import PlaylistCreate, PlaylistResponse, PlaylistUpdate
+from anyio import from_thread
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from typing import Iterable, Iterator, List, Literal, Optional, Tuple
+from app.dependencies import (
+    get_playlist_generator,
+    get_playlist_service,
+    get_worker_pool,
+)
+from app.models.playlist import Playlist
+from app.pagination import (
+    NDJSON_MEDIA_TYPE,
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_cursor,
+    ndjson_response,
+)
+from app.schemas.bulk_import import ImportReport
+from app.schemas.playlist import (
+    PlaylistCreate,
+    PlaylistGenerateRequest,
+    PlaylistResponse,
+    PlaylistSongsPatch,
+    PlaylistSummary,
+    PlaylistUpdate,
+    SongResponse,
+)
+from app.serialization import (
+    dump_playlist,
+    dump_playlist_summaries,
+    dump_playlist_summary,
+    dump_playlists,
+    dump_songs,
+)
+from app.services.import_service import ImportAborted, ImportService
+from app.services.playlist_generator import PlaylistGenerator
 from app.services.playlist_service import PlaylistService
+from app.worker_pool import WorkerPool
 
 router = APIRouter()
-playlist_service = PlaylistService()
 
+# Playlists with more songs than this are serialized on the worker pool
+INLINE_SONG_LIMIT = 1000
+# Summary pages larger than this are serialized on the worker pool
+INLINE_SUMMARY_LIMIT = 1000
 
-@router.get("/", response_model=List[PlaylistResponse])
-async def get_playlists():
-    """Get all playlists"""
-    return playlist_service.get_all_playlists()
+
+@router.get(
+    "/",
+    response_model=List[PlaylistResponse],
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def get_playlists(
+    limit: Optional[int] = Query(
+        None, ge=1, le=1000, description="Page size; omit to list every playlist"
+    ),
+    cursor: Optional[str] = Query(
+        None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"
+    ),
+    include_songs: bool = Query(
+        True, description="Embed songs; when false only song_count is returned"
+    ),
+    format: Literal["json", "ndjson"] = Query(
+        "json", description="'ndjson' streams one playlist per line"
+    ),
+    playlist_service: PlaylistService = Depends(get_playlist_service),
+    pool: WorkerPool = Depends(get_worker_pool),
+):
+    """Get all playlists, optionally paginated or streamed"""
+    after_id = decode_cursor(cursor, "after_id") if cursor else None
+    next_after_id = None
+    if limit is None:
+        playlists: Iterable[Playlist] = playlist_service.iter_playlists(after_id)
+    else:
+        playlists, next_after_id = playlist_service.get_playlists_page(limit, after_id)
+
+    if format == "ndjson":
+        streamed = ndjson_response(
+            playlists, lambda playlist: dump_playlist(playlist, include_songs)
+        )
+        if next_after_id is not None:
+            streamed.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                {"after_id": next_after_id}
+            )
+        return streamed
+
+    headers = {}
+    if next_after_id is not None:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor({"after_id": next_after_id})
+    # Serializing every playlist is heavy; keep it off the loop
+    return await pool.json_response(
+        lambda: dump_playlists(playlists, include_songs), headers=headers
+    )
+
+
+@router.get(
+    "/summaries",
+    response_model=List[PlaylistSummary],
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def get_playlist_summaries(
+    limit: Optional[int] = Query(
+        None, ge=1, le=10000, description="Page size; omit to list every playlist"
+    ),
+    cursor: Optional[str] = Query(
+        None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"
+    ),
+    format: Literal["json", "ndjson"] = Query(
+        "json", description="'ndjson' streams one playlist per line"
+    ),
+    playlist_service: PlaylistService = Depends(get_playlist_service),
+    pool: WorkerPool = Depends(get_worker_pool),
+):
+    """Get playlists' names, track counts and total durations, without their songs"""
+    after_id = decode_cursor(cursor, "after_id") if cursor else None
+    next_after_id = None
+    if limit is None:
+        playlists: Iterable[Playlist] = playlist_service.iter_playlists(after_id)
+    else:
+        playlists, next_after_id = playlist_service.get_playlists_page(limit, after_id)
+
+    headers = {}
+    if next_after_id is not None:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor({"after_id": next_after_id})
+    if format == "ndjson":
+        streamed = ndjson_response(playlists, dump_playlist_summary)
+        streamed.headers.update(headers)
+        return streamed
+    if limit is not None and limit <= INLINE_SUMMARY_LIMIT:
+        return Response(
+            dump_playlist_summaries(playlists),
+            media_type="application/json",
+            headers=headers,
+        )
+    return await pool.json_response(
+        lambda: dump_playlist_summaries(playlists), headers=headers
+    )
 
 
 @router.get("/{playlist_id}", response_model=PlaylistResponse)
-async def get_playlist(playlist_id: int):
+async def get_playlist(
+    playlist_id: int,
+    playlist_service: PlaylistService = Depends(get_playlist_service),
+    pool: WorkerPool = Depends(get_worker_pool),
+):
     """Get a specific playlist by ID"""
     playlist = playlist_service.get_playlist_by_id(playlist_id)
     if not playlist:
@@ -26,19 +154,165 @@ async def get_playlist(playlist_id: int):
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Playlist with ID {playlist_id} not found",
         )
-    return playlist
+    if playlist.song_count > INLINE_SONG_LIMIT:
+        return await pool.json_response(lambda: dump_playlist(playlist))
+    return Response(dump_playlist(playlist), media_type="application/json")
+
+
+@router.get("/{playlist_id}/songs", response_model=List[SongResponse])
+async def get_playlist_songs(
+    playlist_id: int,
+    limit: int = Query(100, ge=1, le=INLINE_SONG_LIMIT, description="Page size"),
+    cursor: Optional[str] = Query(
+        None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"
+    ),
+    playlist_service: PlaylistService = Depends(get_playlist_service),
+):
+    """Get a page of a playlist's songs, in playlist order
+
+    The cursor holds a track position, so tracks inserted or removed
+    before it between pages shift what the next page starts with.
+    """
+    offset = decode_cursor(cursor, "offset") if cursor else 0
+    if offset < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    playlist = playlist_service.get_playlist_by_id(playlist_id)
+    if not playlist:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Playlist with ID {playlist_id} not found",
+        )
+    headers = {}
+    if offset + limit < playlist.song_count:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor({"offset": offset + limit})
+    songs = playlist.song_slice(offset, offset + limit)
+    return Response(dump_songs(songs), media_type="application/json", headers=headers)
 
 
 @router.post("/", response_model=PlaylistResponse, status_code=status.HTTP_201_CREATED)
-async def create_playlist(playlist: PlaylistCreate):
+async def create_playlist(
+    playlist: PlaylistCreate,
+    playlist_service: PlaylistService = Depends(get_playlist_service),
+):
     """Create a new playlist"""
-    return playlist_service.create_playlist(playlist)
+    # Writes hit the database, so keep them off the event loop
+    return await run_in_threadpool(playlist_service.create_playlist, playlist)
+
+
+@router.post(
+    "/generate", response_model=PlaylistResponse, status_code=status.HTTP_201_CREATED
+)
+async def generate_playlist(
+    request: PlaylistGenerateRequest,
+    playlist_generator: PlaylistGenerator = Depends(get_playlist_generator),
+    pool: WorkerPool = Depends(get_worker_pool),
+):
+    """Generate a playlist close to a target duration from seed categories"""
+    try:
+        return await pool.run(playlist_generator.generate, request)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def _body_lines(request: Request) -> Iterator[Tuple[int, str]]:
+    """Split a streamed request body into numbered lines, from a worker thread
+
+    Each chunk is awaited on the event loop, so the body is read as one
+    stream in which CSV records may span lines. Lines keep their endings.
+    """
+    chunks = request.stream()
+
+    async def next_chunk() -> Optional[bytes]:
+        try:
+            return await chunks.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    buffer = b""
+    line_number = 0
+    while (chunk := from_thread.run(next_chunk)) is not None:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            yield line_number, line.decode("utf-8", errors="replace") + "\n"
+    if buffer:
+        yield line_number + 1, buffer.decode("utf-8", errors="replace")
+
+
+@router.post("/import", response_model=ImportReport)
+async def import_songs(
+    request: Request,
+    format: Literal["ndjson", "csv"] = Query(
+        "ndjson", description="Body format; CSV needs a header line"
+    ),
+    playlist_id: Optional[int] = Query(
+        None, description="Playlist to append to; a new one is created if omitted"
+    ),
+    name: str = Query(
+        "Imported songs", min_length=1, max_length=100, description="New playlist name"
+    ),
+    batch_size: int = Query(5000, ge=1, le=100000, description="Rows per batch"),
+    playlist_service: PlaylistService = Depends(get_playlist_service),
+    pool: WorkerPool = Depends(get_worker_pool),
+):
+    """Bulk import songs streamed in the request body as NDJSON or CSV
+
+    Invalid rows are reported and skipped; they do not stop the import.
+    Without `playlist_id`, the playlist is created with the first valid
+    rows. 409 means the playlist was deleted before the import finished.
+    """
+    # Imports are admitted through the worker pool so a saturated server
+    # turns them away before any rows are written
+    try:
+        importer = await pool.run(
+            ImportService, playlist_service, format, playlist_id, name, batch_size
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+    # Once admitted, the import runs in the shared threadpool so it is never
+    # rejected halfway through
+    try:
+        await run_in_threadpool(importer.import_lines, _body_lines(request))
+    except ImportAborted as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return importer.report()
 
 
 @router.put("/{playlist_id}", response_model=PlaylistResponse)
-async def update_playlist(playlist_id: int, playlist: PlaylistUpdate):
+async def update_playlist(
+    playlist_id: int,
+    playlist: PlaylistUpdate,
+    playlist_service: PlaylistService = Depends(get_playlist_service),
+):
     """Update an existing playlist"""
-    updated_playlist = playlist_service.update_playlist(playlist_id, playlist)
+    updated_playlist = await run_in_threadpool(
+        playlist_service.update_playlist, playlist_id, playlist
+    )
+    if not updated_playlist:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Playlist with ID {playlist_id} not found",
+        )
+    return updated_playlist
+
+
+@router.patch("/{playlist_id}/songs", response_model=PlaylistResponse)
+async def patch_playlist_songs(
+    playlist_id: int,
+    patch: PlaylistSongsPatch,
+    playlist_service: PlaylistService = Depends(get_playlist_service),
+):
+    """Insert, remove, move or replace individual tracks of a playlist"""
+    try:
+        updated_playlist = await run_in_threadpool(
+            playlist_service.patch_playlist_songs, playlist_id, patch.operations
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     if not updated_playlist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -48,9 +322,11 @@ async def update_playlist(playlist_id: int, playlist: PlaylistUpdate):
 
 
 @router.delete("/{playlist_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_playlist(playlist_id: int):
+async def delete_playlist(
+    playlist_id: int, playlist_service: PlaylistService = Depends(get_playlist_service)
+):
     """Delete a playlist"""
-    success = playlist_service.delete_playlist(playlist_id)
+    success = await run_in_threadpool(playlist_service.delete_playlist, playlist_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
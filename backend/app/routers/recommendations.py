@@ -1,26 +1,172 @@
 """
 Recommendation router endpoints
 """
-from fastapi import APIRouter, Query
-from app.schemas.recommendation import RecommendationRequest, RecommendationResponse
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from typing import Dict, Hashable, List, Optional
+from app.cache import ResponseCache, cached_json_response
+from app.dependencies import (
+    get_playlist_service,
+    get_recommendation_service,
+    get_response_cache,
+    get_similarity_service,
+    get_worker_pool,
+)
+from app.schemas.recommendation import (
+    BatchRecommendationRequest,
+    BatchRecommendationResponse,
+    RecommendationRequest,
+    RecommendationResponse,
+    SimilarSongsResponse,
+)
+from app.services.playlist_service import PlaylistService
 from app.services.recommendation_service import RecommendationService
+from app.services.similarity_service import SimilarityService
+from app.worker_pool import WorkerPool
 
 router = APIRouter()
-recommendation_service = RecommendationService()
+
+
+def _require_playlist(playlist_service: PlaylistService, playlist_id: Optional[int]):
+    """Raise 404 if a seed playlist was given but does not exist"""
+    if (
+        playlist_id is not None
+        and playlist_service.get_playlist_by_id(playlist_id) is None
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Playlist with ID {playlist_id} not found",
+        )
+
+
+def _cache_key(request: RecommendationRequest) -> Hashable:
+    """Response cache key shared by GET and batch requests"""
+    return (
+        "recommendations",
+        request.category.lower() if request.category else None,
+        request.playlist_id,
+        request.limit,
+    )
 
 
 @router.post("/", response_model=RecommendationResponse)
-async def get_recommendations(request: RecommendationRequest):
-    """Get song recommendations based on category"""
-    return recommendation_service.get_recommendations(request)
+async def get_recommendations(
+    request: RecommendationRequest,
+    recommendation_service: RecommendationService = Depends(get_recommendation_service),
+    playlist_service: PlaylistService = Depends(get_playlist_service),
+    pool: WorkerPool = Depends(get_worker_pool),
+):
+    """Get song recommendations based on a seed playlist or category"""
+    _require_playlist(playlist_service, request.playlist_id)
+    return await pool.run(recommendation_service.get_recommendations, request)
 
 
 @router.get("/", response_model=RecommendationResponse)
 async def get_recommendations_get(
-    category: str = Query(None, description="Category name (e.g., pop, sad, artist name)"),
-    limit: int = Query(5, description="Number of recommendations", ge=1, le=20)
+    http_request: Request,
+    category: str = Query(
+        None, description="Category name (e.g., pop, sad, artist name)"
+    ),
+    playlist_id: Optional[int] = Query(
+        None, description="Seed playlist for co-occurrence recommendations"
+    ),
+    limit: int = Query(5, description="Number of recommendations", ge=1, le=20),
+    recommendation_service: RecommendationService = Depends(get_recommendation_service),
+    playlist_service: PlaylistService = Depends(get_playlist_service),
+    cache: ResponseCache = Depends(get_response_cache),
+    pool: WorkerPool = Depends(get_worker_pool),
+):
+    """Get song recommendations based on a seed playlist or category (GET endpoint)"""
+    _require_playlist(playlist_service, playlist_id)
+    request = RecommendationRequest(
+        category=category, playlist_id=playlist_id, limit=limit
+    )
+    return await cached_json_response(
+        http_request,
+        cache,
+        _cache_key(request),
+        recommendation_service.cache_version(request),
+        lambda: recommendation_service.get_recommendations(request),
+        pool,
+    )
+
+
+@router.post("/batch", response_model=BatchRecommendationResponse)
+async def get_batch_recommendations(
+    batch: BatchRecommendationRequest,
+    recommendation_service: RecommendationService = Depends(get_recommendation_service),
+    playlist_service: PlaylistService = Depends(get_playlist_service),
+    cache: ResponseCache = Depends(get_response_cache),
+    pool: WorkerPool = Depends(get_worker_pool),
 ):
-    """Get song recommendations based on category (GET endpoint)"""
-    request = RecommendationRequest(category=category, limit=limit)
-    return recommendation_service.get_recommendations(request)
+    """Get recommendations for several categories or seed playlists in one call
+
+    Results shared with GET requests come from the response cache; the rest
+    are computed together from one catalog snapshot. The response is
+    assembled from the serialized results without re-encoding them.
+    """
+    for request in batch.requests:
+        _require_playlist(playlist_service, request.playlist_id)
+    keys = [_cache_key(request) for request in batch.requests]
+    versions: Dict[Hashable, int] = {}
+    bodies: Dict[Hashable, bytes] = {}
+    misses: Dict[Hashable, RecommendationRequest] = {}
+    for key, request in zip(keys, batch.requests):
+        if key in bodies or key in misses:
+            continue
+        versions[key] = recommendation_service.cache_version(request)
+        entry = cache.get(key, versions[key])
+        if entry is None:
+            misses[key] = request
+        else:
+            bodies[key] = entry.body
+    if misses:
+
+        def build() -> List[bytes]:
+            responses = recommendation_service.get_batch_recommendations(
+                list(misses.values())
+            )
+            return [response.model_dump_json().encode() for response in responses]
 
+        for key, body in zip(misses, await pool.run(build)):
+            bodies[key] = cache.set(key, versions[key], body).body
+    content = b'{"results":[%s],"count":%d}' % (
+        b",".join(bodies[key] for key in keys),
+        len(keys),
+    )
+    return Response(content=content, media_type="application/json")
+
+
+@router.get("/similar/{song_id}", response_model=SimilarSongsResponse)
+async def get_similar_songs(
+    song_id: int,
+    limit: int = Query(5, description="Number of similar songs", ge=1, le=50),
+    nprobe: Optional[int] = Query(
+        None, ge=1, description="Clusters to search; higher is slower but more accurate"
+    ),
+    similarity_service: SimilarityService = Depends(get_similarity_service),
+    pool: WorkerPool = Depends(get_worker_pool),
+):
+    """Get songs similar to a given song"""
+    result = await pool.run(
+        similarity_service.get_similar_songs, song_id, limit, nprobe
+    )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Song with ID {song_id} not found",
+        )
+    song, similar_songs = result
+    return SimilarSongsResponse(
+        song=song,
+        similar_songs=similar_songs,
+        count=len(similar_songs),
+    )
@@ -0,0 +1,21 @@
+"""
+Search router endpoints
+"""
+
+from fastapi import APIRouter, Depends, Query
+from app.dependencies import get_search_service
+from app.schemas.search import SearchResponse
+from app.services.search_service import SearchService
+
+router = APIRouter()
+
+
+@router.get("/", response_model=SearchResponse)
+async def search_songs(
+    q: str = Query(..., min_length=1, max_length=200, description="Search text"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of results"),
+    search_service: SearchService = Depends(get_search_service),
+):
+    """Search song titles and artists by word prefixes"""
+    results = search_service.search(q, limit)
+    return SearchResponse(query=q, results=results, count=len(results))
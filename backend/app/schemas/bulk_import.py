@@ -0,0 +1,30 @@
+"""
+Pydantic schemas for bulk song imports
+"""
+
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+
+class ImportRowError(BaseModel):
+    """Schema for a row that could not be imported"""
+
+    line: int = Field(..., description="1-based line number in the input")
+    error: str = Field(..., description="Why the row was rejected")
+
+
+class ImportReport(BaseModel):
+    """Schema for the outcome of a bulk import"""
+
+    playlist_id: Optional[int] = Field(
+        None,
+        description="Playlist the songs were added to; null if no row was valid"
+        " and no playlist was given",
+    )
+    rows_imported: int = Field(0, description="Number of songs imported")
+    rows_failed: int = Field(0, description="Number of rejected rows")
+    errors: List[ImportRowError] = Field(
+        default_factory=list, description="Rejected rows, capped at max_errors"
+    )
+    elapsed_seconds: float = Field(0.0, description="Wall-clock import time")
+    rows_per_second: float = Field(0.0, description="Import throughput")
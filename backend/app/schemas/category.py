@@ -3,7 +3,7 @@ Pydantic schemas for Category models
 """
 
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 from app.schemas.playlist import SongResponse
 
 
@@ -26,3 +26,36 @@ class CategoryListResponse(BaseModel):
 
     categories: List[CategoryResponse] = Field(default_factory=list)
     total: int = Field(..., description="Total number of categories")
+    next_cursor: Optional[str] = Field(
+        None, description="Cursor for the next page, if there is one"
+    )
+
+
+class ArtistSongCount(BaseModel):
+    """Schema for an artist's song count within a genre"""
+
+    name: str = Field(..., description="Normalized (lowercased) artist name")
+    song_count: int = Field(..., description="Songs of the genre by this artist")
+
+
+class GenreStats(BaseModel):
+    """Schema for one genre's aggregate statistics"""
+
+    name: str = Field(..., description="Normalized (lowercased) genre name")
+    song_count: int = Field(..., description="Number of songs in the genre")
+    total_duration: int = Field(..., description="Total duration in seconds")
+    average_duration: Optional[float] = Field(
+        None, description="Average duration in seconds of songs that have one"
+    )
+    distinct_artists: int = Field(..., description="Number of different artists")
+    top_artists: List[ArtistSongCount] = Field(
+        default_factory=list, description="Artists with the most songs, most first"
+    )
+
+
+class CategoryStatsResponse(BaseModel):
+    """Schema for per-genre statistics"""
+
+    genres: List[GenreStats] = Field(
+        default_factory=list, description="Genres, largest first"
+    )
@@ -0,0 +1,57 @@
+"""
+Pydantic schemas for the catalog change feed
+"""
+
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from app.schemas.playlist import PlaylistResponse, SongResponse
+
+
+class LoggedTrackOperation(BaseModel):
+    """Schema for one track-level edit of a logged patch"""
+
+    op: Literal["insert", "remove", "move", "replace"] = Field(
+        ..., description="Operation applied"
+    )
+    position: int = Field(..., description="Position the operation applied to")
+    to_position: Optional[int] = Field(
+        None, description="Destination position of a 'move'"
+    )
+    song: Optional[SongResponse] = Field(
+        None, description="Song an 'insert' or 'replace' put in place"
+    )
+
+
+class ChangeRecord(BaseModel):
+    """Schema for one logged catalog change"""
+
+    seq: int = Field(
+        ..., description="Sequence number, one higher than the last change"
+    )
+    op: Literal["create", "update", "append", "patch", "delete"] = Field(
+        ..., description="Kind of write"
+    )
+    playlist_id: int = Field(..., description="ID of the playlist written")
+    at: datetime = Field(..., description="Time of the write, in UTC")
+    playlist: Optional[PlaylistResponse] = Field(
+        None, description="The whole playlist after a create or update"
+    )
+    position: Optional[int] = Field(
+        None, description="Position of the first song an append added"
+    )
+    songs: Optional[List[SongResponse]] = Field(
+        None, description="Songs an append added"
+    )
+    operations: Optional[List[LoggedTrackOperation]] = Field(
+        None, description="Track-level edits a patch applied, in order"
+    )
+
+
+class ChangeFeedResponse(BaseModel):
+    """Schema for a page of the change feed"""
+
+    changes: List[ChangeRecord] = Field(default_factory=list)
+    last_seq: int = Field(
+        ..., description="Pass as `since` to get the changes after this page"
+    )
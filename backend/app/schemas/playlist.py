@@ -2,10 +2,13 @@
 Pydantic schemas for Playlist models
 """
 
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, List, Literal, Optional
 from datetime import datetime
 
+# Song durations are stored in 32-bit columns (SongColumns, catalog snapshots)
+MAX_SONG_DURATION = 2**31 - 1
+
 
 class SongBase(BaseModel):
     """Base song schema"""
@@ -15,7 +18,9 @@ class SongBase(BaseModel):
     genre: Optional[str] = Field(
         None, description="Song genre/category (e.g., pop, rock, sad)"
     )
-    duration: Optional[int] = Field(None, description="Duration in seconds")
+    duration: Optional[int] = Field(
+        None, ge=0, le=MAX_SONG_DURATION, description="Duration in seconds"
+    )
 
 
 class SongCreate(SongBase):
@@ -62,13 +67,97 @@ class PlaylistUpdate(BaseModel):
     songs: Optional[List[SongCreate]] = Field(None, description="List of songs")
 
 
+class TrackOperation(BaseModel):
+    """Schema for a single track-level edit of a playlist"""
+
+    op: Literal["insert", "remove", "move", "replace"] = Field(
+        ..., description="Operation to apply"
+    )
+    position: int = Field(..., ge=0, description="Position the operation applies to")
+    to_position: Optional[int] = Field(
+        None, ge=0, description="Destination position for 'move'"
+    )
+    song: Optional[SongCreate] = Field(
+        None, description="Song to add for 'insert' and 'replace'"
+    )
+
+    @model_validator(mode="after")
+    def check_operands(self):
+        if self.op in ("insert", "replace") and self.song is None:
+            raise ValueError(f"'{self.op}' requires a song")
+        if self.op == "move" and self.to_position is None:
+            raise ValueError("'move' requires to_position")
+        return self
+
+
+class PlaylistSongsPatch(BaseModel):
+    """Schema for applying track-level edits to a playlist"""
+
+    operations: List[TrackOperation] = Field(
+        ..., min_length=1, description="Operations, applied in order"
+    )
+
+
 class PlaylistResponse(PlaylistBase):
     """Schema for playlist response"""
 
     id: int
     songs: List[SongResponse] = Field(default_factory=list)
+    song_count: int = Field(0, description="Number of songs in the playlist")
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class PlaylistSummary(PlaylistBase):
+    """Schema for a playlist listed without its songs"""
+
+    id: int
+    song_count: int = Field(..., description="Number of songs in the playlist")
+    total_duration: int = Field(
+        ..., description="Total duration in seconds; songs without one count as 0"
+    )
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class PlaylistGenerateRequest(BaseModel):
+    """Schema for generating a playlist from the catalog"""
+
+    name: str = Field(
+        "Generated playlist", description="Playlist name", min_length=1, max_length=100
+    )
+    description: Optional[str] = Field(
+        None, description="Playlist description", max_length=500
+    )
+    seed_categories: List[str] = Field(
+        ..., min_length=1, description="Genres or artists to draw songs from"
+    )
+    target_duration: int = Field(
+        ..., ge=1, le=86400, description="Target total duration in seconds"
+    )
+    max_tracks_per_artist: Optional[int] = Field(
+        None, ge=1, description="Maximum number of songs by any one artist"
+    )
+    allow_repeats: bool = Field(
+        False, description="Allow the same title and artist more than once"
+    )
+    genre_mix: Optional[Dict[str, float]] = Field(
+        None,
+        description="Share of the target duration per genre, e.g. {'pop': 2, 'rock': 1}",
+    )
+    seed: Optional[int] = Field(None, description="Random seed for reproducible picks")
+
+    @model_validator(mode="after")
+    def check_genre_mix(self):
+        if self.genre_mix is not None:
+            if not self.genre_mix or any(
+                ratio <= 0 for ratio in self.genre_mix.values()
+            ):
+                raise ValueError("genre_mix ratios must be positive")
+        return self
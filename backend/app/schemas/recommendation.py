@@ -13,6 +13,10 @@ class RecommendationRequest(BaseModel):
     category: Optional[str] = Field(
         None, description="Category name (e.g., pop, sad, artist name)"
     )
+    playlist_id: Optional[int] = Field(
+        None,
+        description="Seed playlist; recommends songs that often share playlists with its songs",
+    )
     limit: Optional[int] = Field(
         5, description="Number of recommendations", ge=1, le=20
     )
@@ -28,3 +32,30 @@ class RecommendationResponse(BaseModel):
         default_factory=list, description="Recommended songs"
     )
     count: int = Field(..., description="Number of recommendations")
+
+
+class BatchRecommendationRequest(BaseModel):
+    """Schema for several recommendation requests answered together"""
+
+    requests: List[RecommendationRequest] = Field(
+        ..., min_length=1, max_length=50, description="Recommendation requests"
+    )
+
+
+class BatchRecommendationResponse(BaseModel):
+    """Schema for batch recommendation results"""
+
+    results: List[RecommendationResponse] = Field(
+        default_factory=list, description="One result per request, in request order"
+    )
+    count: int = Field(..., description="Number of results")
+
+
+class SimilarSongsResponse(BaseModel):
+    """Schema for songs similar to a given song"""
+
+    song: SongResponse = Field(..., description="Song the results are similar to")
+    similar_songs: List[SongResponse] = Field(
+        default_factory=list, description="Most similar songs, best first"
+    )
+    count: int = Field(..., description="Number of similar songs")
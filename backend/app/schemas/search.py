@@ -0,0 +1,17 @@
+"""
+Pydantic schemas for search
+"""
+
+from pydantic import BaseModel, Field
+from typing import List
+from app.schemas.playlist import SongResponse
+
+
+class SearchResponse(BaseModel):
+    """Schema for song search results"""
+
+    query: str = Field(..., description="Query the results match")
+    results: List[SongResponse] = Field(
+        default_factory=list, description="Matching songs, best first"
+    )
+    count: int = Field(..., description="Number of results")
@@ -0,0 +1,131 @@
+"""
+Fast JSON encoding of songs, playlists and categories for large responses
+
+Models are turned into plain dicts in the field order of SongResponse,
+PlaylistResponse, PlaylistSummary and CategoryResponse and encoded with pydantic-core's
+serializer. That yields the same bytes the response models would, without
+validating every song into a model first. The data was validated when it
+entered the catalog.
+"""
+
+from typing import Iterable, Mapping, Optional, Sequence, Tuple
+from pydantic_core import to_json
+from app.metrics import timed
+from app.models.playlist import Playlist, Song
+
+# Songs are encoded in chunks because each encoder call holds the GIL until
+# it returns, which would stall the event loop thread on large lists
+CHUNK_SIZE = 1024
+
+
+@timed("dump_songs", "encode")
+def dump_songs(songs: Sequence[Song]) -> bytes:
+    """Encode songs as a JSON array of SongResponse"""
+    chunks = []
+    for start in range(0, len(songs), CHUNK_SIZE):
+        chunk = to_json(
+            [
+                {
+                    "title": song.title,
+                    "artist": song.artist,
+                    "genre": song.genre,
+                    "duration": song.duration,
+                    "id": song.id,
+                }
+                for song in songs[start : start + CHUNK_SIZE]
+            ]
+        )
+        # Strip each chunk's brackets so the pieces join into one array
+        chunks.append(chunk[1:-1])
+    return b"[" + b",".join(chunks) + b"]"
+
+
+@timed("dump_playlist", "encode")
+def dump_playlist(playlist: Playlist, include_songs: bool = True) -> bytes:
+    """Encode a playlist as PlaylistResponse, optionally leaving out its songs"""
+    head = to_json(
+        {"name": playlist.name, "description": playlist.description, "id": playlist.id}
+    )
+    tail = to_json(
+        {
+            "song_count": playlist.song_count,
+            "created_at": playlist.created_at,
+            "updated_at": playlist.updated_at,
+        }
+    )
+    songs = dump_songs(playlist.songs) if include_songs else b"[]"
+    return head[:-1] + b',"songs":' + songs + b"," + tail[1:]
+
+
+@timed("dump_playlists", "encode")
+def dump_playlists(playlists: Iterable[Playlist], include_songs: bool = True) -> bytes:
+    """Encode playlists as a JSON array of PlaylistResponse"""
+    return (
+        b"["
+        + b",".join(dump_playlist(playlist, include_songs) for playlist in playlists)
+        + b"]"
+    )
+
+
+def _summary_fields(playlist: Playlist) -> dict:
+    return {
+        "name": playlist.name,
+        "description": playlist.description,
+        "id": playlist.id,
+        "song_count": playlist.song_count,
+        "total_duration": playlist.total_duration,
+        "created_at": playlist.created_at,
+        "updated_at": playlist.updated_at,
+    }
+
+
+@timed("dump_playlist_summary", "encode")
+def dump_playlist_summary(playlist: Playlist) -> bytes:
+    """Encode a playlist as PlaylistSummary, without reading its songs"""
+    return to_json(_summary_fields(playlist))
+
+
+@timed("dump_playlist_summaries", "encode")
+def dump_playlist_summaries(playlists: Iterable[Playlist]) -> bytes:
+    """Encode playlists as a JSON array of PlaylistSummary"""
+    chunks = []
+    batch = []
+    for playlist in playlists:
+        batch.append(_summary_fields(playlist))
+        if len(batch) == CHUNK_SIZE:
+            chunks.append(to_json(batch)[1:-1])
+            batch = []
+    if batch:
+        chunks.append(to_json(batch)[1:-1])
+    return b"[" + b",".join(chunks) + b"]"
+
+
+@timed("dump_category", "encode")
+def dump_category(
+    name: str,
+    category_type: str,
+    songs: Mapping[int, Song],
+    include_songs: bool = True,
+) -> bytes:
+    """Encode a category index bucket as CategoryResponse"""
+    if not include_songs:
+        # Counting needs no copy of the songs, which a shared catalog builds
+        head = to_json({"name": name, "type": category_type, "song_count": len(songs)})
+        return head[:-1] + b',"songs":[]}'
+    # One copy of the bucket, which writers update in place, for both fields
+    song_list = list(songs.values())
+    head = to_json({"name": name, "type": category_type, "song_count": len(song_list)})
+    return head[:-1] + b',"songs":' + dump_songs(song_list) + b"}"
+
+
+@timed("dump_category_list", "encode")
+def dump_category_list(
+    buckets: Iterable[Tuple[str, str, Mapping[int, Song]]],
+    total: int,
+    next_cursor: Optional[str],
+    include_songs: bool = True,
+) -> bytes:
+    """Encode category index buckets as CategoryListResponse"""
+    categories = [dump_category(*bucket, include_songs) for bucket in buckets]
+    tail = to_json({"total": total, "next_cursor": next_cursor})
+    return b'{"categories":[' + b",".join(categories) + b"]," + tail[1:]
@@ -0,0 +1,188 @@
+"""
+Approximate nearest-neighbour search with an inverted-file (IVF) index
+"""
+
+import os
+from typing import List, Optional, Set, Tuple
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+class _InvertedList:
+    """Growable arrays of IDs and vectors for one cluster"""
+
+    def __init__(self, dim: int):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.size = 0
+
+    def extend(self, ids: np.ndarray, vectors: np.ndarray):
+        needed = self.size + len(ids)
+        if needed > len(self.ids):
+            # Grow geometrically so repeated small inserts stay amortized O(1)
+            capacity = max(needed, 2 * len(self.ids), 16)
+            self.ids = np.resize(self.ids, capacity)
+            grown = np.empty((capacity, self.vectors.shape[1]), dtype=np.float32)
+            grown[: self.size] = self.vectors[: self.size]
+            self.vectors = grown
+        self.ids[self.size : needed] = ids
+        self.vectors[self.size : needed] = vectors
+        self.size = needed
+
+
+class IVFIndex:
+    """Cosine-similarity IVF index over unit-length float32 vectors
+
+    Vectors are assigned to the nearest of `nlist` k-means centroids; a
+    query scans only the `nprobe` closest clusters. Raising nprobe trades
+    latency for recall, and nprobe == nlist is an exact search. Removed
+    IDs are tombstoned and dropped when the index is compacted or saved,
+    or when one of them is added again.
+    """
+
+    def __init__(self, centroids: np.ndarray):
+        self.centroids = centroids.astype(np.float32)
+        self.dim = centroids.shape[1]
+        self.lists = [_InvertedList(self.dim) for _ in range(len(centroids))]
+        self.removed: Set[int] = set()
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    def __len__(self) -> int:
+        return sum(inverted.size for inverted in self.lists) - len(self.removed)
+
+    @classmethod
+    def train(
+        cls,
+        vectors: np.ndarray,
+        nlist: int,
+        iterations: int = 10,
+        sample_size: int = 50_000,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """Fit centroids with spherical k-means on a sample of the vectors"""
+        rng = np.random.default_rng(seed)
+        if len(vectors) > sample_size:
+            vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        nlist = max(1, min(nlist, len(vectors)))
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Keep the previous centroid for clusters that lost all their points
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        return cls(centroids)
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray, chunk_size: int = 65_536):
+        """Insert vectors, assigning each to its nearest centroid
+
+        IDs must not be in the index, unless they were removed: the old
+        vectors of removed IDs are dropped first, so each ID is stored once.
+        """
+        if not self.removed.isdisjoint(ids.tolist()):
+            self.compact()
+        for start in range(0, len(ids), chunk_size):
+            chunk_ids = ids[start : start + chunk_size]
+            chunk = vectors[start : start + chunk_size]
+            assignments = np.argmax(chunk @ self.centroids.T, axis=1)
+            order = np.argsort(assignments, kind="stable")
+            bounds = np.searchsorted(assignments[order], np.arange(self.nlist + 1))
+            for cluster in np.flatnonzero(np.diff(bounds)):
+                rows = order[bounds[cluster] : bounds[cluster + 1]]
+                self.lists[cluster].extend(chunk_ids[rows], chunk[rows])
+
+    def remove(self, ids: List[int]):
+        """Tombstone IDs so searches skip them, compacting once they pile up"""
+        self.removed.update(ids)
+        if len(self.removed) * 4 > sum(inverted.size for inverted in self.lists):
+            self.compact()
+
+    def search(self, query: np.ndarray, k: int, nprobe: int) -> List[Tuple[int, float]]:
+        """Get up to k (id, similarity) pairs, most similar first"""
+        nprobe = max(1, min(nprobe, self.nlist))
+        centroid_scores = self.centroids @ query
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        ids = []
+        scores = []
+        for cluster in probes:
+            inverted = self.lists[cluster]
+            if inverted.size:
+                ids.append(inverted.ids[: inverted.size])
+                scores.append(inverted.vectors[: inverted.size] @ query)
+        if not ids:
+            return []
+        ids = np.concatenate(ids)
+        scores = np.concatenate(scores)
+        # Over-fetch so tombstoned IDs do not leave the result short
+        wanted = min(len(scores), k + len(self.removed))
+        if wanted < len(scores):
+            top = np.argpartition(-scores, wanted - 1)[:wanted]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        results = [
+            (song_id, score)
+            for song_id, score in zip(ids[top].tolist(), scores[top].tolist())
+            if song_id not in self.removed
+        ]
+        return results[:k]
+
+    def compact(self):
+        """Physically drop tombstoned vectors"""
+        if not self.removed:
+            return
+        removed = np.fromiter(self.removed, dtype=np.int64)
+        for inverted in self.lists:
+            keep = ~np.isin(inverted.ids[: inverted.size], removed)
+            ids = inverted.ids[: inverted.size][keep]
+            vectors = inverted.vectors[: inverted.size][keep]
+            inverted.size = 0
+            inverted.extend(ids, vectors)
+        self.removed.clear()
+
+    def save(self, path: str, metadata: Optional[dict] = None):
+        """Write the index to an .npz file, replacing any previous one atomically"""
+        self.compact()
+        sizes = np.array([inverted.size for inverted in self.lists], dtype=np.int64)
+        ids = [inverted.ids[: inverted.size] for inverted in self.lists]
+        vectors = [inverted.vectors[: inverted.size] for inverted in self.lists]
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            format_version=FORMAT_VERSION,
+            centroids=self.centroids,
+            sizes=sizes,
+            ids=np.concatenate(ids) if ids else np.empty(0, dtype=np.int64),
+            vectors=(
+                np.concatenate(vectors)
+                if vectors
+                else np.empty((0, self.dim), dtype=np.float32)
+            ),
+            **{f"meta_{key}": value for key, value in (metadata or {}).items()},
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["IVFIndex", dict]:
+        """Read an index written by save, returning it with its metadata"""
+        with np.load(path) as data:
+            if int(data["format_version"]) != FORMAT_VERSION:
+                raise ValueError(f"Unsupported index format in {path}")
+            index = cls(data["centroids"])
+            offsets = np.concatenate(([0], np.cumsum(data["sizes"])))
+            ids = data["ids"]
+            vectors = data["vectors"]
+            for cluster, inverted in enumerate(index.lists):
+                rows = slice(offsets[cluster], offsets[cluster + 1])
+                inverted.extend(ids[rows], vectors[rows])
+            metadata = {
+                key[len("meta_") :]: data[key].item()
+                for key in data.files
+                if key.startswith("meta_")
+            }
+        return index, metadata
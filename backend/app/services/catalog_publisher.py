@@ -0,0 +1,207 @@
+"""
+Catalog publisher - writes the writer process's catalog out for reader processes,
+and checkpoints it so the change log can be compacted
+"""
+
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Optional
+from app.models.catalog_file import CatalogFile, encode_catalog, write_catalog
+from app.services.change_log import ChangeLog
+from app.services.playlist_service import PlaylistService
+from app.services.shared_catalog import generation_file_name, set_current
+
+logger = logging.getLogger(__name__)
+
+_GENERATION_FILE = re.compile(r"catalog-(\d+)\.bin$")
+
+
+def save_snapshot(
+    playlist_service: PlaylistService, path: str, generation: int = 0
+) -> int:
+    """Write a consistent snapshot of the catalog to a catalog file
+
+    The write lock is held only to take the playlists and the song IDs in
+    each genre and artist bucket; encoding and writing the file happen
+    after it is released. With a change log, the snapshot records the
+    sequence number of the last change it holds as `change_seq`. Returns
+    the catalog version that was written.
+    """
+    with playlist_service.locked_snapshot() as catalog:
+        version = playlist_service.version
+        change_seq = playlist_service.change_seq
+        playlists = list(catalog.playlists.values())
+        # Buckets are updated in place, so copy their song IDs; playlists
+        # are never modified and are encoded from the references
+        genre_index = {
+            name: list(bucket) for name, bucket in catalog.genre_index.items()
+        }
+        artist_index = {
+            name: list(bucket) for name, bucket in catalog.artist_index.items()
+        }
+    columns = encode_catalog(playlists, genre_index, artist_index)
+    metadata = {}
+    if change_seq is not None:
+        metadata["change_seq"] = change_seq
+    write_catalog(
+        path,
+        columns,
+        generation=generation,
+        catalog_version=version,
+        saved_at=datetime.now().isoformat(),
+        **metadata,
+    )
+    return version
+
+
+def checkpoint(
+    playlist_service: PlaylistService, change_log: ChangeLog, path: str
+) -> int:
+    """Save a snapshot, then compact the change log up to the changes it holds
+
+    Returns the number of log segments deleted.
+    """
+    save_snapshot(playlist_service, path)
+    return change_log.compact(snapshot_change_seq(path))
+
+
+def snapshot_change_seq(path: str) -> Optional[int]:
+    """The last change held by the snapshot at `path`, or None if there is none"""
+    try:
+        return CatalogFile(path).metadata.get("change_seq")
+    except (OSError, ValueError):
+        return None
+
+
+class CatalogPublisher:
+    """Publishes the catalog as numbered generations of a shared catalog file
+
+    A background thread checks the catalog version every `interval`
+    seconds. When it has moved, the catalog is encoded outside the write
+    lock (see save_snapshot), written to a new generation file and CURRENT is repointed at it.
+    Superseded generations beyond the newest `keep` are unlinked; readers
+    that still have one mapped keep it until they move on.
+    """
+
+    def __init__(
+        self,
+        playlist_service: PlaylistService,
+        directory: str,
+        interval: float = 0.2,
+        keep: int = 2,
+    ):
+        self.playlist_service = playlist_service
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+        # Continue numbering after whatever an earlier run left behind
+        self.generation = max(
+            (
+                int(match.group(1))
+                for match in map(_GENERATION_FILE.match, os.listdir(directory))
+                if match
+            ),
+            default=0,
+        )
+        self.published_version: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self) -> int:
+        """Publish the current catalog as a new generation and return its number"""
+        generation = self.generation + 1
+        name = generation_file_name(generation)
+        version = save_snapshot(
+            self.playlist_service, os.path.join(self.directory, name), generation
+        )
+        set_current(self.directory, name)
+        self.generation = generation
+        self.published_version = version
+        self._remove_old_generations()
+        return generation
+
+    def _remove_old_generations(self):
+        for name in os.listdir(self.directory):
+            match = _GENERATION_FILE.match(name)
+            if match and int(match.group(1)) <= self.generation - self.keep:
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if self.playlist_service.version != self.published_version:
+                try:
+                    self.publish()
+                except Exception:
+                    # Readers keep the last generation; retry on the next tick
+                    logger.exception("Publishing the catalog failed")
+
+    def start(self):
+        """Publish now, then keep publishing in the background as the catalog changes"""
+        self.publish()
+        self._thread = threading.Thread(
+            target=self._run, name="catalog-publisher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class LogCheckpointer:
+    """Keeps the change log short by checkpointing the catalog in the background
+
+    Every `interval` seconds, once more sealed segments have piled up than
+    the log retains, the catalog is saved to the snapshot at `path` and the
+    segments it covers are deleted. Replaying that snapshot plus the log
+    then only reads the retained segments and the one being written.
+    """
+
+    def __init__(
+        self,
+        playlist_service: PlaylistService,
+        change_log: ChangeLog,
+        path: str,
+        interval: float = 60.0,
+    ):
+        self.playlist_service = playlist_service
+        self.change_log = change_log
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def checkpoint(self) -> int:
+        return checkpoint(self.playlist_service, self.change_log, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if self.change_log.sealed_segments > self.change_log.retain_segments:
+                try:
+                    self.checkpoint()
+                except Exception:
+                    # Nothing is compacted without a snapshot; retry on the next tick
+                    logger.exception("Checkpointing the catalog failed")
+
+    def start(self):
+        """Checkpoint now unless the snapshot can be replayed, then keep checkpointing"""
+        change_seq = snapshot_change_seq(self.path)
+        if change_seq is None or change_seq + 1 < self.change_log.first_seq:
+            self.checkpoint()
+        self._thread = threading.Thread(
+            target=self._run, name="log-checkpointer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
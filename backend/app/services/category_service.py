@@ -1,7 +1,9 @@
 """
 Category service - business logic for categorizing songs
 """
-from typing import List, Dict, Optional
+import itertools
+from typing import Iterator, List, Mapping, Optional, Tuple
+from app.metrics import timed
 from app.models.playlist import Song
 from app.services.playlist_service import PlaylistService
 from app.schemas.category import CategoryResponse
@@ -10,82 +12,68 @@ from app.schemas.category import CategoryResponse
 class CategoryService:
     """Service for managing song categories"""
     
-    def __init__(self):
-        self.playlist_service = PlaylistService()
+    def __init__(self, playlist_service: PlaylistService):
+        self.playlist_service = playlist_service
     
-    def get_all_categories(self) -> List[CategoryResponse]:
-        """Get all categories (genres and artists) from all playlists"""
-        # Collect all songs from all playlists
-        all_songs: List[Song] = []
-        for playlist in self.playlist_service.get_all_playlists():
-            all_songs.extend(playlist.songs)
-        
-        # Group by genre
-        genre_categories: Dict[str, List[Song]] = {}
-        for song in all_songs:
-            if song.genre:
-                genre = song.genre.lower()
-                if genre not in genre_categories:
-                    genre_categories[genre] = []
-                genre_categories[genre].append(song)
-        
-        # Group by artist
-        artist_categories: Dict[str, List[Song]] = {}
-        for song in all_songs:
-            artist = song.artist.lower()
-            if artist not in artist_categories:
-                artist_categories[artist] = []
-            artist_categories[artist].append(song)
-        
-        # Build category responses
-        categories: List[CategoryResponse] = []
-        
-        # Add genre categories
-        for genre, songs in genre_categories.items():
-            categories.append(CategoryResponse(
-                name=genre,
-                type="genre",
-                song_count=len(songs),
-                songs=songs
-            ))
-        
-        # Add artist categories
-        for artist, songs in artist_categories.items():
-            categories.append(CategoryResponse(
-                name=artist,
-                type="artist",
-                song_count=len(songs),
-                songs=songs
-            ))
-        
-        return categories
+    def count_categories(self) -> int:
+        """Get the number of genre and artist categories"""
+        catalog = self.playlist_service.snapshot()
+        return len(catalog.genre_index) + len(catalog.artist_index)
     
-    def get_category_by_name(self, category_name: str) -> Optional[CategoryResponse]:
-        """Get songs in a specific category (genre or artist)"""
-        all_categories = self.get_all_categories()
+    @timed("get_category_buckets")
+    def get_category_buckets(
+        self, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Tuple[str, str, Mapping[int, Song]]]:
+        """Get (name, type, songs by ID) for up to `limit` categories from `offset`"""
+        stop = offset + limit if limit is not None else None
+        return list(itertools.islice(self._category_buckets(), offset, stop))
+    
+    def iter_category_buckets(self, offset: int = 0) -> Iterator[Tuple[str, str, Mapping[int, Song]]]:
+        """Lazily yield (name, type, songs by ID) for genres, then artists, from `offset`"""
+        return itertools.islice(self._category_buckets(), offset, None)
+    
+    def _category_buckets(self) -> Iterator[Tuple[str, str, Mapping[int, Song]]]:
+        catalog = self.playlist_service.snapshot()
+        for genre, songs in list(catalog.genre_index.items()):
+            yield genre, "genre", songs
+        for artist, songs in list(catalog.artist_index.items()):
+            yield artist, "artist", songs
+    
+    def find_category(self, category_name: str) -> Optional[Tuple[str, str, Mapping[int, Song]]]:
+        """Get (name, type, songs by ID) of a genre or artist category"""
+        catalog = self.playlist_service.snapshot()
         category_name_lower = category_name.lower()
         
-        for category in all_categories:
-            if category.name.lower() == category_name_lower:
-                return category
+        # Genres take precedence over artists sharing the same name
+        if category_name_lower in catalog.genre_index:
+            return category_name_lower, "genre", catalog.genre_index[category_name_lower]
+        if category_name_lower in catalog.artist_index:
+            return category_name_lower, "artist", catalog.artist_index[category_name_lower]
         
         return None
     
+    def get_category_by_name(self, category_name: str) -> Optional[CategoryResponse]:
+        """Get songs in a specific category (genre or artist)"""
+        category = self.find_category(category_name)
+        if category is None:
+            return None
+        return self._build_category(*category)
+    
     def get_songs_by_genre(self, genre: str) -> List[Song]:
         """Get all songs of a specific genre"""
-        all_songs: List[Song] = []
-        for playlist in self.playlist_service.get_all_playlists():
-            all_songs.extend(playlist.songs)
-        
-        genre_lower = genre.lower()
-        return [song for song in all_songs if song.genre and song.genre.lower() == genre_lower]
+        return self.playlist_service.get_songs_by_genre(genre)
     
     def get_songs_by_artist(self, artist: str) -> List[Song]:
         """Get all songs by a specific artist"""
-        all_songs: List[Song] = []
-        for playlist in self.playlist_service.get_all_playlists():
-            all_songs.extend(playlist.songs)
-        
-        artist_lower = artist.lower()
-        return [song for song in all_songs if song.artist.lower() == artist_lower]
-
+        return self.playlist_service.get_songs_by_artist(artist)
+    
+    def _build_category(self, name: str, category_type: str, songs: Mapping[int, Song]) -> CategoryResponse:
+        """Build a category response from an index bucket"""
+        # One copy of the bucket, which writers update in place, for both fields
+        song_list = list(songs.values())
+        return CategoryResponse(
+            name=name,
+            type=category_type,
+            song_count=len(song_list),
+            songs=song_list
+        )
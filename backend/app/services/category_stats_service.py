@@ -0,0 +1,169 @@
+"""
+Category stats service - per-genre aggregates kept up to date on every write
+"""
+
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+from app.models.playlist import Playlist, Song
+from app.services.playlist_service import (
+    CatalogListener,
+    PlaylistService,
+    first_appearances,
+)
+
+
+class RankedCounter:
+    """Counts per key, with the highest counts readable without sorting
+
+    Keys are grouped by count, and the distinct counts are kept sorted, so
+    incrementing or decrementing a key moves it between two groups and the
+    top k keys are read from the highest groups down. Each group is kept
+    sorted by key, so keys with equal counts come back in the same order
+    whatever the history of updates was. Reading the top k costs the same
+    however many keys there are; an update costs a binary search and a
+    list shift within the two groups it touches, and an insert into the
+    list of distinct counts, which stays short: n keys have fewer than
+    sqrt(2n) distinct counts.
+    """
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        # Count -> keys with that count, sorted
+        self._groups: Dict[int, List[str]] = {}
+        self._sorted_counts: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _leave(self, key: str, count: int):
+        group = self._groups[count]
+        del group[bisect.bisect_left(group, key)]
+        if not group:
+            del self._groups[count]
+            del self._sorted_counts[bisect.bisect_left(self._sorted_counts, count)]
+
+    def _join(self, key: str, count: int):
+        group = self._groups.get(count)
+        if group is None:
+            group = self._groups[count] = []
+            bisect.insort(self._sorted_counts, count)
+        bisect.insort(group, key)
+
+    def add(self, key: str, amount: int):
+        """Add `amount`, which may be negative, to a key's count"""
+        count = self.counts.get(key, 0)
+        if count:
+            self._leave(key, count)
+        count += amount
+        if count > 0:
+            self.counts[key] = count
+            self._join(key, count)
+        else:
+            self.counts.pop(key, None)
+
+    def top(self, limit: int) -> List[Tuple[str, int]]:
+        """Up to `limit` keys with the highest counts, highest first"""
+        top = []
+        if limit <= 0:
+            return top
+        for count in reversed(self._sorted_counts):
+            for key in self._groups[count]:
+                top.append((key, count))
+                if len(top) == limit:
+                    return top
+        return top
+
+
+class GenreStats:
+    """Running totals for the songs of one genre"""
+
+    __slots__ = ("song_count", "total_duration", "timed_songs", "artists")
+
+    def __init__(self):
+        self.song_count = 0
+        self.total_duration = 0
+        # Songs with a duration, which the average is taken over
+        self.timed_songs = 0
+        # Normalized artist name -> songs of this genre by the artist
+        self.artists = RankedCounter()
+
+    def add(self, song: Song, sign: int):
+        self.song_count += sign
+        if song.duration is not None:
+            self.total_duration += sign * song.duration
+            self.timed_songs += sign
+        self.artists.add(song.artist.lower(), sign)
+
+
+class CategoryStatsService(CatalogListener):
+    """Song count, duration and artist aggregates per genre
+
+    Counters are built once from the catalog and then adjusted by the
+    tracks each write adds to or drops from it, so reading a genre's stats
+    costs the same however many songs it has. Like the category index, the
+    stats count each canonical track once, however many playlists hold it,
+    and key genres by normalized (lowercased) name.
+    """
+
+    def __init__(self, playlist_service: PlaylistService):
+        self.playlist_service = playlist_service
+        self._lock = threading.Lock()
+        self._genres: Dict[str, GenreStats] = {}
+        catalog = self.playlist_service.snapshot()
+        for _, songs in first_appearances(list(catalog.playlists.values())):
+            self._apply(songs, 1)
+        playlist_service.add_listener(self)
+
+    def _apply(self, songs: List[Song], sign: int):
+        for song in songs:
+            # Songs without a genre are in no genre category either
+            if not song.genre:
+                continue
+            genre = song.genre.lower()
+            stats = self._genres.get(genre)
+            if stats is None:
+                stats = self._genres[genre] = GenreStats()
+            stats.add(song, sign)
+            if not stats.song_count:
+                del self._genres[genre]
+
+    def tracks_added(self, playlist: Playlist, songs: List[Song]):
+        with self._lock:
+            self._apply(songs, 1)
+
+    def tracks_removed(self, playlist: Playlist, songs: List[Song]):
+        with self._lock:
+            self._apply(songs, -1)
+
+    def _summarize(self, genre: str, stats: GenreStats, top_artists: int) -> Dict:
+        return {
+            "name": genre,
+            "song_count": stats.song_count,
+            "total_duration": stats.total_duration,
+            "average_duration": (
+                stats.total_duration / stats.timed_songs if stats.timed_songs else None
+            ),
+            "distinct_artists": len(stats.artists),
+            "top_artists": [
+                {"name": artist, "song_count": count}
+                for artist, count in stats.artists.top(top_artists)
+            ],
+        }
+
+    def get_genre_stats(self, genre: str, top_artists: int = 10) -> Optional[Dict]:
+        """Get the aggregates of one genre, or None if it has no songs"""
+        genre = genre.lower()
+        with self._lock:
+            stats = self._genres.get(genre)
+            return self._summarize(genre, stats, top_artists) if stats else None
+
+    def get_all_genre_stats(self, top_artists: int = 10) -> List[Dict]:
+        """Get the aggregates of every genre, largest first"""
+        with self._lock:
+            genres = [
+                self._summarize(genre, stats, top_artists)
+                for genre, stats in self._genres.items()
+            ]
+        genres.sort(key=lambda stats: (-stats["song_count"], stats["name"]))
+        return genres
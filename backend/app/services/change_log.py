@@ -0,0 +1,419 @@
+"""
+Sequence-numbered log of catalog changes, for incremental consumers and replay
+"""
+
+import asyncio
+import bisect
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+from pydantic_core import to_json
+from app.models.catalog_file import CatalogFile
+from app.models.playlist import Playlist, Song, TrackEdit
+from app.serialization import dump_playlist, dump_songs
+
+try:
+    import fcntl
+except ImportError:  # Windows: a second process opening the log is not caught
+    fcntl = None
+
+_SEGMENT_FILE = re.compile(r"(\d{20})\.log$")
+LOCK_NAME = "LOCK"
+
+
+def segment_file_name(first_seq: int) -> str:
+    return f"{first_seq:020d}.log"
+
+
+def _line_seq(line: bytes) -> int:
+    # Every record starts with {"seq":<n>,
+    return int(line[7 : line.index(b",", 7)])
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class ChangesCompacted(LookupError):
+    """Changes a consumer asked for were compacted out of the log"""
+
+
+class ChangeLog:
+    """Append-only log of playlist changes, numbered 1, 2, ... across restarts
+
+    Each change is one JSON line, appended to the segment file named after
+    the first sequence number it holds; a new segment starts once the
+    current one reaches `segment_bytes`. create and update records carry
+    the whole playlist, append records the songs added at `position`,
+    patch records the track-level operations applied, and delete records
+    the playlist ID. Records are stamped with their write time in UTC.
+    Replay skips a record whose sequence number is not past the last one
+    applied to its playlist, so applying a record twice changes nothing.
+    The newest `memory_records` lines are also kept in memory, which
+    serves consumers that are nearly caught up without reading files.
+
+    Sealed segments are deleted by `compact` once a catalog snapshot covers
+    them, except for the newest `retain_segments`, which consumers that fell
+    behind can still catch up from.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 16 * 2**20,
+        retain_segments: int = 4,
+        memory_records: int = 10_000,
+        fsync: bool = False,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.retain_segments = retain_segments
+        self.memory_records = memory_records
+        self.fsync = fsync
+        self._lock_file = self._lock_directory(directory)
+        self._lock = threading.Lock()
+        # First sequence number of each segment, oldest first
+        self._segments: List[int] = sorted(
+            int(match.group(1))
+            for match in map(_SEGMENT_FILE.match, os.listdir(directory))
+            if match
+        )
+        self._file = None
+        self._size = 0
+        self.last_seq = 0
+        self._recent: List[bytes] = []
+        self._recent_first = 1
+        self._waiters: List[tuple] = []
+        if self._segments:
+            self._recover()
+
+    @staticmethod
+    def _lock_directory(directory: str):
+        lock_file = open(os.path.join(directory, LOCK_NAME), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                raise OSError(
+                    f"The change log in {directory} is in use by another process"
+                )
+        return lock_file
+
+    def _path(self, first_seq: int) -> str:
+        return os.path.join(self.directory, segment_file_name(first_seq))
+
+    def _recover(self):
+        """Find the last sequence number and cut off a record torn by a crash"""
+        path = self._path(self._segments[-1])
+        with open(path, "rb") as file:
+            data = file.read()
+        lines = data.split(b"\n")
+        # A complete log ends with a newline, leaving an empty last piece
+        del lines[-1]
+        while lines:
+            try:
+                json.loads(lines[-1])
+                break
+            except ValueError:
+                del lines[-1]
+        valid_size = sum(len(line) + 1 for line in lines)
+        if valid_size != len(data):
+            with open(path, "r+b") as file:
+                file.truncate(valid_size)
+        self.last_seq = _line_seq(lines[-1]) if lines else self._segments[-1] - 1
+        self._recent = lines[-self.memory_records :]
+        self._recent_first = self.last_seq + 1 - len(self._recent)
+        self._file = open(path, "ab")
+        self._size = valid_size
+
+    @property
+    def first_seq(self) -> int:
+        """Oldest sequence number still in the log"""
+        return self._segments[0] if self._segments else self.last_seq + 1
+
+    @property
+    def sealed_segments(self) -> int:
+        """Number of segments no longer appended to"""
+        return max(len(self._segments) - 1, 0)
+
+    def playlist_created(self, playlist: Playlist) -> int:
+        return self._append(
+            "create",
+            playlist.id,
+            playlist.updated_at,
+            b',"playlist":' + dump_playlist(playlist),
+        )
+
+    def playlist_updated(self, playlist: Playlist) -> int:
+        return self._append(
+            "update",
+            playlist.id,
+            playlist.updated_at,
+            b',"playlist":' + dump_playlist(playlist),
+        )
+
+    def songs_appended(
+        self, playlist: Playlist, songs: List[Song], position: int
+    ) -> int:
+        return self._append(
+            "append",
+            playlist.id,
+            playlist.updated_at,
+            b',"position":%d,"songs":' % position + dump_songs(songs),
+        )
+
+    def playlist_patched(self, playlist: Playlist, edits: List[TrackEdit]) -> int:
+        operations = []
+        for edit in edits:
+            operation = {"op": edit.op, "position": edit.position}
+            if edit.to_position is not None:
+                operation["to_position"] = edit.to_position
+            if edit.song is not None:
+                operation["song"] = {
+                    "title": edit.song.title,
+                    "artist": edit.song.artist,
+                    "genre": edit.song.genre,
+                    "duration": edit.song.duration,
+                    "id": edit.song.id,
+                }
+            operations.append(operation)
+        return self._append(
+            "patch",
+            playlist.id,
+            playlist.updated_at,
+            b',"operations":' + to_json(operations),
+        )
+
+    def playlist_deleted(self, playlist_id: int) -> int:
+        return self._append("delete", playlist_id, datetime.now())
+
+    def _append(
+        self, op: str, playlist_id: int, at: datetime, body: bytes = b""
+    ) -> int:
+        with self._lock:
+            seq = self.last_seq + 1
+            head = to_json(
+                {
+                    "seq": seq,
+                    "op": op,
+                    "playlist_id": playlist_id,
+                    "at": at.astimezone(timezone.utc).isoformat(),
+                }
+            )
+            record = head[:-1] + body + b"}"
+            if self._file is None or self._size >= self.segment_bytes:
+                self._start_segment(seq)
+            self._file.write(record + b"\n")
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._size += len(record) + 1
+            self.last_seq = seq
+            self._recent.append(record)
+            if len(self._recent) >= 2 * self.memory_records:
+                dropped = len(self._recent) - self.memory_records
+                del self._recent[:dropped]
+                self._recent_first += dropped
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+        return seq
+
+    def _start_segment(self, first_seq: int):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self._path(first_seq), "ab")
+        self._size = 0
+        self._segments.append(first_seq)
+
+    def read(self, since: int, limit: int) -> List[bytes]:
+        """Get up to `limit` records after sequence number `since`, oldest first
+
+        Raises ChangesCompacted if some of those changes are no longer logged.
+        """
+        with self._lock:
+            if since + 1 >= self._recent_first:
+                start = since + 1 - self._recent_first
+                return self._recent[start : start + limit]
+            segments = list(self._segments)
+        records = []
+        for record in self._read_segments(segments, since):
+            records.append(record)
+            if len(records) == limit:
+                break
+        return records
+
+    def records(self, since: int = 0) -> Iterator[Dict]:
+        """Decode every record after `since`, oldest first"""
+        for record in self._read_segments(list(self._segments), since):
+            yield json.loads(record)
+
+    def _read_segments(self, segments: List[int], since: int) -> Iterator[bytes]:
+        if not segments or since + 1 < segments[0]:
+            raise ChangesCompacted(
+                f"Changes before {self.first_seq} were compacted; reload the"
+                " catalog and follow changes from the last_seq read before it"
+            )
+        # Start in the segment holding since + 1
+        for first_seq in segments[bisect.bisect_right(segments, since + 1) - 1 :]:
+            try:
+                with open(self._path(first_seq), "rb") as file:
+                    for line in file:
+                        # A record being appended right now is left for next time
+                        if not line.endswith(b"\n"):
+                            return
+                        if _line_seq(line) > since:
+                            yield line[:-1]
+            except FileNotFoundError:
+                raise ChangesCompacted(
+                    f"Changes from {first_seq} were compacted while being read"
+                )
+
+    async def wait(self, since: int, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a change after `since`"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self._lock:
+            if self.last_seq > since:
+                return True
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def compact(self, covered_seq: int) -> int:
+        """Delete sealed segments holding only changes up to `covered_seq`
+
+        The newest `retain_segments` sealed segments are kept regardless.
+        Returns the number of segments deleted.
+        """
+        with self._lock:
+            # A segment ends just before the next one starts
+            covered = sum(
+                1 for next_first in self._segments[1:] if next_first - 1 <= covered_seq
+            )
+            deleted = self._segments[
+                : min(covered, self.sealed_segments - self.retain_segments)
+            ]
+            del self._segments[: len(deleted)]
+        for first_seq in deleted:
+            os.unlink(self._path(first_seq))
+        return len(deleted)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self._lock_file.close()
+
+
+def _song(data: Dict) -> Song:
+    return Song(
+        id=data["id"],
+        title=data["title"],
+        artist=data["artist"],
+        genre=data["genre"],
+        duration=data["duration"],
+    )
+
+
+def _playlist(data: Dict) -> Playlist:
+    return Playlist(
+        id=data["id"],
+        name=data["name"],
+        description=data["description"],
+        songs=[_song(song) for song in data["songs"]],
+        created_at=datetime.fromisoformat(data["created_at"]),
+        updated_at=datetime.fromisoformat(data["updated_at"]),
+    )
+
+
+def _local_time(at: str) -> datetime:
+    """A record's time as the naive local time playlists are stamped with
+
+    Records written before `at` was stored in UTC are naive and local already.
+    """
+    return datetime.fromisoformat(at).astimezone().replace(tzinfo=None)
+
+
+def apply_change(
+    playlists: Dict[int, Playlist], record: Dict, applied_seqs: Dict[int, int]
+):
+    """Apply one decoded change record to playlists keyed by ID
+
+    `applied_seqs` maps playlist IDs to the sequence number of the last
+    record applied to them and is kept up to date; a record at or before
+    that number is already in effect and is skipped.
+    """
+    op = record["op"]
+    playlist_id = record["playlist_id"]
+    seq = record["seq"]
+    if seq <= applied_seqs.get(playlist_id, 0):
+        return
+    applied_seqs[playlist_id] = seq
+    if op in ("create", "update"):
+        playlists[playlist_id] = _playlist(record["playlist"])
+    elif op == "delete":
+        playlists.pop(playlist_id, None)
+    elif op == "append" and playlist_id in playlists:
+        playlist = playlists[playlist_id]
+        playlist.songs = playlist.songs[: record["position"]] + [
+            _song(song) for song in record["songs"]
+        ]
+        playlist.updated_at = _local_time(record["at"])
+    elif op == "patch" and playlist_id in playlists:
+        playlist = playlists[playlist_id]
+        songs = list(playlist.songs)
+        for operation in record["operations"]:
+            position = operation["position"]
+            if operation["op"] == "insert":
+                songs.insert(position, _song(operation["song"]))
+            elif operation["op"] == "remove":
+                songs.pop(position)
+            elif operation["op"] == "replace":
+                songs[position] = _song(operation["song"])
+            elif operation["op"] == "move":
+                songs.insert(operation["to_position"], songs.pop(position))
+        playlist.songs = songs
+        playlist.updated_at = _local_time(record["at"])
+
+
+def replay_catalog(snapshot_path: str, change_log: ChangeLog) -> List[Playlist]:
+    """Rebuild the catalog from a snapshot plus the changes logged after it
+
+    Raises ValueError if the snapshot was not saved with the change log
+    enabled or the log no longer reaches back to it.
+    """
+    snapshot = CatalogFile(snapshot_path)
+    change_seq: Optional[int] = snapshot.metadata.get("change_seq")
+    if change_seq is None:
+        raise ValueError(f"{snapshot_path} was not saved with the change log enabled")
+    if change_log.first_seq > change_seq + 1:
+        raise ValueError(
+            f"{snapshot_path} holds changes up to {change_seq}, but the change log"
+            f" starts at {change_log.first_seq}"
+        )
+    playlists = {}
+    # Snapshot playlists hold every change up to change_seq
+    applied_seqs = {}
+    for row in range(len(snapshot.playlist_ids)):
+        playlist = snapshot.playlist(row)
+        playlists[playlist.id] = playlist
+        applied_seqs[playlist.id] = change_seq
+    for record in change_log.records(change_seq):
+        apply_change(playlists, record, applied_seqs)
+    return [playlists[playlist_id] for playlist_id in sorted(playlists)]
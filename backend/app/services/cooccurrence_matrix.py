@@ -0,0 +1,164 @@
+"""
+Sparse track-by-track co-occurrence counts in CSR form with incremental updates
+"""
+
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+
+def _aggregate(keys: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum counts per unique key, dropping keys whose total is zero"""
+    if not len(keys):
+        return keys, counts
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=counts).astype(np.int64)
+    nonzero = totals != 0
+    return unique_keys[nonzero], totals[nonzero]
+
+
+class CooccurrenceMatrix:
+    """Symmetric co-occurrence counts between integer track codes
+
+    The bulk of the counts lives in immutable CSR arrays (indptr, indices,
+    data), so memory scales with the number of non-zero pairs. Updates go
+    to a small dict-of-dicts delta that is merged into the CSR arrays once
+    it grows past a fraction of their size.
+    """
+
+    def __init__(self, merge_ratio: float = 0.05, min_merge_size: int = 10_000):
+        self.n_tracks = 0
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.empty(0, dtype=np.int32)
+        self.data = np.empty(0, dtype=np.int32)
+        self.delta: Dict[int, Dict[int, int]] = {}
+        self._delta_size = 0
+        self.merge_ratio = merge_ratio
+        self.min_merge_size = min_merge_size
+
+    @property
+    def nnz(self) -> int:
+        return len(self.indices)
+
+    def build(
+        self, groups: Iterable[np.ndarray], n_tracks: int, chunk_pairs: int = 5_000_000
+    ):
+        """Rebuild the CSR arrays from groups of distinct co-occurring track codes"""
+        self.n_tracks = n_tracks
+        keys = np.empty(0, dtype=np.int64)
+        counts = np.empty(0, dtype=np.int64)
+        pending: List[np.ndarray] = []
+        pending_pairs = 0
+        for group in groups:
+            if len(group) < 2:
+                continue
+            pending.append(self._pair_keys(group))
+            pending_pairs += len(group) * (len(group) - 1)
+            if pending_pairs >= chunk_pairs:
+                keys, counts = self._merge_keys(keys, counts, pending)
+                pending, pending_pairs = [], 0
+        keys, counts = self._merge_keys(keys, counts, pending)
+        self._set_csr(keys, counts)
+        self.delta.clear()
+        self._delta_size = 0
+
+    def _pair_keys(self, group: np.ndarray) -> np.ndarray:
+        """Keys row * n_tracks + col for every ordered pair of distinct codes"""
+        group = group.astype(np.int64)
+        rows = np.repeat(group, len(group))
+        cols = np.tile(group, len(group))
+        off_diagonal = rows != cols
+        return rows[off_diagonal] * self.n_tracks + cols[off_diagonal]
+
+    def _merge_keys(self, keys, counts, pending: List[np.ndarray]):
+        if not pending:
+            return keys, counts
+        new_keys = np.concatenate(pending)
+        return _aggregate(
+            np.concatenate((keys, new_keys)),
+            np.concatenate((counts, np.ones(len(new_keys), dtype=np.int64))),
+        )
+
+    def _set_csr(self, keys: np.ndarray, counts: np.ndarray):
+        rows = keys // max(self.n_tracks, 1)
+        self.indices = (keys % max(self.n_tracks, 1)).astype(np.int32)
+        self.data = counts.astype(np.int32)
+        self.indptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(rows, minlength=self.n_tracks)))
+        ).astype(np.int64)
+
+    def grow(self, n_tracks: int):
+        """Make room for track codes below n_tracks
+
+        Room is added by doubling, so a run of new tracks copies indptr a
+        logarithmic number of times rather than once per track.
+        """
+        if n_tracks > self.n_tracks:
+            n_tracks = max(n_tracks, 2 * self.n_tracks)
+            self.indptr = np.concatenate(
+                (self.indptr, np.full(n_tracks - self.n_tracks, self.indptr[-1]))
+            )
+            self.n_tracks = n_tracks
+
+    def add_pairs(self, track: int, others: Iterable[int], amount: int):
+        """Add `amount` (possibly negative) to the counts between track and each other"""
+        for other in others:
+            if other == track:
+                continue
+            for row, col in ((track, other), (other, track)):
+                row_delta = self.delta.setdefault(row, {})
+                if col not in row_delta:
+                    self._delta_size += 1
+                row_delta[col] = row_delta.get(col, 0) + amount
+        if self._delta_size > max(self.min_merge_size, self.merge_ratio * self.nnz):
+            self.merge()
+
+    def merge(self):
+        """Fold the delta into the CSR arrays
+
+        CSR keys are already sorted, so only the delta needs sorting and the
+        two are combined with a linear merge rather than a full re-sort.
+        """
+        if not self.delta:
+            return
+        n = max(self.n_tracks, 1)
+        delta_keys = np.fromiter(
+            (row * n + col for row, cols in self.delta.items() for col in cols),
+            dtype=np.int64,
+        )
+        delta_counts = np.fromiter(
+            (count for cols in self.delta.values() for count in cols.values()),
+            dtype=np.int64,
+        )
+        order = np.argsort(delta_keys)
+        delta_keys, delta_counts = delta_keys[order], delta_counts[order]
+
+        rows = np.repeat(np.arange(self.n_tracks, dtype=np.int64), np.diff(self.indptr))
+        keys = rows * n + self.indices
+        counts = self.data.astype(np.int64)
+        positions = np.searchsorted(keys, delta_keys)
+        found = positions < len(keys)
+        found[found] = keys[positions[found]] == delta_keys[found]
+        np.add.at(counts, positions[found], delta_counts[found])
+        keys = np.insert(keys, positions[~found], delta_keys[~found])
+        counts = np.insert(counts, positions[~found], delta_counts[~found])
+        nonzero = counts != 0
+        self._set_csr(keys[nonzero], counts[nonzero])
+        self.delta.clear()
+        self._delta_size = 0
+
+    def scores(self, tracks: Iterable[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Summed co-occurrence counts with the given tracks, as (codes, totals)"""
+        tracks = [track for track in tracks if track < self.n_tracks]
+        if not tracks:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        codes = [self.indices[self.indptr[t] : self.indptr[t + 1]] for t in tracks]
+        counts = [self.data[self.indptr[t] : self.indptr[t + 1]] for t in tracks]
+        for track in tracks:
+            row_delta = self.delta.get(track)
+            if row_delta:
+                codes.append(np.fromiter(row_delta.keys(), dtype=np.int32))
+                counts.append(np.fromiter(row_delta.values(), dtype=np.int32))
+        return _aggregate(
+            np.concatenate(codes).astype(np.int64),
+            np.concatenate(counts).astype(np.int64),
+        )
@@ -0,0 +1,172 @@
+"""
+Co-occurrence service - "songs that appear alongside this playlist's songs"
+"""
+
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from app.models.playlist import Playlist, Song
+from app.services.cooccurrence_matrix import CooccurrenceMatrix
+from app.services.playlist_service import CatalogListener, PlaylistService
+
+# Playlists with more distinct tracks than this (e.g. bulk imports) carry
+# little co-occurrence signal and would add pairs quadratically, so they
+# are left out of the matrix
+MAX_PLAYLIST_TRACKS = 500
+
+
+class CooccurrenceService(CatalogListener):
+    """Counts how often tracks share a playlist, kept in sync with the catalog
+
+    Tracks are the catalog's songs, each with its own matrix row keyed by
+    song ID. Two tracks co-occur once per playlist containing both.
+
+    A track leaves the catalog only after every playlist has dropped it, so
+    all of its counts are back to zero by then and its code is reused by
+    the next new track; the matrix has rows for live tracks, not for every
+    track there has ever been.
+    """
+
+    def __init__(
+        self,
+        playlist_service: PlaylistService,
+        max_playlist_tracks: int = MAX_PLAYLIST_TRACKS,
+    ):
+        self.playlist_service = playlist_service
+        self.max_playlist_tracks = max_playlist_tracks
+        self.matrix = CooccurrenceMatrix()
+        self._lock = threading.Lock()
+        # Song ID -> track code, the track's row in the matrix
+        self._track_codes: Dict[int, int] = {}
+        # Song per track code; None once the track has left the catalog
+        self._track_songs: List[Optional[Song]] = []
+        # Codes of tracks that have left the catalog, free for new tracks
+        self._free_codes: List[int] = []
+        # Track code -> number of copies, per playlist
+        self._members: Dict[int, Dict[int, int]] = {}
+        self._build()
+        playlist_service.add_listener(self)
+
+    def _build(self):
+        """Count co-occurrences over the whole catalog"""
+        catalog = self.playlist_service.snapshot()
+        for playlist in list(catalog.playlists.values()):
+            self._add_members(playlist.id, playlist.songs)
+        self.matrix.build(
+            (
+                np.fromiter(members, dtype=np.int64, count=len(members))
+                for members in self._members.values()
+                if len(members) <= self.max_playlist_tracks
+            ),
+            len(self._track_songs),
+        )
+
+    def _track_code(self, song: Song) -> int:
+        code = self._track_codes.get(song.id)
+        if code is None:
+            if self._free_codes:
+                code = self._free_codes.pop()
+                self._track_songs[code] = song
+            else:
+                code = len(self._track_songs)
+                self._track_songs.append(song)
+            self._track_codes[song.id] = code
+        return code
+
+    def _add_members(self, playlist_id: int, songs: List[Song]) -> List[int]:
+        """Record songs as playlist members, returning tracks new to the playlist"""
+        members = self._members.setdefault(playlist_id, {})
+        new_tracks = []
+        for song in songs:
+            code = self._track_code(song)
+            count = members.get(code, 0)
+            if not count:
+                new_tracks.append(code)
+            members[code] = count + 1
+        return new_tracks
+
+    def _remove_members(self, playlist_id: int, songs: List[Song]) -> List[int]:
+        """Drop songs from a playlist, returning tracks no longer in it"""
+        members = self._members.get(playlist_id, {})
+        gone_tracks = []
+        for song in songs:
+            code = self._track_codes.get(song.id)
+            if code is None or code not in members:
+                continue
+            members[code] -= 1
+            if not members[code]:
+                del members[code]
+                gone_tracks.append(code)
+        if not members:
+            self._members.pop(playlist_id, None)
+        return gone_tracks
+
+    def _add_group(self, tracks: List[int], amount: int):
+        """Add `amount` to the count of every pair within tracks"""
+        for position, track in enumerate(tracks):
+            self.matrix.add_pairs(track, tracks[position + 1 :], amount)
+
+    def _change_pairs(self, changed: List[int], unchanged: List[int], amount: int):
+        """Add `amount` to every pair involving a changed track"""
+        for track in changed:
+            self.matrix.add_pairs(track, unchanged, amount)
+        self._add_group(changed, amount)
+
+    def songs_added(self, playlist: Playlist, songs: List[Song]):
+        with self._lock:
+            before = len(self._members.get(playlist.id, ()))
+            new_tracks = self._add_members(playlist.id, songs)
+            self.matrix.grow(len(self._track_songs))
+            members = self._members[playlist.id]
+            if before > self.max_playlist_tracks or not new_tracks:
+                return
+            new_set = set(new_tracks)
+            old_tracks = [code for code in members if code not in new_set]
+            if len(members) <= self.max_playlist_tracks:
+                self._change_pairs(new_tracks, old_tracks, 1)
+            else:
+                # The playlist just outgrew the limit; take back its pairs
+                self._add_group(old_tracks, -1)
+
+    def tracks_removed(self, playlist: Playlist, songs: List[Song]):
+        with self._lock:
+            for song in songs:
+                code = self._track_codes.pop(song.id, None)
+                if code is not None:
+                    self._track_songs[code] = None
+                    self._free_codes.append(code)
+
+    def songs_removed(self, playlist: Playlist, songs: List[Song]):
+        with self._lock:
+            before = len(self._members.get(playlist.id, ()))
+            gone_tracks = self._remove_members(playlist.id, songs)
+            remaining = list(self._members.get(playlist.id, ()))
+            if len(remaining) > self.max_playlist_tracks or not gone_tracks:
+                return
+            if before <= self.max_playlist_tracks:
+                self._change_pairs(gone_tracks, remaining, -1)
+            else:
+                # The playlist shrank back under the limit; count its pairs
+                self._add_group(remaining, 1)
+
+    def recommend_for_playlist(self, playlist_id: int, limit: int) -> List[Song]:
+        """Get the tracks that most often share a playlist with the seed playlist's tracks
+
+        Tracks already in the seed playlist are left out.
+        """
+        with self._lock:
+            seeds = list(self._members.get(playlist_id, ()))
+            codes, totals = self.matrix.scores(seeds)
+            keep = ~np.isin(codes, seeds) & (totals > 0)
+            codes, totals = codes[keep], totals[keep]
+            if len(codes) > limit:
+                top = np.argpartition(-totals, limit - 1)[:limit]
+                codes, totals = codes[top], totals[top]
+            # Highest count first, ties broken by track code
+            order = np.lexsort((codes, -totals))
+            songs = []
+            for code in codes[order].tolist():
+                song = self._track_songs[code]
+                if song is not None:
+                    songs.append(song)
+            return songs
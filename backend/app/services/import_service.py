@@ -0,0 +1,181 @@
+"""
+Import service - bulk loading of songs from NDJSON or CSV
+"""
+
+import csv
+import json
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from app.schemas.bulk_import import ImportReport, ImportRowError
+from app.schemas.playlist import PlaylistCreate, SongCreate
+from app.services.playlist_service import PlaylistService
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+
+class ImportAborted(LookupError):
+    """The playlist being imported into was deleted before the import finished"""
+
+
+class RowParser:
+    """Turns numbered input lines into numbered song dicts
+
+    CSV input must start with a header row. One csv.reader reads the whole
+    stream, so a quoted field may span lines; lines must keep their line
+    endings for such fields to keep theirs.
+    """
+
+    def __init__(self, format: str):
+        if format not in IMPORT_FORMATS:
+            raise ValueError(f"Unsupported import format: {format}")
+        self.format = format
+
+    def rows(
+        self, lines: Iterable[Tuple[int, str]]
+    ) -> Iterator[Tuple[int, Optional[Dict], Optional[Exception]]]:
+        """Yield (line number, row, None) per row, or (line number, None, error)
+
+        Blank lines and the CSV header are skipped; a row's line number is
+        the line it starts on.
+        """
+        if self.format == "ndjson":
+            yield from self._ndjson_rows(lines)
+        else:
+            yield from self._csv_rows(lines)
+
+    @staticmethod
+    def _ndjson_rows(lines: Iterable[Tuple[int, str]]):
+        for line_number, line in lines:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError("Expected a JSON object")
+            except ValueError as e:
+                yield line_number, None, e
+                continue
+            yield line_number, row, None
+
+    @staticmethod
+    def _csv_rows(lines: Iterable[Tuple[int, str]]):
+        last_line = 0
+
+        def text() -> Iterator[str]:
+            nonlocal last_line
+            for line_number, line in lines:
+                last_line = line_number
+                yield line
+
+        reader = csv.reader(text())
+        header: Optional[List[str]] = None
+        while True:
+            line_number = last_line + 1
+            try:
+                values = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield line_number, None, e
+                continue
+            if not values:
+                continue
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            if len(values) != len(header):
+                yield line_number, None, ValueError(
+                    f"Expected {len(header)} columns, got {len(values)}"
+                )
+                continue
+            # Empty CSV cells mean "not set" for the optional fields
+            yield line_number, {
+                name: value for name, value in zip(header, values) if value != ""
+            }, None
+
+
+class ImportService:
+    """Imports songs into a playlist in batches, collecting per-row errors
+
+    Without a `playlist_id`, a playlist named `playlist_name` is created
+    with the first batch of valid rows, so an import in which every row
+    fails leaves nothing behind.
+    """
+
+    def __init__(
+        self,
+        playlist_service: PlaylistService,
+        format: str,
+        playlist_id: Optional[int] = None,
+        playlist_name: str = "Imported songs",
+        batch_size: int = 5000,
+        max_errors: int = 100,
+    ):
+        self.playlist_service = playlist_service
+        self.parser = RowParser(format)
+        if (
+            playlist_id is not None
+            and playlist_service.get_playlist_by_id(playlist_id) is None
+        ):
+            raise LookupError(f"Playlist with ID {playlist_id} not found")
+        self.playlist_id = playlist_id
+        self.playlist_name = playlist_name
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self._report = ImportReport(playlist_id=playlist_id)
+        self._started = time.perf_counter()
+
+    def import_lines(self, lines: Iterable[Tuple[int, str]]):
+        """Import all numbered lines of an input, flushing every `batch_size` valid rows
+
+        Raises ImportAborted if the playlist is deleted meanwhile.
+        """
+        batch: List[SongCreate] = []
+        for line_number, row, error in self.parser.rows(lines):
+            if error is None:
+                try:
+                    batch.append(SongCreate.model_validate(row))
+                except ValidationError as e:
+                    error = e
+            if error is not None:
+                self._record_error(line_number, error)
+                continue
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        self._flush(batch)
+
+    def report(self) -> ImportReport:
+        """Get the import totals and throughput so far"""
+        elapsed = time.perf_counter() - self._started
+        self._report.elapsed_seconds = round(elapsed, 3)
+        self._report.rows_per_second = (
+            round(self._report.rows_imported / elapsed, 1) if elapsed else 0.0
+        )
+        return self._report
+
+    def _flush(self, batch: List[SongCreate]):
+        if not batch:
+            return
+        if self.playlist_id is None:
+            self.playlist_id = self.playlist_service.create_playlist(
+                PlaylistCreate(name=self.playlist_name, songs=batch)
+            ).id
+            self._report.playlist_id = self.playlist_id
+        elif self.playlist_service.append_songs(self.playlist_id, batch) is None:
+            raise ImportAborted(
+                f"Playlist {self.playlist_id} was deleted during the import, after"
+                f" {self._report.rows_imported} rows"
+            )
+        self._report.rows_imported += len(batch)
+
+    def _record_error(self, line_number: int, error: Exception):
+        self._report.rows_failed += 1
+        if len(self._report.errors) < self.max_errors:
+            message = str(error)
+            if isinstance(error, ValidationError):
+                first = error.errors()[0]
+                location = ".".join(str(part) for part in first["loc"])
+                message = f"{location}: {first['msg']}" if location else first["msg"]
+            self._report.errors.append(ImportRowError(line=line_number, error=message))
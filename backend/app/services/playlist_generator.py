@@ -0,0 +1,239 @@
+"""
+Playlist generator - builds playlists to a target duration from the catalog
+"""
+
+import time
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from app.models.playlist import Playlist, Song, track_key
+from app.schemas.playlist import PlaylistCreate, PlaylistGenerateRequest, SongCreate
+from app.services.playlist_service import PlaylistService
+
+# Candidates inspected per search before giving up on a duration range
+MAX_PROBES = 64
+
+
+class _Bucket:
+    """Candidates sharing one duration quota, with a duration-sorted view"""
+
+    def __init__(self, songs: List[Song], quota: int):
+        self.songs = songs
+        self.durations = np.fromiter(
+            (song.duration for song in songs), dtype=np.int64, count=len(songs)
+        )
+        self.by_duration = np.argsort(self.durations, kind="stable")
+        self.sorted_durations = self.durations[self.by_duration]
+        self.selected = np.zeros(len(songs), dtype=bool)
+        self.remaining = quota
+
+
+class _Constraints:
+    """Artist and repeat limits shared by every bucket of one playlist"""
+
+    def __init__(self, max_per_artist: Optional[int], allow_repeats: bool):
+        self.max_per_artist = max_per_artist
+        self.allow_repeats = allow_repeats
+        self.artist_counts: Dict[str, int] = {}
+        self.tracks: Set[Tuple[str, str]] = set()
+
+    def allows(self, song: Song, replacing: Optional[Song] = None) -> bool:
+        """Whether song can be added, optionally in place of a selected song"""
+        if self.max_per_artist is not None:
+            artist = song.artist.lower()
+            count = self.artist_counts.get(artist, 0)
+            if replacing is not None and replacing.artist.lower() == artist:
+                count -= 1
+            if count >= self.max_per_artist:
+                return False
+        if not self.allow_repeats:
+            key = track_key(song)
+            if key in self.tracks and (
+                replacing is None or track_key(replacing) != key
+            ):
+                return False
+        return True
+
+    def add(self, song: Song):
+        artist = song.artist.lower()
+        self.artist_counts[artist] = self.artist_counts.get(artist, 0) + 1
+        self.tracks.add(track_key(song))
+
+    def remove(self, song: Song):
+        self.artist_counts[song.artist.lower()] -= 1
+        self.tracks.discard(track_key(song))
+
+
+class PlaylistGenerator:
+    """Fills a target duration from seed categories under artist, repeat and genre-mix constraints
+
+    Each genre in the mix gets a share of the target duration. A greedy
+    pass over shuffled candidates fills each share, then a local search
+    closes what is left by adding the longest song that still fits or
+    swapping a selected song for a longer one. The local search stops at
+    the time budget, and constraints are only checked for songs actually
+    considered, so large candidate pools return promptly.
+    """
+
+    def __init__(self, playlist_service: PlaylistService, time_budget: float = 0.25):
+        self.playlist_service = playlist_service
+        self.time_budget = time_budget
+
+    def generate(self, request: PlaylistGenerateRequest) -> Playlist:
+        """Generate a playlist and store it in the catalog
+
+        Raises ValueError if no songs with a duration match the seed categories.
+        """
+        songs = self.select_songs(request)
+        if not songs:
+            raise ValueError("No songs with a duration match the seed categories")
+        return self.playlist_service.create_playlist(
+            PlaylistCreate(
+                name=request.name,
+                description=request.description,
+                songs=[
+                    SongCreate(
+                        title=song.title,
+                        artist=song.artist,
+                        genre=song.genre,
+                        duration=song.duration,
+                    )
+                    for song in songs
+                ],
+            )
+        )
+
+    def select_songs(self, request: PlaylistGenerateRequest) -> List[Song]:
+        """Pick songs for a request without storing them"""
+        deadline = time.perf_counter() + self.time_budget
+        rng = np.random.default_rng(request.seed)
+        constraints = _Constraints(request.max_tracks_per_artist, request.allow_repeats)
+        selected: List[Song] = []
+        for songs, quota in self._buckets(request):
+            bucket = _Bucket(songs, quota)
+            self._fill(bucket, constraints, rng, deadline)
+            selected.extend(
+                bucket.songs[row] for row in np.flatnonzero(bucket.selected)
+            )
+        return [selected[row] for row in rng.permutation(len(selected))]
+
+    def _buckets(
+        self, request: PlaylistGenerateRequest
+    ) -> List[Tuple[List[Song], int]]:
+        """Split candidates in the seed categories into (songs, duration quota) buckets"""
+        catalog = self.playlist_service.snapshot()
+        candidates: Dict[int, Song] = {}
+        for category in request.seed_categories:
+            name = category.lower()
+            # Genres take precedence over artists, as in CategoryService
+            songs = (
+                catalog.genre_index.get(name) or catalog.artist_index.get(name) or {}
+            )
+            candidates.update(songs)
+
+        target = request.target_duration
+        if not request.genre_mix:
+            groups = [(candidates.values(), 1.0)]
+        else:
+            total_ratio = sum(request.genre_mix.values())
+            groups = []
+            for genre, ratio in request.genre_mix.items():
+                in_genre = catalog.genre_index.get(genre.lower(), {})
+                if len(in_genre) > len(candidates):
+                    songs = [
+                        song for song in candidates.values() if song.id in in_genre
+                    ]
+                else:
+                    songs = [
+                        song
+                        for song in list(in_genre.values())
+                        if song.id in candidates
+                    ]
+                groups.append((songs, ratio / total_ratio))
+        return [
+            (
+                [song for song in songs if song.duration and song.duration <= target],
+                int(target * share),
+            )
+            for songs, share in groups
+        ]
+
+    def _fill(
+        self,
+        bucket: _Bucket,
+        constraints: _Constraints,
+        rng: np.random.Generator,
+        deadline: float,
+    ):
+        """Fill a bucket's quota greedily, then improve it by local search"""
+        if not len(bucket.songs):
+            return
+        shortest = int(bucket.sorted_durations[0])
+        durations = bucket.durations.tolist()
+        for row in rng.permutation(len(durations)).tolist():
+            if bucket.remaining < shortest:
+                break
+            song = bucket.songs[row]
+            if durations[row] <= bucket.remaining and constraints.allows(song):
+                self._select(bucket, constraints, row)
+
+        while bucket.remaining > 0 and time.perf_counter() < deadline:
+            row = self._longest_fit(bucket, constraints, 0, bucket.remaining)
+            if row is not None:
+                self._select(bucket, constraints, row)
+                continue
+            if not self._improving_swap(bucket, constraints, deadline):
+                break
+
+    def _improving_swap(
+        self, bucket: _Bucket, constraints: _Constraints, deadline: float
+    ) -> bool:
+        """Swap one selected song for a longer one that still fits the quota"""
+        for row in np.flatnonzero(bucket.selected).tolist():
+            if time.perf_counter() > deadline:
+                return False
+            duration = int(bucket.durations[row])
+            replacement = self._longest_fit(
+                bucket,
+                constraints,
+                duration,
+                duration + bucket.remaining,
+                replacing=bucket.songs[row],
+            )
+            if replacement is not None:
+                self._deselect(bucket, constraints, row)
+                self._select(bucket, constraints, replacement)
+                return True
+        return False
+
+    @staticmethod
+    def _longest_fit(
+        bucket: _Bucket,
+        constraints: _Constraints,
+        shorter_than: int,
+        at_most: int,
+        replacing: Optional[Song] = None,
+    ) -> Optional[int]:
+        """Longest unselected song with shorter_than < duration <= at_most"""
+        position = int(np.searchsorted(bucket.sorted_durations, at_most, "right")) - 1
+        for _ in range(MAX_PROBES):
+            if position < 0 or bucket.sorted_durations[position] <= shorter_than:
+                return None
+            row = int(bucket.by_duration[position])
+            if not bucket.selected[row] and constraints.allows(
+                bucket.songs[row], replacing
+            ):
+                return row
+            position -= 1
+        return None
+
+    @staticmethod
+    def _select(bucket: _Bucket, constraints: _Constraints, row: int):
+        bucket.selected[row] = True
+        bucket.remaining -= int(bucket.durations[row])
+        constraints.add(bucket.songs[row])
+
+    @staticmethod
+    def _deselect(bucket: _Bucket, constraints: _Constraints, row: int):
+        bucket.selected[row] = False
+        bucket.remaining += int(bucket.durations[row])
+        constraints.remove(bucket.songs[row])
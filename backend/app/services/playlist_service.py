@@ -1,109 +1,548 @@
 """
 Playlist service - business logic layer
 """
-from typing import List, Optional
+import bisect
+import threading
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
 from datetime import datetime
-from app.models.playlist import Playlist, Song
-from app.schemas.playlist import PlaylistCreate, PlaylistUpdate
+from app.metrics import timed
+from app.models.playlist import Playlist, Song, TrackEdit, track_fingerprint
+from app.models.track_table import TrackTable
+from app.repositories.sqlite_repository import SQLitePlaylistRepository
+from app.schemas.playlist import PlaylistCreate, PlaylistUpdate, SongCreate, TrackOperation
+from app.services.change_log import ChangeLog
+
+
+class CatalogSnapshot(NamedTuple):
+    """Read-only, zero-copy view of the catalog held by PlaylistService
+    
+    Playlists in the catalog are never modified: writers publish a new
+    Playlist in place of the old one, so a reader holding one always sees a
+    single write's name, description and songs. Index buckets are updated
+    in place, one song at a time; copy a bucket with one call, such as
+    list(bucket.values()), and count and list songs from that copy.
+    """
+    
+    playlists: Mapping[int, Playlist]
+    genre_index: Mapping[str, Mapping[int, Song]]
+    artist_index: Mapping[str, Mapping[int, Song]]
+
+
+class CatalogListener:
+    """Receives song-level catalog changes from PlaylistService
+    
+    `songs_added` and `songs_removed` get the entries a write adds to or
+    removes from a playlist; a track may appear in many playlists, and more
+    than once in one. `tracks_added` and `tracks_removed` get the canonical
+    tracks that joined the catalog with their first entry or left it with
+    their last, with the playlist that was written; they are called before
+    `songs_added` and after `songs_removed` respectively.
+    
+    Callbacks run synchronously under the service's write lock, so they
+    should only do bookkeeping proportional to the songs passed in.
+    """
+    
+    def songs_added(self, playlist: Playlist, songs: List[Song]):
+        pass
+    
+    def songs_removed(self, playlist: Playlist, songs: List[Song]):
+        pass
+    
+    def tracks_added(self, playlist: Playlist, songs: List[Song]):
+        pass
+    
+    def tracks_removed(self, playlist: Playlist, songs: List[Song]):
+        pass
+
+
+def first_appearances(playlists: Iterable[Playlist]) -> Iterator[Tuple[Playlist, List[Song]]]:
+    """Yield each playlist with the tracks it is the first to hold
+    
+    Gives every track of the catalog exactly once, with the playlist that
+    PlaylistService reports for it after loading the same playlists.
+    """
+    seen = set()
+    for playlist in playlists:
+        songs = []
+        for song in playlist.songs:
+            if song.id not in seen:
+                seen.add(song.id)
+                songs.append(song)
+        yield playlist, songs
+
+
+class IdAllocator:
+    """Hands out increasing IDs to any number of threads without repeats
+    
+    IDs reserved by a write that then fails are not reused, like those of a
+    database sequence.
+    """
+    
+    def __init__(self, start: int = 1):
+        self._next = start
+        self._lock = threading.Lock()
+    
+    def reserve(self, count: int = 1) -> int:
+        """Reserve `count` consecutive IDs and return the first of them"""
+        with self._lock:
+            first = self._next
+            self._next += count
+            return first
+    
+    def advance_past(self, used_id: int):
+        """Never hand out IDs up to `used_id`, which are already taken"""
+        with self._lock:
+            self._next = max(self._next, used_id + 1)
 
 
 class PlaylistService:
-    """Service for managing playlists"""
+    """Service for managing playlists
+    
+    Reads take no locks. Writes are serialized by a write lock and publish
+    new Playlist objects rather than modifying ones readers may hold; see
+    CatalogSnapshot. With a change log, every write is also logged under
+    the lock, so the log's order is the order writes were applied in.
     
-    def __init__(self):
-        # In-memory storage (replace with database in production)
-        self._playlists: List[Playlist] = []
-        self._next_id = 1
-        self._next_song_id = 1
+    Songs are canonical tracks: every entry with the same normalized
+    (title, artist, genre, duration) refers to one Song, found through the
+    track table's fingerprint index, so a song ID identifies a track
+    wherever it appears. Tracks missing from the table are built, with IDs
+    from their own allocator, before the lock is taken; under the lock each
+    song is resolved to the track already in the table, if any.
+    """
+    
+    def __init__(
+        self,
+        repository: Optional[SQLitePlaylistRepository] = None,
+        change_log: Optional[ChangeLog] = None,
+    ):
+        # In-memory working set, written through to the repository when given
+        # Keyed by ID; dict insertion order keeps playlists in creation order
+        self._playlists: Dict[int, Playlist] = {}
+        # Sorted playlist IDs, used to seek to a pagination cursor. Deleted
+        # IDs stay until they outnumber the live ones, and readers skip them
+        self._ordered_ids: List[int] = []
+        self._deleted_ids = 0
+        self._playlist_ids = IdAllocator()
+        self._song_ids = IdAllocator()
+        self._repository = repository
+        self._change_log = change_log
+        # Serializes writers; route handlers run writes in a threadpool
+        self._write_lock = threading.Lock()
+        # Bumped on every write so readers can detect stale derived data
+        self._version = 0
+        
+        self._listeners: List[CatalogListener] = []
+        self._tracks = TrackTable()
+        # Track ID -> the earliest-added playlist still holding it
+        self._song_playlists: Dict[int, int] = {}
+        # Category indexes: normalized (lowercased) name -> {song_id: Song}
+        self._genre_index: Dict[str, Dict[int, Song]] = {}
+        self._artist_index: Dict[str, Dict[int, Song]] = {}
+        
+        if self._repository is not None:
+            self._load_from_repository()
         
         # Initialize with sample data
-        self._initialize_sample_data()
+        if not self._playlists:
+            self._initialize_sample_data()
+    
+    def _load_from_repository(self):
+        """Populate the in-memory catalog and indexes from the repository"""
+        for playlist in self._repository.load_playlists():
+            self._playlists[playlist.id] = playlist
+            self._ordered_ids.append(playlist.id)
+            self._index_songs(playlist, playlist.songs)
+            self._playlist_ids.advance_past(playlist.id)
+            for song in playlist.songs:
+                self._song_ids.advance_past(song.id)
+    
+    def _persist(self, playlist: Playlist):
+        """Write a playlist through to the repository, if one is configured"""
+        if self._repository is not None:
+            self._repository.save_playlist(playlist)
     
     def _initialize_sample_data(self):
         """Initialize with sample playlists"""
         # Sample playlist with songs of different genres
+        first_song_id = self._song_ids.reserve(4)
         sample_playlist = Playlist(
-            id=self._next_id,
+            id=self._playlist_ids.reserve(),
             name="My First Playlist",
             description="A sample playlist with various genres",
             songs=[
-                Song(id=self._next_song_id, title="Pop Song 1", artist="Artist A", genre="pop", duration=180),
-                Song(id=self._next_song_id + 1, title="Sad Song 1", artist="Artist B", genre="sad", duration=200),
-                Song(id=self._next_song_id + 2, title="Rock Song 1", artist="Artist C", genre="rock", duration=220),
-                Song(id=self._next_song_id + 3, title="Pop Song 2", artist="Artist A", genre="pop", duration=190),
+                Song(id=first_song_id, title="Pop Song 1", artist="Artist A", genre="pop", duration=180),
+                Song(id=first_song_id + 1, title="Sad Song 1", artist="Artist B", genre="sad", duration=200),
+                Song(id=first_song_id + 2, title="Rock Song 1", artist="Artist C", genre="rock", duration=220),
+                Song(id=first_song_id + 3, title="Pop Song 2", artist="Artist A", genre="pop", duration=190),
             ]
         )
-        self._next_id += 1
-        self._next_song_id += 4
-        self._playlists.append(sample_playlist)
+        self._playlists[sample_playlist.id] = sample_playlist
+        self._ordered_ids.append(sample_playlist.id)
+        self._index_songs(sample_playlist, sample_playlist.songs)
+        self._persist(sample_playlist)
+        if self._change_log is not None:
+            self._change_log.playlist_created(sample_playlist)
+    
+    def _index_songs(self, playlist: Playlist, songs: List[Song]):
+        """Reference songs from a playlist, indexing tracks new to the catalog, and notify listeners"""
+        tracks = self._tracks.add_references(playlist.id, songs)
+        for song in tracks:
+            self._song_playlists[song.id] = playlist.id
+            if song.genre:
+                self._genre_index.setdefault(song.genre.lower(), {})[song.id] = song
+            self._artist_index.setdefault(song.artist.lower(), {})[song.id] = song
+        for listener in self._listeners:
+            if tracks:
+                listener.tracks_added(playlist, tracks)
+            if songs:
+                listener.songs_added(playlist, songs)
+    
+    def _unindex_songs(self, playlist: Playlist, songs: List[Song]):
+        """Drop a playlist's references to songs, unindexing tracks left unreferenced, and notify listeners"""
+        tracks = self._tracks.remove_references(playlist.id, songs)
+        for song in songs:
+            # A track this playlist was reporting moves to the earliest-added
+            # playlist still holding it
+            if self._song_playlists.get(song.id) == playlist.id:
+                holder = self._tracks.first_holder(song.id)
+                if holder is None:
+                    del self._song_playlists[song.id]
+                elif holder != playlist.id:
+                    self._song_playlists[song.id] = holder
+        for song in tracks:
+            if song.genre:
+                self._remove_from_index(self._genre_index, song.genre.lower(), song.id)
+            self._remove_from_index(self._artist_index, song.artist.lower(), song.id)
+        for listener in self._listeners:
+            if songs:
+                listener.songs_removed(playlist, songs)
+            if tracks:
+                listener.tracks_removed(playlist, tracks)
+    
+    @staticmethod
+    def _changed_entries(old: List[Song], new: List[Song]) -> Tuple[List[Song], List[Song]]:
+        """Entries in `new` but not `old` and in `old` but not `new`, counting repeats"""
+        counts: Dict[int, int] = {}
+        for song in old:
+            counts[song.id] = counts.get(song.id, 0) + 1
+        added = []
+        for song in new:
+            count = counts.get(song.id)
+            if count:
+                counts[song.id] = count - 1
+            else:
+                added.append(song)
+        removed = []
+        for song in old:
+            count = counts.get(song.id)
+            if count:
+                counts[song.id] = count - 1
+                removed.append(song)
+        return added, removed
+    
+    @staticmethod
+    def _remove_from_index(index: Dict[str, Dict[int, Song]], key: str, song_id: int):
+        """Remove a song from an index bucket, dropping the bucket once empty"""
+        bucket = index.get(key)
+        if bucket is None:
+            return
+        bucket.pop(song_id, None)
+        if not bucket:
+            del index[key]
+    
+    def add_listener(self, listener: CatalogListener):
+        """Register a listener for songs added to or removed from the catalog"""
+        with self._write_lock:
+            self._listeners.append(listener)
+    
+    def get_song_by_id(self, song_id: int) -> Optional[Song]:
+        """Get a song by ID"""
+        return self._tracks.get(song_id)
+    
+    def get_song_playlist_id(self, song_id: int) -> Optional[int]:
+        """Get the ID of the earliest-added playlist that still holds a song"""
+        return self._song_playlists.get(song_id)
+    
+    @property
+    def track_count(self) -> int:
+        """Number of distinct tracks held by the catalog's playlists"""
+        return len(self._tracks)
+    
+    @property
+    def change_seq(self) -> Optional[int]:
+        """Sequence number of the last logged write, or None without a change log"""
+        return self._change_log.last_seq if self._change_log is not None else None
+    
+    @property
+    def version(self) -> int:
+        """Catalog version, incremented by every create, update and delete"""
+        return self._version
+    
+    def snapshot(self) -> CatalogSnapshot:
+        """Get a read-only view of the catalog without copying it"""
+        return CatalogSnapshot(
+            playlists=MappingProxyType(self._playlists),
+            genre_index=MappingProxyType(self._genre_index),
+            artist_index=MappingProxyType(self._artist_index),
+        )
+    
+    @contextmanager
+    def locked_snapshot(self) -> Iterator[CatalogSnapshot]:
+        """Hold off writers while reading a consistent view of the catalog"""
+        with self._write_lock:
+            yield self.snapshot()
+    
+    def get_genres(self) -> List[str]:
+        """Get all normalized genre names"""
+        return list(self._genre_index)
+    
+    def get_artists(self) -> List[str]:
+        """Get all normalized artist names"""
+        return list(self._artist_index)
+    
+    def get_songs_by_genre(self, genre: str) -> List[Song]:
+        """Get all songs of a genre using the genre index"""
+        return list(self._genre_index.get(genre.lower(), {}).values())
+    
+    def get_songs_by_artist(self, artist: str) -> List[Song]:
+        """Get all songs by an artist using the artist index"""
+        return list(self._artist_index.get(artist.lower(), {}).values())
+    
+    def _build_songs(self, songs_data: List[SongCreate]) -> List[Song]:
+        """Find the tracks already in the catalog and create the others; needs no lock
+        
+        New songs get a block of new song IDs. The result must still go
+        through `_tracks.resolve` under the write lock, since tracks may be
+        added or dropped meanwhile.
+        """
+        fingerprints = [track_fingerprint(song_data) for song_data in songs_data]
+        songs = [self._tracks.find(fingerprint) for fingerprint in fingerprints]
+        missing = [offset for offset, song in enumerate(songs) if song is None]
+        first_id = self._song_ids.reserve(len(missing)) if missing else 0
+        for song_id, offset in enumerate(missing, first_id):
+            song_data = songs_data[offset]
+            songs[offset] = Song(
+                id=song_id,
+                title=song_data.title,
+                artist=song_data.artist,
+                genre=song_data.genre,
+                duration=song_data.duration,
+                fingerprint=fingerprints[offset]
+            )
+        return songs
+    
+    @staticmethod
+    def _revised(playlist: Playlist, **changes) -> Playlist:
+        """Copy a playlist with some fields changed, to publish in its place"""
+        return Playlist(
+            id=playlist.id,
+            name=changes.get("name", playlist.name),
+            description=changes.get("description", playlist.description),
+            songs=changes.get("songs", playlist.songs),
+            created_at=playlist.created_at,
+            updated_at=datetime.now()
+        )
     
     def get_all_playlists(self) -> List[Playlist]:
         """Get all playlists"""
-        return self._playlists
+        return list(self._playlists.values())
+    
+    def iter_playlists(self, after_id: Optional[int] = None) -> Iterator[Playlist]:
+        """Iterate playlists in ID order, starting after `after_id`
+        
+        The ID list is copied up front so writes during iteration are safe;
+        playlists deleted meanwhile are skipped.
+        """
+        ordered_ids = self._ordered_ids
+        start = 0 if after_id is None else bisect.bisect_right(ordered_ids, after_id)
+        for playlist_id in ordered_ids[start:]:
+            playlist = self._playlists.get(playlist_id)
+            if playlist is not None:
+                yield playlist
+    
+    def get_playlists_page(self, limit: int, after_id: Optional[int] = None) -> Tuple[List[Playlist], Optional[int]]:
+        """Get up to `limit` playlists after `after_id`, plus the ID to resume after"""
+        ordered_ids = self._ordered_ids
+        position = 0 if after_id is None else bisect.bisect_right(ordered_ids, after_id)
+        playlists = []
+        # Deleted playlists are skipped
+        while position < len(ordered_ids) and len(playlists) < limit:
+            playlist = self._playlists.get(ordered_ids[position])
+            position += 1
+            if playlist is not None:
+                playlists.append(playlist)
+        has_more = position < len(ordered_ids)
+        return playlists, (ordered_ids[position - 1] if has_more and playlists else None)
     
     def get_playlist_by_id(self, playlist_id: int) -> Optional[Playlist]:
         """Get a playlist by ID"""
-        return next((p for p in self._playlists if p.id == playlist_id), None)
+        return self._playlists.get(playlist_id)
     
+    @timed("create_playlist")
     def create_playlist(self, playlist_data: PlaylistCreate) -> Playlist:
         """Create a new playlist"""
-        songs = []
-        for song_data in playlist_data.songs:
-            song = Song(
-                id=self._next_song_id,
-                title=song_data.title,
-                artist=song_data.artist,
-                genre=song_data.genre,
-                duration=song_data.duration
-            )
-            songs.append(song)
-            self._next_song_id += 1
-        
+        songs = self._build_songs(playlist_data.songs)
+        with self._write_lock:
+            return self._create_playlist(playlist_data, self._tracks.resolve(songs))
+    
+    def _create_playlist(self, playlist_data: PlaylistCreate, songs: List[Song]) -> Playlist:
+        # Allocated under the lock so playlists are published in ID order
         playlist = Playlist(
-            id=self._next_id,
+            id=self._playlist_ids.reserve(),
             name=playlist_data.name,
             description=playlist_data.description,
             songs=songs,
             created_at=datetime.now(),
             updated_at=datetime.now()
         )
-        self._next_id += 1
-        self._playlists.append(playlist)
+        self._persist(playlist)
+        if self._change_log is not None:
+            self._change_log.playlist_created(playlist)
+        self._playlists[playlist.id] = playlist
+        # IDs only grow, so appending keeps the list sorted
+        self._ordered_ids.append(playlist.id)
+        self._index_songs(playlist, songs)
+        self._version += 1
         return playlist
     
     def update_playlist(self, playlist_id: int, playlist_data: PlaylistUpdate) -> Optional[Playlist]:
         """Update an existing playlist"""
+        songs = self._build_songs(playlist_data.songs) if playlist_data.songs is not None else None
+        with self._write_lock:
+            if songs is not None:
+                songs = self._tracks.resolve(songs)
+            return self._update_playlist(playlist_id, playlist_data, songs)
+    
+    def _update_playlist(
+        self, playlist_id: int, playlist_data: PlaylistUpdate, songs: Optional[List[Song]]
+    ) -> Optional[Playlist]:
         playlist = self.get_playlist_by_id(playlist_id)
         if not playlist:
             return None
         
+        changes = {}
         if playlist_data.name is not None:
-            playlist.name = playlist_data.name
+            changes["name"] = playlist_data.name
         if playlist_data.description is not None:
-            playlist.description = playlist_data.description
-        if playlist_data.songs is not None:
-            songs = []
-            for song_data in playlist_data.songs:
-                song = Song(
-                    id=self._next_song_id,
-                    title=song_data.title,
-                    artist=song_data.artist,
-                    genre=song_data.genre,
-                    duration=song_data.duration
-                )
-                songs.append(song)
-                self._next_song_id += 1
-            playlist.songs = songs
+            changes["description"] = playlist_data.description
+        if songs is not None:
+            changes["songs"] = songs
+        revised = self._revised(playlist, **changes)
+        self._persist(revised)
+        if self._change_log is not None:
+            self._change_log.playlist_updated(revised)
+        self._playlists[revised.id] = revised
+        if songs is not None:
+            # Entries kept by the new song list keep their tracks indexed
+            added, removed = self._changed_entries(playlist.songs, songs)
+            self._unindex_songs(playlist, removed)
+            self._index_songs(revised, added)
         
-        playlist.updated_at = datetime.now()
-        return playlist
+        self._version += 1
+        return revised
+    
+    def append_songs(self, playlist_id: int, songs_data: List[SongCreate]) -> Optional[List[Song]]:
+        """Append a batch of songs to a playlist
+        
+        Song IDs are reserved as one contiguous block and the category indexes
+        and repository are updated once for the whole batch.
+        """
+        songs = self._build_songs(songs_data)
+        with self._write_lock:
+            playlist = self.get_playlist_by_id(playlist_id)
+            if not playlist:
+                return None
+            
+            songs = self._tracks.resolve(songs)
+            revised = self._revised(playlist, songs=playlist.songs + songs)
+            if self._repository is not None:
+                self._repository.append_playlist_songs(revised, songs)
+            if self._change_log is not None:
+                self._change_log.songs_appended(revised, songs, len(playlist.songs))
+            self._playlists[revised.id] = revised
+            self._index_songs(revised, songs)
+            self._version += 1
+            return songs
+    
+    def patch_playlist_songs(self, playlist_id: int, operations: List[TrackOperation]) -> Optional[Playlist]:
+        """Apply track-level edits to a playlist, keeping the IDs of untouched songs
+        
+        Operations are applied in order and atomically: if any position is out
+        of range a ValueError is raised and the playlist is left unchanged.
+        The repository and change log get the operations rather than the
+        whole playlist, so they do work proportional to the edit.
+        """
+        with self._write_lock:
+            playlist = self.get_playlist_by_id(playlist_id)
+            if not playlist:
+                return None
+            
+            songs = list(playlist.songs)
+            # Songs of inserts and replaces, in order, resolved as one batch
+            songs_data = [operation.song for operation in operations if operation.op in ("insert", "replace")]
+            new_songs = iter(self._tracks.resolve(self._build_songs(songs_data)))
+            edits = []
+            # Entries the operations took out of and put into the playlist
+            taken = []
+            put = []
+            for index, operation in enumerate(operations):
+                size = len(songs)
+                # Inserting may append at the end; everything else needs an existing track
+                limit = size + 1 if operation.op == "insert" else size
+                if operation.position >= limit:
+                    raise ValueError(f"Operation {index}: position {operation.position} is out of range")
+                
+                if operation.op == "insert":
+                    song = next(new_songs)
+                    songs.insert(operation.position, song)
+                    put.append(song)
+                elif operation.op == "remove":
+                    song = None
+                    taken.append(songs.pop(operation.position))
+                elif operation.op == "replace":
+                    song = next(new_songs)
+                    taken.append(songs[operation.position])
+                    songs[operation.position] = song
+                    put.append(song)
+                elif operation.op == "move":
+                    song = None
+                    if operation.to_position >= size:
+                        raise ValueError(f"Operation {index}: to_position {operation.to_position} is out of range")
+                    songs.insert(operation.to_position, songs.pop(operation.position))
+                edits.append(TrackEdit(operation.op, operation.position, operation.to_position, song))
+            
+            revised = self._revised(playlist, songs=songs)
+            added, removed = self._changed_entries(taken, put)
+            if self._repository is not None:
+                self._repository.patch_playlist_songs(revised, edits)
+            if self._change_log is not None:
+                self._change_log.playlist_patched(revised, edits)
+            self._playlists[revised.id] = revised
+            self._unindex_songs(playlist, removed)
+            self._index_songs(revised, added)
+            self._version += 1
+            return revised
     
     def delete_playlist(self, playlist_id: int) -> bool:
         """Delete a playlist"""
-        playlist = self.get_playlist_by_id(playlist_id)
-        if not playlist:
-            return False
-        
-        self._playlists.remove(playlist)
-        return True
+        with self._write_lock:
+            playlist = self._playlists.pop(playlist_id, None)
+            if not playlist:
+                return False
+            
+            if self._repository is not None:
+                self._repository.delete_playlist(playlist_id)
+            if self._change_log is not None:
+                self._change_log.playlist_deleted(playlist_id)
+            self._deleted_ids += 1
+            if self._deleted_ids > len(self._playlists):
+                # Rebuilt rather than edited in place, for readers iterating it
+                self._ordered_ids = [i for i in self._ordered_ids if i in self._playlists]
+                self._deleted_ids = 0
+            self._unindex_songs(playlist, playlist.songs)
+            self._version += 1
+            return True
 
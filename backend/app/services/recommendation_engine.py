@@ -0,0 +1,236 @@
+"""
+Similarity-based recommendation engine over the playlist catalog
+"""
+
+from typing import Iterable, List, Optional, Union
+import numpy as np
+from app.models.playlist import Playlist, Song
+from app.models.song_columns import MISSING_CODE, MISSING_DURATION, SongColumns
+
+# Feature weights: genre match, artist affinity, playlist co-occurrence and
+# closeness in duration to the songs that define the category
+GENRE_WEIGHT = 1.0
+ARTIST_WEIGHT = 0.5
+COOCCURRENCE_WEIGHT = 0.5
+DURATION_WEIGHT = 0.25
+
+DURATION_BUCKET_SECONDS = 30
+# Only the artists and playlists most concentrated in a category contribute
+# candidates, which bounds the work per query
+MAX_SEED_ARTISTS = 64
+MAX_SEED_PLAYLISTS = 64
+# Genres making up less of a category than this are not scored wholesale;
+# their songs are still reached through shared artists and playlists
+MIN_GENRE_SHARE = 0.2
+# Recommendations served for requests without a category
+GENERAL_RESULTS = 20
+
+
+class _Groups:
+    """Rows grouped by an integer code, CSR-style: order[offsets[c]:offsets[c + 1]]"""
+
+    def __init__(self, codes: np.ndarray, n_codes: int):
+        self.order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes, minlength=n_codes)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def rows(self, code: int) -> np.ndarray:
+        return self.order[self.offsets[code] : self.offsets[code + 1]]
+
+    def rows_of(self, codes: np.ndarray) -> np.ndarray:
+        if not len(codes):
+            return np.empty(0, dtype=self.order.dtype)
+        return np.concatenate([self.rows(code) for code in codes])
+
+
+class RecommendationEngine:
+    """Scores songs against a category profile with vectorized NumPy operations
+
+    Each song is described by one-hot genre, artist and duration-bucket
+    features plus the playlist it appears in. A category (genre or artist)
+    profile is the mean feature vector of its songs, and a song's score is
+    the dot product of its features with that profile. Because the
+    features are one-hot, the dot product reduces to array gathers.
+
+    Only songs sharing a genre, artist or top playlist with the category
+    are scored, so a query costs time proportional to that candidate set
+    rather than to the catalog. Rows are stored sorted by genre, then
+    artist, so each genre is a contiguous slice that is scored without
+    random access. The top-k uses argpartition rather than a full sort.
+    """
+
+    def __init__(self, playlists: Iterable[Playlist]):
+        songs: List[Song] = []
+        playlist_sizes: List[int] = []
+        for playlist in playlists:
+            songs.extend(playlist.songs)
+            playlist_sizes.append(len(playlist.songs))
+        columns = SongColumns.from_songs(songs)
+
+        # Lowercase the dictionary-encoded names so lookups match the category indexes
+        self.genre_codes = {}
+        self.artist_codes = {}
+        genre_map = self._normalize(columns.genres.values, self.genre_codes)
+        artist_map = self._normalize(columns.artists.values, self.artist_codes)
+        raw_genres = np.frombuffer(columns.column("genre_codes"), dtype=np.int32)
+        raw_artists = np.frombuffer(columns.column("artist_codes"), dtype=np.int32)
+        # Songs without a genre get their own code after the real genres
+        genres = np.where(
+            raw_genres == MISSING_CODE, len(self.genre_codes), genre_map[raw_genres]
+        )
+        artists = artist_map[raw_artists]
+        durations = np.frombuffer(columns.column("durations"), dtype=np.int32)
+        # Bucket 0 is reserved for songs with no duration
+        buckets = np.where(
+            durations == MISSING_DURATION, 0, durations // DURATION_BUCKET_SECONDS + 1
+        )
+        self.playlist_sizes = np.asarray(playlist_sizes, dtype=np.int64)
+        song_playlists = np.repeat(np.arange(len(playlist_sizes)), self.playlist_sizes)
+
+        order = np.lexsort((artists, genres))
+        self.songs = [songs[row] for row in order.tolist()]
+        self.genres = genres[order].astype(np.int32)
+        self.artists = artists[order].astype(np.int32)
+        self.buckets = buckets[order].astype(np.int32)
+        self.playlists = song_playlists[order].astype(np.int32)
+
+        self.n_genres = len(self.genre_codes) + 1
+        self.n_artists = len(self.artist_codes)
+        self.n_buckets = int(self.buckets.max()) + 1 if len(self.songs) else 1
+        # Rows are sorted by genre, so a genre is the slice between two offsets
+        self.genre_offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(self.genres, minlength=self.n_genres)))
+        )
+        self._row_ids = np.arange(len(self.songs))
+        self.by_artist = _Groups(self.artists, self.n_artists)
+        self.by_playlist = _Groups(self.playlists, len(playlist_sizes))
+        self._general = self._rank_general()
+
+    @staticmethod
+    def _normalize(values: List[str], codes: dict) -> np.ndarray:
+        mapping = np.empty(len(values), dtype=np.int64)
+        for raw_code, value in enumerate(values):
+            mapping[raw_code] = codes.setdefault(value.lower(), len(codes))
+        return mapping
+
+    def _genre_slice(self, code: int) -> slice:
+        return slice(int(self.genre_offsets[code]), int(self.genre_offsets[code + 1]))
+
+    def recommend(self, category: Optional[str], limit: int) -> List[Song]:
+        """Get the top `limit` songs for a genre or artist name
+
+        Genres take precedence over artists with the same name. Without a
+        category, or for one not in the catalog, the most broadly popular
+        songs are returned.
+        """
+        if category is not None:
+            category = category.lower()
+            if category in self.genre_codes:
+                return self._rank(self._genre_slice(self.genre_codes[category]), limit)
+            if category in self.artist_codes:
+                rows = self.by_artist.rows(self.artist_codes[category])
+                return self._rank(rows, limit)
+        return self._distinct_songs(self._general, limit)
+
+    def _rank(self, seeds: Union[slice, np.ndarray], limit: int) -> List[Song]:
+        # Category profile: mean one-hot vector of the seed songs
+        genres = self.genres[seeds]
+        n_seeds = len(genres)
+        genre_profile = np.bincount(genres, minlength=self.n_genres) / n_seeds
+        artist_profile = (
+            np.bincount(self.artists[seeds], minlength=self.n_artists) / n_seeds
+        )
+        bucket_profile = (
+            np.bincount(self.buckets[seeds], minlength=self.n_buckets) / n_seeds
+        )
+        # Share of each playlist made up of category songs
+        playlist_profile = np.bincount(
+            self.playlists[seeds], minlength=len(self.playlist_sizes)
+        ) / np.maximum(self.playlist_sizes, 1)
+        profiles = (genre_profile, artist_profile, playlist_profile, bucket_profile)
+
+        # Whole genres are scored slice by slice; artist and playlist
+        # neighbours are gathered by row
+        candidate_rows = []
+        candidate_scores = []
+        for code in np.flatnonzero(genre_profile >= MIN_GENRE_SHARE):
+            rows = self._genre_slice(code)
+            candidate_rows.append(self._row_ids[rows])
+            candidate_scores.append(self._score(rows, profiles))
+        rows = np.concatenate(
+            (
+                self.by_artist.rows_of(
+                    self._strongest(artist_profile, MAX_SEED_ARTISTS)
+                ),
+                self.by_playlist.rows_of(
+                    self._strongest(playlist_profile, MAX_SEED_PLAYLISTS)
+                ),
+            )
+        )
+        candidate_rows.append(rows)
+        candidate_scores.append(self._score(rows, profiles))
+        candidates = np.concatenate(candidate_rows)
+        scores = np.concatenate(candidate_scores)
+
+        # A row can be reached through its genre, artist and playlist, so it
+        # appears at most three times, but a track in many playlists also
+        # has many rows; widen the top k until it holds `limit` tracks
+        k = 3 * limit
+        while True:
+            songs = self._distinct_songs(candidates[self._top_k(scores, k)], limit)
+            if len(songs) == limit or k >= len(scores):
+                return songs
+            k *= 4
+
+    def _distinct_songs(self, rows: np.ndarray, limit: int) -> List[Song]:
+        """Songs at the rows, in order, each at most once
+
+        A track in several playlists has a row per playlist, all holding the
+        same Song.
+        """
+        songs = dict.fromkeys(self.songs[row] for row in rows.tolist())
+        return list(songs)[:limit]
+
+    def _score(self, rows: Union[slice, np.ndarray], profiles) -> np.ndarray:
+        """Dot product of the rows' one-hot features with the category profile"""
+        genre_profile, artist_profile, playlist_profile, bucket_profile = profiles
+        return (
+            GENRE_WEIGHT * genre_profile[self.genres[rows]]
+            + ARTIST_WEIGHT * artist_profile[self.artists[rows]]
+            + COOCCURRENCE_WEIGHT * playlist_profile[self.playlists[rows]]
+            + DURATION_WEIGHT * bucket_profile[self.buckets[rows]]
+        )
+
+    @staticmethod
+    def _strongest(profile: np.ndarray, max_codes: int) -> np.ndarray:
+        """Codes with a non-zero weight in the profile, keeping at most the top max_codes"""
+        codes = np.flatnonzero(profile)
+        if len(codes) > max_codes:
+            codes = codes[np.argpartition(-profile[codes], max_codes)[:max_codes]]
+        return codes
+
+    def _rank_general(self) -> np.ndarray:
+        """Rank songs by how common their artist, genre and duration are"""
+        if not self.songs:
+            return np.empty(0, dtype=np.int64)
+        n_songs = len(self.songs)
+        scores = (
+            GENRE_WEIGHT * (np.bincount(self.genres) / n_songs)[self.genres]
+            + ARTIST_WEIGHT * (np.bincount(self.artists) / n_songs)[self.artists]
+            + DURATION_WEIGHT * (np.bincount(self.buckets) / n_songs)[self.buckets]
+        )
+        # Every row of a track scores the same; rank one row per track
+        song_ids = np.fromiter(
+            (song.id for song in self.songs), dtype=np.int64, count=n_songs
+        )
+        _, rows = np.unique(song_ids, return_index=True)
+        return rows[self._top_k(scores[rows], GENERAL_RESULTS)]
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indexes of the k highest scores, best first, without a full sort"""
+        if k < len(scores):
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        return top[np.argsort(-scores[top], kind="stable")]
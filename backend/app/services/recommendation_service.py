@@ -2,154 +2,193 @@
 Recommendation service - business logic for song recommendations
 """
 
-from typing import List
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+from app.metrics import timed
 from app.models.playlist import Song
-from app.services.category_service import CategoryService
+from app.services.cooccurrence_service import CooccurrenceService
+from app.services.playlist_service import PlaylistService
+from app.services.recommendation_engine import RecommendationEngine
 from app.schemas.recommendation import RecommendationRequest, RecommendationResponse
 
+logger = logging.getLogger(__name__)
+
+# Wait after a failed background rebuild before trying again, doubled for
+# each further failure in a row up to the maximum
+REBUILD_RETRY_SECONDS = 1.0
+MAX_REBUILD_RETRY_SECONDS = 60.0
+
 
 class RecommendationService:
-    """Service for generating song recommendations"""
-
-    def __init__(self):
-        self.category_service = CategoryService()
-        # Dummy recommendation database (in real app, this would be from external API or ML model)
-        self._dummy_recommendations: dict = {
-            "pop": [
-                Song(
-                    id=1001,
-                    title="Popular Pop Hit",
-                    artist="Pop Star",
-                    genre="pop",
-                    duration=195,
-                ),
-                Song(
-                    id=1002,
-                    title="Catchy Tune",
-                    artist="Top Artist",
-                    genre="pop",
-                    duration=210,
-                ),
-                Song(
-                    id=1003,
-                    title="Summer Vibes",
-                    artist="Chart Topper",
-                    genre="pop",
-                    duration=185,
-                ),
-            ],
-            "sad": [
-                Song(
-                    id=2001,
-                    title="Emotional Ballad",
-                    artist="Soul Singer",
-                    genre="sad",
-                    duration=240,
-                ),
-                Song(
-                    id=2002,
-                    title="Melancholy Melody",
-                    artist="Heartfelt Artist",
-                    genre="sad",
-                    duration=220,
-                ),
-                Song(
-                    id=2003,
-                    title="Tears and Rain",
-                    artist="Emotional Voice",
-                    genre="sad",
-                    duration=260,
-                ),
-            ],
-            "rock": [
-                Song(
-                    id=3001,
-                    title="Rock Anthem",
-                    artist="Rock Band",
-                    genre="rock",
-                    duration=280,
-                ),
-                Song(
-                    id=3002,
-                    title="Electric Guitar",
-                    artist="Hard Rockers",
-                    genre="rock",
-                    duration=250,
-                ),
-                Song(
-                    id=3003,
-                    title="Power Chord",
-                    artist="Rock Legends",
-                    genre="rock",
-                    duration=270,
-                ),
-            ],
-        }
+    """Service for generating song recommendations
+
+    Category recommendations come from a RecommendationEngine built over
+    the whole catalog. Only the first request waits for a build. After
+    that, a request that finds the engine behind the catalog starts a
+    rebuild on a background thread, and requests keep being answered from
+    the previous engine until the new one is swapped in. A rebuild that
+    fails is logged and not retried until a backoff has passed.
+    """
+
+    def __init__(
+        self,
+        playlist_service: PlaylistService,
+        cooccurrence_service: Optional[CooccurrenceService] = None,
+    ):
+        self.playlist_service = playlist_service
+        self.cooccurrence_service = cooccurrence_service
+        # The newest engine and the catalog version it was built from,
+        # replaced together so readers never pair one with the other's version
+        self._built: Optional[Tuple[RecommendationEngine, int]] = None
+        self._engine_lock = threading.Lock()
+        self._rebuilding = False
+        self._rebuild_failures = 0
+        self._retry_at = 0.0
+
+    def get_engine(self) -> RecommendationEngine:
+        """Get the newest engine, starting a background rebuild if it is stale"""
+        return self._current()[0]
+
+    def cache_version(self, request: RecommendationRequest) -> int:
+        """Catalog version a cached response to `request` must have been built from
+
+        Cheap enough for the event loop: it never waits for an engine build.
+        """
+        built = self._built
+        if built is None or self._seed(request)[0] == "playlist":
+            return self.playlist_service.version
+        if built[1] != self.playlist_service.version:
+            self._start_rebuild()
+        return built[1]
+
+    def _current(self) -> Tuple[RecommendationEngine, int]:
+        built = self._built
+        if built is None:
+            with self._engine_lock:
+                if self._built is None:
+                    self._build()
+                return self._built
+        if built[1] != self.playlist_service.version:
+            self._start_rebuild()
+        return built
+
+    def _build(self):
+        # Read before the snapshot, so the engine is at least this new
+        version = self.playlist_service.version
+        catalog = self.playlist_service.snapshot()
+        engine = RecommendationEngine(list(catalog.playlists.values()))
+        self._built = (engine, version)
+
+    def _start_rebuild(self):
+        with self._engine_lock:
+            if self._rebuilding or time.monotonic() < self._retry_at:
+                return
+            self._rebuilding = True
+        threading.Thread(
+            target=self._rebuild, name="recommendation-rebuild", daemon=True
+        ).start()
+
+    def _rebuild(self):
+        try:
+            self._build()
+        except Exception:
+            delay = min(
+                REBUILD_RETRY_SECONDS * 2**self._rebuild_failures,
+                MAX_REBUILD_RETRY_SECONDS,
+            )
+            self._rebuild_failures += 1
+            logger.exception(
+                "Rebuilding the recommendation engine failed; retrying in %.0fs", delay
+            )
+            self._retry_at = time.monotonic() + delay
+        else:
+            self._rebuild_failures = 0
+        finally:
+            with self._engine_lock:
+                self._rebuilding = False
 
+    @timed("get_recommendations")
     def get_recommendations(
         self, request: RecommendationRequest
     ) -> RecommendationResponse:
-        """Get song recommendations based on category"""
-        category = request.category.lower() if request.category else None
-        limit = request.limit or 5
-
-        if not category:
-            # Return random recommendations if no category specified
-            recommended_songs = self._get_random_recommendations(limit)
-            category = "general"
-        else:
-            # Get recommendations for specific category
-            recommended_songs = self._get_category_recommendations(category, limit)
-
-        return RecommendationResponse(
-            category=category,
-            recommended_songs=recommended_songs,
-            count=len(recommended_songs),
-        )
-
-    def _get_category_recommendations(self, category: str, limit: int) -> List[Song]:
-        """Get recommendations for a specific category"""
-        # Check if we have dummy recommendations for this category
-        if category in self._dummy_recommendations:
-            return self._dummy_recommendations[category][:limit]
-
-        # If category exists in playlists, return some dummy recommendations
-        category_data = self.category_service.get_category_by_name(category)
-        if category_data:
-            # Return dummy recommendations based on category type
-            if category_data.type == "genre":
-                # Return genre-based recommendations
-                genre_recs = self._dummy_recommendations.get(category, [])
-                if not genre_recs:
-                    # Fallback: create generic recommendations
-                    genre_recs = [
-                        Song(
-                            id=9999,
-                            title=f"Recommended {category.title()} Song",
-                            artist="Recommended Artist",
-                            genre=category,
-                            duration=200,
-                        )
-                    ]
-                return genre_recs[:limit]
-            else:
-                # Artist-based: recommend similar artists (dummy)
-                return [
-                    Song(
-                        id=8888,
-                        title=f"Similar to {category.title()}",
-                        artist="Similar Artist",
-                        genre="pop",
-                        duration=190,
-                    )
-                ][:limit]
-
-        # Default: return generic recommendations
-        return self._get_random_recommendations(limit)
-
-    def _get_random_recommendations(self, limit: int) -> List[Song]:
-        """Get random recommendations"""
-        all_recs = []
-        for recs in self._dummy_recommendations.values():
-            all_recs.extend(recs)
-        return all_recs[:limit]
+        """Get song recommendations based on a seed playlist or category"""
+        return self.get_batch_recommendations([request])[0]
+
+    @timed("get_batch_recommendations")
+    def get_batch_recommendations(
+        self, requests: List[RecommendationRequest]
+    ) -> List[RecommendationResponse]:
+        """Get recommendations for several requests from one catalog snapshot
+
+        Duplicate requests are answered once, and requests that differ only
+        in limit share one ranking cut to each limit.
+        """
+        widest: Dict[Tuple[str, Union[int, str, None]], int] = {}
+        for request in requests:
+            seed = self._seed(request)
+            widest[seed] = max(widest.get(seed, 0), request.limit or 5)
+        engine = None
+        if any(kind == "category" for kind, _ in widest):
+            engine = self.get_engine()
+        ranked = {
+            seed: self._recommend(engine, seed, limit) for seed, limit in widest.items()
+        }
+
+        responses: Dict[tuple, RecommendationResponse] = {}
+        for request in requests:
+            seed = self._seed(request)
+            limit = request.limit or 5
+            if (seed, limit) not in responses:
+                category, songs = ranked[seed]
+                responses[seed, limit] = RecommendationResponse(
+                    category=category,
+                    recommended_songs=songs[:limit],
+                    count=len(songs[:limit]),
+                )
+        return [
+            responses[self._seed(request), request.limit or 5] for request in requests
+        ]
+
+    def _seed(
+        self, request: RecommendationRequest
+    ) -> Tuple[str, Union[int, str, None]]:
+        """What a request's recommendations depend on, apart from its limit"""
+        if request.playlist_id is not None and self.cooccurrence_service is not None:
+            return "playlist", request.playlist_id
+        return "category", request.category.lower() if request.category else None
+
+    def _recommend(
+        self,
+        engine: Optional[RecommendationEngine],
+        seed: Tuple[str, Union[int, str, None]],
+        limit: int,
+    ) -> Tuple[str, List[Song]]:
+        """Get the response category label and songs for a seed"""
+        kind, value = seed
+        if kind == "playlist":
+            return (
+                f"playlist:{value}",
+                self.cooccurrence_service.recommend_for_playlist(value, limit),
+            )
+        if not value:
+            # Return general recommendations if no category specified
+            return "general", self._get_general_recommendations(engine, limit)
+        # Get recommendations for specific category
+        return value, self._get_category_recommendations(engine, value, limit)
+
+    def _get_category_recommendations(
+        self, engine: RecommendationEngine, category: str, limit: int
+    ) -> List[Song]:
+        """Get recommendations for a specific category
+
+        Unknown categories fall back to general recommendations.
+        """
+        return engine.recommend(category, limit)
+
+    def _get_general_recommendations(
+        self, engine: RecommendationEngine, limit: int
+    ) -> List[Song]:
+        """Get recommendations that do not depend on a category"""
+        return engine.recommend(None, limit)
@@ -0,0 +1,158 @@
+"""
+In-memory inverted index with prefix lookups over song titles and artists
+"""
+
+import bisect
+import re
+import unicodedata
+from typing import Dict, Iterator, List, Set, Tuple
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+# Sorts after any character a token can end with, to bound prefix ranges
+_PREFIX_END = "\U0010ffff"
+
+TITLE_WEIGHT = 2.0
+ARTIST_WEIGHT = 1.0
+EXACT_BONUS = 2.0
+
+# Rank keys pack the title length above the document ID
+_DOC_BITS = 40
+_DOC_MASK = (1 << _DOC_BITS) - 1
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, accent-fold and split text into word tokens"""
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    return _TOKEN_PATTERN.findall(folded)
+
+
+class SearchIndex:
+    """Token -> document postings plus a sorted vocabulary for prefix ranges
+
+    Documents have a title and an artist field. A query matches a document
+    when every query token is a prefix of some token in either field.
+    Postings are kept in static rank order (shorter titles first), so a
+    query can stop scanning once it holds enough results that nothing
+    later could outscore.
+    """
+
+    def __init__(self):
+        # Token -> rank keys of the documents containing it, sorted
+        self._postings: Dict[str, List[int]] = {}
+        # Sorted vocabulary; prefix matches are a contiguous slice
+        self._words: List[str] = []
+        self._documents: Dict[int, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    @staticmethod
+    def _rank_key(doc_id: int, title: Tuple[str, ...]) -> int:
+        return (len(title) << _DOC_BITS) | doc_id
+
+    def add(self, doc_id: int, title: str, artist: str):
+        """Index a document, replacing any previous version of it"""
+        if doc_id in self._documents:
+            self.remove(doc_id)
+        fields = (tuple(tokenize(title)), tuple(tokenize(artist)))
+        self._documents[doc_id] = fields
+        key = self._rank_key(doc_id, fields[0])
+        for token in set(fields[0] + fields[1]):
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = []
+                bisect.insort(self._words, token)
+            bisect.insort(posting, key)
+
+    def remove(self, doc_id: int):
+        """Drop a document from the index"""
+        fields = self._documents.pop(doc_id, None)
+        if fields is None:
+            return
+        key = self._rank_key(doc_id, fields[0])
+        for token in set(fields[0] + fields[1]):
+            posting = self._postings[token]
+            del posting[bisect.bisect_left(posting, key)]
+            if not posting:
+                del self._postings[token]
+                del self._words[bisect.bisect_left(self._words, token)]
+
+    def _expand(self, prefix: str) -> Iterator[str]:
+        """Vocabulary words starting with prefix, the exact word first"""
+        if prefix in self._postings:
+            yield prefix
+        start = bisect.bisect_right(self._words, prefix)
+        end = bisect.bisect_left(self._words, prefix + _PREFIX_END, start)
+        # Indexed rather than sliced: a broad prefix spans much of the
+        # vocabulary and callers usually stop after a few words
+        for position in range(start, end):
+            yield self._words[position]
+
+    def _count(self, prefix: str, cap: int) -> int:
+        """Number of postings under prefix, counting no further than cap"""
+        total = 0
+        for word in self._expand(prefix):
+            total += len(self._postings[word])
+            if total >= cap:
+                break
+        return total
+
+    def _score(self, doc_id: int, tokens: List[str]) -> float:
+        """Sum of per-token field weights, or 0 if some token does not match"""
+        title, artist = self._documents[doc_id]
+        score = 0.0
+        for token in tokens:
+            best = 0.0
+            for field, weight in ((title, TITLE_WEIGHT), (artist, ARTIST_WEIGHT)):
+                for word in field:
+                    if word == token:
+                        best = max(best, weight * EXACT_BONUS)
+                    elif word.startswith(token):
+                        best = max(best, weight)
+            if not best:
+                return 0.0
+            score += best
+        return score
+
+    def search(
+        self, query: str, limit: int, max_candidates: int = 5000
+    ) -> List[Tuple[int, float]]:
+        """Best matching (doc_id, score) pairs for a query, highest score first
+
+        Candidates come from the postings of the most selective query token:
+        documents containing it exactly, then those containing a longer
+        word it prefixes. Scanning stops
+        once `limit` results reach the best score still possible for
+        unscanned documents, or after max_candidates documents.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        driver = min(tokens, key=lambda token: self._count(token, max_candidates))
+        best_rest = (len(tokens) - 1) * TITLE_WEIGHT * EXACT_BONUS
+        # (-score, rank key) of every match so far, best first
+        ranked: List[Tuple[float, int]] = []
+        seen: Set[int] = set()
+        for word in self._expand(driver):
+            # Best score a document first found under this word can have
+            ceiling = best_rest + TITLE_WEIGHT * (EXACT_BONUS if word == driver else 1)
+            # Matches already at or above it, the ties included
+            reached = bisect.bisect_right(ranked, (-ceiling, float("inf")))
+            if reached >= limit:
+                break
+            for key in self._postings[word]:
+                doc_id = key & _DOC_MASK
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                score = self._score(doc_id, tokens)
+                if score:
+                    bisect.insort(ranked, (-score, key))
+                    if score >= ceiling:
+                        reached += 1
+                if reached >= limit or len(seen) >= max_candidates:
+                    break
+            if reached >= limit or len(seen) >= max_candidates:
+                break
+        return [(key & _DOC_MASK, -negative) for negative, key in ranked[:limit]]
@@ -0,0 +1,55 @@
+"""
+Search service - search-as-you-type over song titles and artists
+"""
+
+import threading
+from typing import List
+from app.models.playlist import Playlist, Song
+from app.services.playlist_service import (
+    CatalogListener,
+    PlaylistService,
+    first_appearances,
+)
+from app.services.search_index import SearchIndex
+
+
+class SearchService(CatalogListener):
+    """Keeps a search index of the catalog's tracks in sync with every write
+
+    Each track is indexed once under its song ID, however many playlists
+    hold it.
+    """
+
+    def __init__(self, playlist_service: PlaylistService):
+        self.playlist_service = playlist_service
+        self.index = SearchIndex()
+        self._lock = threading.Lock()
+        catalog = self.playlist_service.snapshot()
+        for _, songs in first_appearances(list(catalog.playlists.values())):
+            self._add(songs)
+        playlist_service.add_listener(self)
+
+    def _add(self, songs: List[Song]):
+        for song in songs:
+            self.index.add(song.id, song.title, song.artist)
+
+    def tracks_added(self, playlist: Playlist, songs: List[Song]):
+        with self._lock:
+            self._add(songs)
+
+    def tracks_removed(self, playlist: Playlist, songs: List[Song]):
+        with self._lock:
+            for song in songs:
+                self.index.remove(song.id)
+
+    def search(self, query: str, limit: int) -> List[Song]:
+        """Get up to `limit` songs whose title and artist words start with the query words"""
+        with self._lock:
+            matches = self.index.search(query, limit)
+        songs = []
+        for song_id, _ in matches:
+            # A track can leave the catalog just before its index entry
+            song = self.playlist_service.get_song_by_id(song_id)
+            if song is not None:
+                songs.append(song)
+        return songs
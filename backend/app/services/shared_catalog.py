@@ -0,0 +1,246 @@
+"""
+Shared catalog - the read side of PlaylistService, served from published catalog files
+"""
+
+import os
+import time
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+import numpy as np
+from app.models.catalog_file import CatalogFile
+from app.models.playlist import Playlist, Song
+from app.services.playlist_service import CatalogSnapshot
+
+# File in the shared directory naming the latest generation
+POINTER_NAME = "CURRENT"
+# Readers look for a newer generation at most this often (seconds)
+POLL_INTERVAL = 0.05
+
+
+def generation_file_name(generation: int) -> str:
+    return f"catalog-{generation}.bin"
+
+
+def set_current(directory: str, target: str):
+    """Atomically point readers of a shared directory at a catalog file
+
+    Target is a file name in the directory or an absolute path.
+    """
+    pointer = os.path.join(directory, POINTER_NAME)
+    with open(f"{pointer}.tmp", "w") as file:
+        file.write(target)
+    os.replace(f"{pointer}.tmp", pointer)
+
+
+class _Generation:
+    """One published catalog file plus the name lookups derived from it"""
+
+    def __init__(self, file: CatalogFile):
+        self.file = file
+        self.number: int = file.metadata["generation"]
+        self._categories: Dict[str, Dict[str, int]] = {}
+
+    def categories(self, kind: str) -> Dict[str, int]:
+        """Normalized genre or artist name -> category position, in index order"""
+        positions = self._categories.get(kind)
+        if positions is None:
+            names = getattr(self.file, f"{kind}_categories").tolist()
+            positions = self._categories[kind] = {
+                name: position for position, name in enumerate(names)
+            }
+        return positions
+
+    def category_rows(self, kind: str, name: str) -> Optional[np.ndarray]:
+        position = self.categories(kind).get(name)
+        if position is None:
+            return None
+        return self.file.category_rows(kind, position)
+
+
+class _SongsView(Mapping[int, Song]):
+    """Songs of one category bucket, materialized on access"""
+
+    def __init__(self, file: CatalogFile, rows: np.ndarray):
+        self._file = file
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._file.song_ids[self._rows].tolist())
+
+    def __getitem__(self, song_id: int) -> Song:
+        row = self._file.song_row(song_id)
+        if row is None or not (self._rows == row).any():
+            raise KeyError(song_id)
+        return self._file.songs(np.array([row]))[0]
+
+    def values(self) -> List[Song]:
+        return self._file.songs(self._rows)
+
+
+class _CategoryIndexView(Mapping[str, Mapping[int, Song]]):
+    """Genre or artist index of one generation: normalized name -> songs"""
+
+    def __init__(self, generation: _Generation, kind: str):
+        self._generation = generation
+        self._kind = kind
+
+    def __len__(self) -> int:
+        return len(self._generation.categories(self._kind))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._generation.categories(self._kind))
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._generation.categories(self._kind)
+
+    def __getitem__(self, name: str) -> Mapping[int, Song]:
+        rows = self._generation.category_rows(self._kind, name)
+        if rows is None:
+            raise KeyError(name)
+        return _SongsView(self._generation.file, rows)
+
+
+class _PlaylistsView(Mapping[int, Playlist]):
+    """Playlists of one generation by ID, in ID order"""
+
+    def __init__(self, file: CatalogFile):
+        self._file = file
+
+    def __len__(self) -> int:
+        return len(self._file.playlist_ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._file.playlist_ids.tolist())
+
+    def __getitem__(self, playlist_id: int) -> Playlist:
+        row = self._file.playlist_row(playlist_id)
+        if row is None:
+            raise KeyError(playlist_id)
+        return self._file.playlist(row, lazy=True)
+
+
+class SharedCatalog:
+    """Read-only PlaylistService stand-in for reader worker processes
+
+    The writer process publishes the catalog as numbered generation files
+    in a shared directory (see CatalogPublisher). Every reader maps the
+    latest one, so N readers share one copy of the catalog in the page
+    cache, and playlists and songs are only built as Python objects for
+    the request that asks for them. Playlists are lazy (see Playlist), so
+    listing them reads no song pages. Each call reads one generation, and
+    a newer one is picked up within POLL_INTERVAL of being published.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._pointer = os.path.join(directory, POINTER_NAME)
+        self._pointer_key: Optional[Tuple[int, int]] = None
+        self._generation: Optional[_Generation] = None
+        self._checked_at = 0.0
+        if self._current() is None:
+            raise RuntimeError(f"No catalog has been published in {directory}")
+
+    def _current(self) -> Optional[_Generation]:
+        """The latest published generation, checking for a new one if due"""
+        generation = self._generation
+        now = time.monotonic()
+        if generation is not None and now - self._checked_at < POLL_INTERVAL:
+            return generation
+        self._checked_at = now
+        try:
+            stat = os.stat(self._pointer)
+            key = (stat.st_ino, stat.st_mtime_ns)
+            if key != self._pointer_key:
+                with open(self._pointer) as pointer:
+                    name = pointer.read().strip()
+                generation = _Generation(
+                    CatalogFile(os.path.join(self.directory, name))
+                )
+                self._generation, self._pointer_key = generation, key
+        except FileNotFoundError:
+            # Mid-publish; keep serving the generation already mapped
+            pass
+        return generation
+
+    @property
+    def version(self) -> int:
+        """Catalog version for cache keys: the generation number
+
+        Not the writer's version, which restarts with the writer process,
+        so a startup snapshot and a later generation could share one.
+        """
+        return self._current().number
+
+    @property
+    def generation(self) -> int:
+        return self._current().number
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Get a read-only view of the current generation"""
+        generation = self._current()
+        return CatalogSnapshot(
+            playlists=_PlaylistsView(generation.file),
+            genre_index=_CategoryIndexView(generation, "genre"),
+            artist_index=_CategoryIndexView(generation, "artist"),
+        )
+
+    def get_song_by_id(self, song_id: int) -> Optional[Song]:
+        file = self._current().file
+        row = file.song_row(song_id)
+        return file.songs(np.array([row]))[0] if row is not None else None
+
+    def get_song_playlist_id(self, song_id: int) -> Optional[int]:
+        file = self._current().file
+        row = file.song_row(song_id)
+        if row is None:
+            return None
+        return int(file.playlist_ids[file.song_playlist_row(row)])
+
+    def get_genres(self) -> List[str]:
+        return list(self._current().categories("genre"))
+
+    def get_artists(self) -> List[str]:
+        return list(self._current().categories("artist"))
+
+    def get_songs_by_genre(self, genre: str) -> List[Song]:
+        return self._get_category_songs("genre", genre.lower())
+
+    def get_songs_by_artist(self, artist: str) -> List[Song]:
+        return self._get_category_songs("artist", artist.lower())
+
+    def _get_category_songs(self, kind: str, name: str) -> List[Song]:
+        generation = self._current()
+        rows = generation.category_rows(kind, name)
+        return generation.file.songs(rows) if rows is not None else []
+
+    def get_all_playlists(self) -> List[Playlist]:
+        return list(self.iter_playlists())
+
+    def iter_playlists(self, after_id: Optional[int] = None) -> Iterator[Playlist]:
+        """Iterate playlists in ID order, starting after `after_id`"""
+        file = self._current().file
+        start = 0
+        if after_id is not None:
+            start = int(np.searchsorted(file.playlist_ids, after_id, "right"))
+        for row in range(start, len(file.playlist_ids)):
+            yield file.playlist(row, lazy=True)
+
+    def get_playlists_page(
+        self, limit: int, after_id: Optional[int] = None
+    ) -> Tuple[List[Playlist], Optional[int]]:
+        """Get up to `limit` playlists after `after_id`, plus the ID to resume after"""
+        file = self._current().file
+        start = 0
+        if after_id is not None:
+            start = int(np.searchsorted(file.playlist_ids, after_id, "right"))
+        end = min(start + limit, len(file.playlist_ids))
+        playlists = [file.playlist(row, lazy=True) for row in range(start, end)]
+        has_more = start + limit < len(file.playlist_ids)
+        return playlists, (playlists[-1].id if has_more and playlists else None)
+
+    def get_playlist_by_id(self, playlist_id: int) -> Optional[Playlist]:
+        file = self._current().file
+        row = file.playlist_row(playlist_id)
+        return file.playlist(row, lazy=True) if row is not None else None
@@ -0,0 +1,249 @@
+"""
+Similarity service - "songs similar to this song" over an ANN index
+"""
+
+import logging
+import os
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.models.playlist import Playlist, Song
+from app.services.ann_index import IVFIndex
+from app.services.playlist_service import (
+    CatalogListener,
+    PlaylistService,
+    first_appearances,
+)
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 32
+# Bump when the embedding recipe changes so saved indexes are rebuilt
+EMBEDDING_VERSION = 1
+GENRE_WEIGHT = 1.0
+ARTIST_WEIGHT = 0.8
+PLAYLIST_WEIGHT = 0.5
+DURATION_WEIGHT = 0.3
+DURATION_BUCKET_SECONDS = 30
+# Retrain the centroids once the catalog has grown this much since training
+RETRAIN_GROWTH = 8
+
+
+class SongEmbedder:
+    """Hashes song features into fixed-size unit vectors
+
+    Each feature value (genre, artist, duration bucket, playlist) maps to a
+    pseudo-random direction seeded by a stable hash of the value, and a
+    song's embedding is the weighted, normalized sum of its directions.
+    The recipe needs no training, so new songs can be embedded on insert
+    and embeddings stay identical across restarts.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self._directions: Dict[str, np.ndarray] = {}
+
+    def _direction(self, token: str) -> np.ndarray:
+        direction = self._directions.get(token)
+        if direction is None:
+            rng = np.random.default_rng(zlib.crc32(token.encode()))
+            direction = rng.standard_normal(self.dim).astype(np.float32)
+            direction /= np.linalg.norm(direction)
+            self._directions[token] = direction
+        return direction
+
+    def embed(self, songs: List[Song], playlist_id: Optional[int]) -> np.ndarray:
+        """Embed songs that belong to the given playlist"""
+        vectors = np.empty((len(songs), self.dim), dtype=np.float32)
+        context = np.zeros(self.dim, dtype=np.float32)
+        if playlist_id is not None:
+            context = PLAYLIST_WEIGHT * self._direction(f"p:{playlist_id}")
+        for row, song in enumerate(songs):
+            vector = context + ARTIST_WEIGHT * self._direction(
+                f"a:{song.artist.lower()}"
+            )
+            if song.genre:
+                vector += GENRE_WEIGHT * self._direction(f"g:{song.genre.lower()}")
+            if song.duration is not None:
+                bucket = song.duration // DURATION_BUCKET_SECONDS
+                vector += DURATION_WEIGHT * self._direction(f"d:{bucket}")
+            vectors[row] = vector / np.linalg.norm(vector)
+        return vectors
+
+
+class SimilarityService(CatalogListener):
+    """Finds songs similar to a given song with an IVF index kept in sync with the catalog
+
+    Once the catalog outgrows the trained centroids, a request starts a
+    retrain on a background thread. Requests keep searching the current
+    index, which still receives catalog changes, and the changes made
+    since the retrain's snapshot are replayed on the new index before it
+    is swapped in.
+    """
+
+    def __init__(
+        self,
+        playlist_service: PlaylistService,
+        index_path: Optional[str] = None,
+        nlist: int = 256,
+        nprobe: int = 8,
+    ):
+        self.playlist_service = playlist_service
+        self.index_path = index_path
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.embedder = SongEmbedder()
+        self._lock = threading.Lock()
+        self._trained_size = 0
+        # Changes to replay on the retrained index, or None when no retrain runs
+        self._pending: Optional[List[Tuple[np.ndarray, Optional[np.ndarray]]]] = None
+        self.index = self._load_or_build()
+        playlist_service.add_listener(self)
+
+    def _catalog_embeddings(
+        self, playlists: List[Playlist]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        ids = []
+        vectors = []
+        # Each track is embedded once, in the first playlist holding it
+        for playlist, songs in first_appearances(playlists):
+            if songs:
+                ids.append(np.array([song.id for song in songs], dtype=np.int64))
+                vectors.append(self.embedder.embed(songs, playlist.id))
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty(
+                (0, self.embedder.dim), dtype=np.float32
+            )
+        return np.concatenate(ids), np.concatenate(vectors)
+
+    def _build(self) -> IVFIndex:
+        """Train and fill a new index from the whole catalog"""
+        catalog = self.playlist_service.snapshot()
+        index, self._trained_size = self._train(list(catalog.playlists.values()))
+        return index
+
+    def _train(self, playlists: List[Playlist]) -> Tuple[IVFIndex, int]:
+        """Train and fill an index; returns it and the size it was trained on"""
+        ids, vectors = self._catalog_embeddings(playlists)
+        if not len(ids):
+            # Nothing to train on yet; the placeholder centroid goes on retrain
+            index = IVFIndex(np.eye(1, self.embedder.dim, dtype=np.float32))
+        else:
+            index = IVFIndex.train(vectors, self.nlist)
+            index.add(ids, vectors)
+        return index, max(len(ids), 1)
+
+    def _start_retrain(self):
+        if self._pending is not None:
+            return
+        # Writers are held off so the snapshot and the start of recording
+        # changes line up exactly
+        with self.playlist_service.locked_snapshot() as catalog:
+            with self._lock:
+                if self._pending is not None:
+                    return
+                self._pending = []
+        threading.Thread(
+            target=self._retrain,
+            args=(list(catalog.playlists.values()),),
+            name="similarity-retrain",
+            daemon=True,
+        ).start()
+
+    def _retrain(self, playlists: List[Playlist]):
+        try:
+            index, trained_size = self._train(playlists)
+            with self._lock:
+                for ids, vectors in self._pending:
+                    if vectors is None:
+                        index.remove(ids.tolist())
+                    else:
+                        index.add(ids, vectors)
+                self.index = index
+                self._trained_size = trained_size
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def _load_or_build(self) -> IVFIndex:
+        """Load the saved index and catch it up with the catalog, or build a new one"""
+        if self.index_path and os.path.exists(self.index_path):
+            try:
+                index, metadata = IVFIndex.load(self.index_path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Rebuilding similarity index: %s", e)
+            else:
+                if metadata.get("embedding_version") == EMBEDDING_VERSION:
+                    self._catch_up(index)
+                    self._trained_size = max(int(metadata.get("trained_size", 1)), 1)
+                    return index
+        return self._build()
+
+    def _catch_up(self, index: IVFIndex):
+        """Add catalog songs missing from a loaded index and drop deleted ones"""
+        indexed = set()
+        for inverted in index.lists:
+            indexed.update(inverted.ids[: inverted.size].tolist())
+        stale = set(indexed)
+        catalog = self.playlist_service.snapshot()
+        for playlist, songs in first_appearances(list(catalog.playlists.values())):
+            missing = [song for song in songs if song.id not in indexed]
+            if missing:
+                index.add(
+                    np.array([song.id for song in missing], dtype=np.int64),
+                    self.embedder.embed(missing, playlist.id),
+                )
+            stale.difference_update(song.id for song in songs)
+        index.remove(list(stale))
+
+    def save(self):
+        """Persist the index so restarts do not rebuild it"""
+        if not self.index_path:
+            return
+        with self._lock:
+            self.index.save(
+                self.index_path,
+                {
+                    "embedding_version": EMBEDDING_VERSION,
+                    "trained_size": self._trained_size,
+                },
+            )
+
+    def tracks_added(self, playlist: Playlist, songs: List[Song]):
+        ids = np.array([song.id for song in songs], dtype=np.int64)
+        vectors = self.embedder.embed(songs, playlist.id)
+        with self._lock:
+            self.index.add(ids, vectors)
+            if self._pending is not None:
+                self._pending.append((ids, vectors))
+
+    def tracks_removed(self, playlist: Playlist, songs: List[Song]):
+        ids = np.array([song.id for song in songs], dtype=np.int64)
+        with self._lock:
+            self.index.remove(ids.tolist())
+            if self._pending is not None:
+                self._pending.append((ids, None))
+
+    def get_similar_songs(
+        self, song_id: int, limit: int, nprobe: Optional[int] = None
+    ) -> Optional[Tuple[Song, List[Song]]]:
+        """Get a song and up to `limit` songs most similar to it
+
+        Returns None if the song does not exist.
+        """
+        song = self.playlist_service.get_song_by_id(song_id)
+        if song is None:
+            return None
+        playlist_id = self.playlist_service.get_song_playlist_id(song_id)
+        query = self.embedder.embed([song], playlist_id)[0]
+        if len(self.index) > RETRAIN_GROWTH * self._trained_size:
+            self._start_retrain()
+        with self._lock:
+            matches = self.index.search(query, limit + 1, nprobe or self.nprobe)
+        similar = []
+        for match_id, _ in matches:
+            match = self.playlist_service.get_song_by_id(match_id)
+            if match is not None and match_id != song_id:
+                similar.append(match)
+        return song, similar[:limit]
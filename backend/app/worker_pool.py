@@ -0,0 +1,91 @@
+"""
+Bounded worker pool for CPU-heavy service calls made from async routes
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+from fastapi import HTTPException, Response, status
+
+T = TypeVar("T")
+
+
+class WorkerPool:
+    """Runs heavy calls off the event loop with a bounded backlog
+
+    At most `max_workers` calls run at once and `max_queue` more may wait;
+    further calls are rejected with a 429 so a burst of expensive requests
+    cannot pile up unbounded work or starve cheap ones. Threads rather than
+    processes are used because the services share one in-memory catalog;
+    the heavy paths spend most of their time in NumPy and serialization
+    code that releases or rarely holds the GIL for long.
+
+    With max_workers=0 calls run inline on the event loop, as before.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 64):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if max_workers > 0:
+            self._executor = ThreadPoolExecutor(
+                max_workers, thread_name_prefix="worker"
+            )
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _release(self, future: Future):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run func(*args, **kwargs) on a worker and wait for its result
+
+        Raises a 429 HTTPException when every worker is busy and the queue
+        is full.
+        """
+        call = functools.partial(func, *args, **kwargs)
+        if self._executor is None:
+            return call()
+        with self._lock:
+            if self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Server is busy, retry later",
+                    headers={"Retry-After": "1"},
+                )
+            self.in_flight += 1
+        # Carry the request's context over, as run_in_threadpool does
+        future = self._executor.submit(contextvars.copy_context().run, call)
+        # The slot is freed when the work finishes, even if the client left
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    async def json_response(
+        self, build: Callable[[], bytes], **kwargs: Any
+    ) -> Response:
+        """Run a JSON-serializing build on a worker and wrap its bytes in a Response"""
+        body = await self.run(build)
+        return Response(content=body, media_type="application/json", **kwargs)
+
+    def stats(self) -> Dict[str, int]:
+        """Get the pool size, current load and rejection counters"""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,90 @@
+"""
+Forwarding from reader workers to the catalog writer process
+"""
+
+import httpx
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Reads that reader workers answer from the shared catalog. Everything else
+# under /api/ either changes the catalog or needs the writer's in-memory
+# indexes (recommendations, co-occurrence, similarity, search, category stats).
+LOCAL_READ_PREFIXES = ("/api/v1/playlists", "/api/v1/categories")
+
+# Hop-by-hop headers apply to one connection and are not forwarded
+_HOP_BY_HOP_HEADERS = {
+    "connection",
+    "host",
+    "keep-alive",
+    "proxy-connection",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+}
+
+
+class WriterProxy:
+    """Streams requests to the writer process and its responses back"""
+
+    def __init__(self, writer_url: str):
+        self.writer_url = writer_url
+        self._client = httpx.AsyncClient(base_url=writer_url, timeout=None)
+
+    async def forward(self, request: Request) -> Response:
+        upstream_request = self._client.build_request(
+            request.method,
+            request.url.path,
+            params=request.url.query,
+            headers=[
+                (name, value)
+                for name, value in request.headers.raw
+                if name.decode("latin-1").lower() not in _HOP_BY_HOP_HEADERS
+            ],
+            content=request.stream(),
+        )
+        try:
+            upstream = await self._client.send(upstream_request, stream=True)
+        except httpx.TransportError:
+            return JSONResponse(
+                {"detail": "Catalog writer is unavailable"}, status_code=503
+            )
+        return StreamingResponse(
+            upstream.aiter_raw(),
+            status_code=upstream.status_code,
+            headers={
+                name: value
+                for name, value in upstream.headers.items()
+                if name.lower() not in _HOP_BY_HOP_HEADERS
+            },
+            background=BackgroundTask(upstream.aclose),
+        )
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+class WriterProxyMiddleware:
+    """Sends every request a reader worker cannot serve locally to the writer"""
+
+    def __init__(self, app: ASGIApp, proxy: WriterProxy):
+        self.app = app
+        self.proxy = proxy
+
+    @staticmethod
+    def served_locally(scope: Scope) -> bool:
+        path = scope["path"]
+        if not path.startswith("/api/"):
+            return True
+        return scope["method"] in ("GET", "HEAD") and path.startswith(
+            LOCAL_READ_PREFIXES
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or self.served_locally(scope):
+            await self.app(scope, receive, send)
+            return
+        response = await self.proxy.forward(Request(scope, receive))
+        await response(scope, receive, send)
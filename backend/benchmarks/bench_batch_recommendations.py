@@ -0,0 +1,91 @@
+"""
+Home-page style recommendations: one batch request against separate requests
+
+Run from the backend directory:
+    python -m benchmarks.bench_batch_recommendations
+"""
+
+import statistics
+import time
+from fastapi.testclient import TestClient
+from app.cache import ResponseCache
+from app.dependencies import (
+    get_playlist_service,
+    get_recommendation_service,
+    get_response_cache,
+)
+from app.main import app
+from app.schemas.playlist import PlaylistCreate, SongCreate
+from app.services.playlist_service import PlaylistService
+from app.services.recommendation_service import RecommendationService
+from benchmarks.bench_recommendations import GENRES, build_playlists
+
+ROUNDS = 20
+# 20 home-page rows: 15 genres, a few repeated with different limits
+REQUESTS = [{"category": f"genre {genre}", "limit": 10} for genre in range(15)] + [
+    {"category": f"genre {genre}", "limit": 5} for genre in range(5)
+]
+
+
+def timed(call, cold: bool, cache: ResponseCache):
+    samples = []
+    for _ in range(ROUNDS):
+        if cold:
+            cache.clear()
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    playlist_service = PlaylistService()
+    for playlist in build_playlists():
+        playlist_service.create_playlist(
+            PlaylistCreate(
+                name=playlist.name,
+                songs=[
+                    SongCreate(
+                        title=song.title,
+                        artist=song.artist,
+                        genre=song.genre,
+                        duration=song.duration,
+                    )
+                    for song in playlist.songs
+                ],
+            )
+        )
+    recommendation_service = RecommendationService(playlist_service)
+    recommendation_service.get_engine()
+    cache = ResponseCache(max_entries=4096, ttl_seconds=3600)
+    app.dependency_overrides[get_playlist_service] = lambda: playlist_service
+    app.dependency_overrides[get_recommendation_service] = (
+        lambda: recommendation_service
+    )
+    app.dependency_overrides[get_response_cache] = lambda: cache
+    client = TestClient(app)
+
+    def separate():
+        for params in REQUESTS:
+            client.get("/api/v1/recommendations/", params=params)
+
+    def single():
+        client.get("/api/v1/recommendations/", params=REQUESTS[0])
+
+    def batch():
+        client.post("/api/v1/recommendations/batch", json={"requests": REQUESTS})
+
+    print(f"{len(REQUESTS)} requests over {GENRES} genres, median of {ROUNDS} rounds")
+    print(f"{'':>22} {'cold ms':>8} {'warm ms':>8}")
+    for name, call in (
+        ("one request", single),
+        (f"{len(REQUESTS)} separate requests", separate),
+        ("one batch request", batch),
+    ):
+        print(
+            f"{name:>22} {timed(call, True, cache):8.2f} {timed(call, False, cache):8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Genre stats latency from maintained counters against a full recompute
+
+Reads the stats of every genre, with the top 10 artists of each, as the
+catalog grows from 10k to 1M songs: from CategoryStatsService's counters,
+and by walking the genre index as a request would without them. Also
+times appending songs with and without the stats service listening.
+
+Run from the backend directory:
+    python -m benchmarks.bench_category_stats
+"""
+
+import random
+import statistics
+import time
+from collections import Counter
+from app.schemas.playlist import SongCreate
+from app.services.category_stats_service import CategoryStatsService
+from app.services.playlist_service import PlaylistService
+from benchmarks.bench_recommendations import build_playlists
+from benchmarks.bench_snapshot_startup import _ListRepository
+
+SIZES = (10_000, 100_000, 1_000_000)
+TOP_ARTISTS = 10
+APPENDS = 200
+
+
+class _AppendOnlyRepository(_ListRepository):
+    """Serves the built playlists and drops appended songs, timing memory only"""
+
+    def append_playlist_songs(self, playlist, songs):
+        pass
+
+
+def recompute(service: PlaylistService):
+    """Aggregate every genre from its songs, as without the counters"""
+    genres = []
+    for genre, songs in service.snapshot().genre_index.items():
+        durations = [song.duration for song in songs.values() if song.duration]
+        artists = Counter(song.artist.lower() for song in songs.values())
+        genres.append(
+            {
+                "name": genre,
+                "song_count": len(songs),
+                "total_duration": sum(durations),
+                "average_duration": sum(durations) / len(durations),
+                "distinct_artists": len(artists),
+                "top_artists": artists.most_common(TOP_ARTISTS),
+            }
+        )
+    return genres
+
+
+def time_ms(query, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        query()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def time_appends(service: PlaylistService, rng: random.Random):
+    ids = list(service.snapshot().playlists)
+    samples = []
+    for _ in range(APPENDS):
+        songs = [
+            SongCreate(
+                title="New song",
+                artist=f"Artist {rng.randrange(5_000)}",
+                genre=f"genre {rng.randrange(20)}",
+                duration=rng.randint(90, 420),
+            )
+            for _ in range(5)
+        ]
+        start = time.perf_counter()
+        service.append_songs(rng.choice(ids), songs)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    playlists = build_playlists()
+    playlist_size = len(playlists[0].songs)
+    print(f"{'songs':>9} {'build s':>8} {'counters ms':>12} {'recompute ms':>13}")
+    for size in SIZES:
+        service = PlaylistService(_ListRepository(playlists[: size // playlist_size]))
+        start = time.perf_counter()
+        stats = CategoryStatsService(service)
+        build = time.perf_counter() - start
+        counters = time_ms(lambda: stats.get_all_genre_stats(TOP_ARTISTS), 50)
+        full = time_ms(lambda: recompute(service), 3)
+        print(f"{size:>9} {build:>8.2f} {counters:>12.3f} {full:>13.1f}")
+
+    rng = random.Random(7)
+    service = PlaylistService(_AppendOnlyRepository(playlists))
+    without = time_appends(service, rng)
+    CategoryStatsService(service)
+    with_stats = time_appends(service, rng)
+    print(
+        f"append 5 songs p50 {without:.3f} ms without stats,"
+        f" {with_stats:.3f} ms with stats"
+    )
+
+
+if __name__ == "__main__":
+    main()
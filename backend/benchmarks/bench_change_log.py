@@ -0,0 +1,221 @@
+"""
+Change log benchmark: write overhead, feed reads, replay and catch-up size
+
+Writes go through PlaylistService backed by SQLite in a temporary
+directory, without a change log, with one, and with one that fsyncs every
+record. Feed reads are timed for changes still held in memory and for
+changes read back from segment files. Replay rebuilds the catalog from a
+snapshot plus the changes logged after it, and catch-up compares the feed
+a consumer reads after some writes with listing every playlist again.
+
+Run from the backend directory:
+    python -m benchmarks.bench_change_log
+"""
+
+import os
+import random
+import statistics
+import tempfile
+import time
+from app.repositories.sqlite_repository import SQLitePlaylistRepository
+from app.schemas.playlist import PlaylistCreate, PlaylistUpdate, SongCreate
+from app.serialization import dump_playlists
+from app.services.catalog_publisher import save_snapshot
+from app.services.change_log import ChangeLog, replay_catalog
+from app.services.playlist_service import PlaylistService
+
+PLAYLISTS = 1000
+PLAYLIST_SIZE = 50
+WRITES = 500
+READ_SIZES = (10, 100, 1000)
+READ_REPEATS = 200
+REPLAYED_CHANGES = (1000, 10000, 50000)
+CATCH_UP_WRITES = (10, 100, 1000)
+
+
+def songs(count: int, rng: random.Random):
+    return [
+        SongCreate(
+            title=f"Song {rng.randrange(10**6)}",
+            artist=f"Artist {rng.randrange(200)}",
+            genre=f"genre {rng.randrange(20)}",
+            duration=rng.randint(90, 420),
+        )
+        for _ in range(count)
+    ]
+
+
+def build_service(directory: str, log: ChangeLog = None) -> PlaylistService:
+    repository = SQLitePlaylistRepository(
+        f"sqlite:///{os.path.join(directory, 'catalog.db')}"
+    )
+    return PlaylistService(repository, log)
+
+
+def fill(service: PlaylistService, rng: random.Random, count: int = PLAYLISTS):
+    for playlist in range(count):
+        service.create_playlist(
+            PlaylistCreate(name=f"Playlist {playlist}", songs=songs(PLAYLIST_SIZE, rng))
+        )
+
+
+def write_latency(log_variant):
+    """Median microseconds per create, update and append"""
+    with tempfile.TemporaryDirectory() as directory:
+        log = None
+        if log_variant is not None:
+            log = ChangeLog(os.path.join(directory, "changes"), fsync=log_variant)
+        service = build_service(directory, log)
+        rng = random.Random(0)
+        fill(service, rng, 100)
+        ids = [playlist.id for playlist in service.get_all_playlists()]
+        timings = {"create": [], "update": [], "append": []}
+        for write in range(WRITES):
+            start = time.perf_counter()
+            service.create_playlist(
+                PlaylistCreate(name=f"New {write}", songs=songs(PLAYLIST_SIZE, rng))
+            )
+            timings["create"].append(time.perf_counter() - start)
+            playlist_id = rng.choice(ids)
+            start = time.perf_counter()
+            service.update_playlist(
+                playlist_id, PlaylistUpdate(name=f"Renamed {write}")
+            )
+            timings["update"].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            service.append_songs(playlist_id, songs(5, rng))
+            timings["append"].append(time.perf_counter() - start)
+        if log is not None:
+            log.close()
+        return {op: statistics.median(times) * 1e6 for op, times in timings.items()}
+
+
+def bench_writes():
+    print(f"write latency, median of {WRITES} writes to a SQLite-backed catalog")
+    print(f"{'variant':>16} {'create us':>10} {'update us':>10} {'append us':>10}")
+    baseline = None
+    for name, variant in (
+        ("no change log", None),
+        ("change log", False),
+        ("fsync", True),
+    ):
+        latency = write_latency(variant)
+        baseline = baseline or latency
+        cells = (
+            f"{latency[op]:>5.0f} {latency[op] / baseline[op] - 1:>+4.0%}"
+            for op in ("create", "update", "append")
+        )
+        print(f"{name:>16} " + " ".join(f"{cell:>10}" for cell in cells))
+
+
+def bench_reads():
+    with tempfile.TemporaryDirectory() as directory:
+        log = ChangeLog(
+            os.path.join(directory, "changes"),
+            segment_bytes=4 * 2**20,
+            memory_records=max(READ_SIZES),
+        )
+        service = PlaylistService(change_log=log)
+        rng = random.Random(1)
+        fill(service, rng)
+        ids = [playlist.id for playlist in service.get_all_playlists()]
+        for write in range(20000):
+            service.update_playlist(rng.choice(ids), PlaylistUpdate(name=f"R {write}"))
+        print(
+            f"feed reads, {log.last_seq} changes in {log.sealed_segments + 1} segments,"
+            f" median of {READ_REPEATS}"
+        )
+        print(f"{'changes':>8} {'memory us':>10} {'segment files us':>17}")
+        for size in READ_SIZES:
+            memory, disk = [], []
+            for _ in range(READ_REPEATS):
+                start = time.perf_counter()
+                log.read(log.last_seq - size, size)
+                memory.append(time.perf_counter() - start)
+                since = rng.randrange(log.first_seq, log.last_seq // 2)
+                start = time.perf_counter()
+                log.read(since, size)
+                disk.append(time.perf_counter() - start)
+            print(
+                f"{size:>8} {statistics.median(memory) * 1e6:>10.0f}"
+                f" {statistics.median(disk) * 1e6:>17.0f}"
+            )
+        log.close()
+
+
+def log_bytes(log: ChangeLog) -> int:
+    return sum(
+        os.path.getsize(os.path.join(log.directory, name))
+        for name in os.listdir(log.directory)
+    )
+
+
+def bench_replay():
+    print("replay: snapshot of the filled catalog plus the changes logged after it")
+    print(f"{'changes':>8} {'log MB':>7} {'replay s':>9} {'changes/s':>10}")
+    for changes in REPLAYED_CHANGES:
+        with tempfile.TemporaryDirectory() as directory:
+            log = ChangeLog(os.path.join(directory, "changes"))
+            service = PlaylistService(change_log=log)
+            rng = random.Random(2)
+            fill(service, rng)
+            path = os.path.join(directory, "snapshot.bin")
+            save_snapshot(service, path)
+            ids = [playlist.id for playlist in service.get_all_playlists()]
+            first_seq = log.last_seq
+            snapshot_bytes = log_bytes(log)
+            while log.last_seq - first_seq < changes:
+                playlist_id = rng.choice(ids)
+                if rng.random() < 0.5:
+                    service.update_playlist(
+                        playlist_id, PlaylistUpdate(name=f"R {log.last_seq}")
+                    )
+                else:
+                    service.append_songs(playlist_id, songs(2, rng))
+            logged = log_bytes(log) - snapshot_bytes
+            start = time.perf_counter()
+            replayed = replay_catalog(path, log)
+            elapsed = time.perf_counter() - start
+            if dump_playlists(replayed) != dump_playlists(service.get_all_playlists()):
+                raise SystemExit("The replayed catalog differs from the live one")
+            print(
+                f"{changes:>8} {logged / 2**20:>7.1f} {elapsed:>9.2f}"
+                f" {changes / elapsed:>10.0f}"
+            )
+            log.close()
+
+
+def bench_catch_up():
+    print(f"catch-up after renames and appends, {PLAYLISTS} playlists")
+    print(f"{'writes':>8} {'feed KB':>8} {'full listing KB':>16}")
+    with tempfile.TemporaryDirectory() as directory:
+        log = ChangeLog(os.path.join(directory, "changes"))
+        service = PlaylistService(change_log=log)
+        rng = random.Random(3)
+        fill(service, rng)
+        ids = [playlist.id for playlist in service.get_all_playlists()]
+        for writes in CATCH_UP_WRITES:
+            since = log.last_seq
+            for write in range(writes):
+                playlist_id = rng.choice(ids)
+                if rng.random() < 0.5:
+                    service.update_playlist(
+                        playlist_id, PlaylistUpdate(name=f"R {write}")
+                    )
+                else:
+                    service.append_songs(playlist_id, songs(2, rng))
+            feed = sum(len(record) + 1 for record in log.read(since, writes))
+            listing = len(dump_playlists(service.get_all_playlists()))
+            print(f"{writes:>8} {feed / 1024:>8.0f} {listing / 1024:>16.0f}")
+        log.close()
+
+
+def main():
+    bench_writes()
+    bench_reads()
+    bench_replay()
+    bench_catch_up()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Co-occurrence matrix size, query latency against a full rescan, and update cost
+
+Run from the backend directory:
+    python -m benchmarks.bench_cooccurrence
+"""
+
+import random
+import statistics
+import time
+from collections import Counter
+from app.schemas.playlist import PlaylistCreate, SongCreate
+from app.services.cooccurrence_service import CooccurrenceService
+from app.services.playlist_service import PlaylistService
+
+PLAYLISTS = 20_000
+PLAYLIST_SIZE = 30
+TRACKS = 100_000
+QUERIES = 200
+K = 10
+
+
+def random_songs(rng: random.Random, count: int):
+    # Popularity is skewed so some tracks show up in many playlists
+    return [
+        SongCreate(title=f"Track {track}", artist=f"Artist {track % 5_000}")
+        for track in (int(TRACKS * rng.random() ** 2) for _ in range(count))
+    ]
+
+
+def rescan(service: PlaylistService, playlist_id: int):
+    """Count co-occurrences by walking every playlist, as without the matrix"""
+    seeds = {song.id for song in service.get_playlist_by_id(playlist_id).songs}
+    counts = Counter()
+    for playlist in service.snapshot().playlists.values():
+        keys = {song.id for song in playlist.songs}
+        if keys & seeds:
+            counts.update(keys - seeds)
+    return counts.most_common(K)
+
+
+def percentile(samples, fraction):
+    return sorted(samples)[int(fraction * (len(samples) - 1))]
+
+
+def main():
+    rng = random.Random(7)
+    service = PlaylistService()
+    for number in range(PLAYLISTS):
+        service.create_playlist(
+            PlaylistCreate(name=f"p{number}", songs=random_songs(rng, PLAYLIST_SIZE))
+        )
+
+    start = time.perf_counter()
+    cooccurrence = CooccurrenceService(service)
+    matrix = cooccurrence.matrix
+    print(f"built in {time.perf_counter() - start:.2f}s")
+    csr_bytes = matrix.indptr.nbytes + matrix.indices.nbytes + matrix.data.nbytes
+    print(
+        f"{matrix.n_tracks} tracks, {matrix.nnz} non-zero pairs, "
+        f"CSR {csr_bytes / 2**20:.1f} MiB vs dense {matrix.n_tracks**2 * 4 / 2**30:.1f} GiB"
+    )
+
+    seeds = rng.sample(list(service.snapshot().playlists), QUERIES)
+    for name, query in (
+        ("matrix", lambda pid: cooccurrence.recommend_for_playlist(pid, K)),
+        ("rescan", lambda pid: rescan(service, pid)),
+    ):
+        samples = []
+        for playlist_id in seeds[: QUERIES if name == "matrix" else 20]:
+            start = time.perf_counter()
+            query(playlist_id)
+            samples.append((time.perf_counter() - start) * 1000)
+        print(
+            f"{name:>7} query p50 {statistics.median(samples):8.3f} ms"
+            f"  p99 {percentile(samples, 0.99):8.3f} ms"
+        )
+
+    samples = []
+    for playlist_id in seeds:
+        start = time.perf_counter()
+        service.append_songs(playlist_id, random_songs(rng, 5))
+        samples.append((time.perf_counter() - start) * 1000)
+    print(
+        f"append 5 songs p50 {statistics.median(samples):.3f} ms"
+        f"  p99 {percentile(samples, 0.99):.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
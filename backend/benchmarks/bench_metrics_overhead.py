@@ -0,0 +1,253 @@
+"""
+Metrics overhead benchmark: request throughput with and without MetricsMiddleware
+
+"in-process" drives requests straight through the ASGI app, without a server
+or sockets, so the middleware's cost is measured against the app's own work
+alone; it is the worst case. "over HTTP" runs uvicorn servers configured
+with each variant, loads them from keep-alive connections and divides the
+server's CPU time (from /proc, so Linux only) by the requests it served.
+The load generator shares the machine, so CPU per request is steadier
+than requests per second.
+
+Run from the backend directory:
+    python -m benchmarks.bench_metrics_overhead
+"""
+
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["CHANGE_LOG_DIR"] = ""
+os.environ["METRICS_ENABLED"] = "false"
+
+from app.main import app  # noqa: E402
+from app.metrics import MetricsMiddleware  # noqa: E402
+from app.repositories.sqlite_repository import SQLitePlaylistRepository  # noqa: E402
+from app.schemas.playlist import PlaylistCreate, SongCreate  # noqa: E402
+from app.services.playlist_service import PlaylistService  # noqa: E402
+
+PLAYLISTS = 100
+PLAYLIST_SIZE = 50
+PATHS = ("/health", "/api/v1/playlists/{id}", "/api/v1/categories/genre {genre}")
+# name -> MetricsMiddleware sample rate; None runs without the middleware
+VARIANTS = {
+    "no middleware": None,
+    "counts only": 0.0,
+    "sample 1%": 0.01,
+    "sample 10%": 0.1,
+    "sample 100%": 1.0,
+}
+
+# In-process: requests per round and interleaved rounds per variant
+REQUESTS = 250
+ROUNDS = 100
+
+# Over HTTP: keep-alive connections, seconds per round and rounds per variant
+CONNECTIONS = 4
+ROUND_SECONDS = 5.0
+HTTP_ROUNDS = 7
+PORT = 8137
+
+
+def fill_catalog(service: PlaylistService):
+    for playlist in range(PLAYLISTS):
+        service.create_playlist(
+            PlaylistCreate(
+                name=f"Playlist {playlist}",
+                songs=[
+                    SongCreate(
+                        title=f"Song {playlist}-{song}",
+                        artist=f"Artist {song % 20}",
+                        genre=f"genre {song % 10}",
+                        duration=180,
+                    )
+                    for song in range(PLAYLIST_SIZE)
+                ],
+            )
+        )
+
+
+def request_path(template: str, request: int) -> str:
+    path = template.format(id=request % PLAYLISTS + 1, genre=request % 10)
+    return path.replace(" ", "%20")
+
+
+async def call(asgi_app, path: str):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await asgi_app(scope, receive, send)
+
+
+async def in_process_rate(asgi_app, template: str) -> float:
+    """Requests per second for one path template, served one after another"""
+    start = time.perf_counter()
+    for request in range(REQUESTS):
+        await call(asgi_app, request_path(template, request))
+    return REQUESTS / (time.perf_counter() - start)
+
+
+async def in_process(results: dict):
+    from app.dependencies import playlist_service
+
+    fill_catalog(playlist_service())
+    apps = {
+        name: app if rate is None else MetricsMiddleware(app, sample_rate=rate)
+        for name, rate in VARIANTS.items()
+    }
+    for template in PATHS:
+        for asgi_app in apps.values():
+            await in_process_rate(asgi_app, template)  # warm up
+        for _ in range(ROUNDS):
+            for name, asgi_app in apps.items():
+                rate = await in_process_rate(asgi_app, template)
+                results.setdefault((template, name), []).append(rate)
+
+
+async def connection(template: str, offset: int, deadline: float) -> int:
+    """Send GETs one after another on one keep-alive connection until deadline"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    served = 0
+    while time.perf_counter() < deadline:
+        path = request_path(template, offset + served)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+        headers = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in headers.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+        served += 1
+    writer.close()
+    return served
+
+
+def cpu_seconds(pid: int) -> float:
+    """User plus system CPU time of a process and all its threads"""
+    with open(f"/proc/{pid}/stat") as file:
+        fields = file.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def http_load(template: str, seconds: float) -> int:
+    deadline = time.perf_counter() + seconds
+    served = await asyncio.gather(
+        *(connection(template, n * 1000, deadline) for n in range(CONNECTIONS))
+    )
+    return sum(served)
+
+
+def server_cpu_per_request(server: subprocess.Popen, template: str) -> float:
+    """Microseconds of server CPU time per request under load"""
+    asyncio.run(http_load(template, 1.0))  # warm up
+    before = cpu_seconds(server.pid)
+    served = asyncio.run(http_load(template, ROUND_SECONDS))
+    return (cpu_seconds(server.pid) - before) / served * 1e6
+
+
+def start_server(database_url: str, sample_rate) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_URL": database_url, "WORKER_POOL_SIZE": "4"}
+    env["METRICS_ENABLED"] = "false" if sample_rate is None else "true"
+    env["METRICS_SAMPLE_RATE"] = str(sample_rate or 0)
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(PORT),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", PORT)).close()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                sys.exit("The server exited during startup")
+            time.sleep(0.1)
+
+
+def over_http(results: dict):
+    directory = tempfile.mkdtemp(prefix="metrics-overhead-")
+    database_url = f"sqlite:///{os.path.join(directory, 'catalog.db')}"
+    repository = SQLitePlaylistRepository(database_url)
+    fill_catalog(PlaylistService(repository))
+    repository.close()
+
+    # One server per variant and round, rounds interleaved across variants
+    for _ in range(HTTP_ROUNDS):
+        for name, sample_rate in VARIANTS.items():
+            server = start_server(database_url, sample_rate)
+            try:
+                for template in PATHS:
+                    results.setdefault((template, name), []).append(
+                        server_cpu_per_request(server, template)
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+
+
+def report(title: str, results: dict, unit: str, per_request):
+    """Print medians per variant; `per_request` turns a result into microseconds"""
+    print(title)
+    print(f"{'path':>34} {'variant':>14} {unit:>8} {'overhead':>9}")
+    for template in PATHS:
+        baseline = per_request(statistics.median(results[(template, "no middleware")]))
+        for name in VARIANTS:
+            value = statistics.median(results[(template, name)])
+            overhead = (per_request(value) - baseline) / baseline
+            print(f"{template:>34} {name:>14} {value:>8.0f} {overhead:>8.1%}")
+
+
+def main():
+    results = {}
+    asyncio.run(in_process(results))
+    report(
+        f"in-process: median of {ROUNDS} interleaved rounds of {REQUESTS} requests",
+        results,
+        "req/s",
+        lambda rate: 1e6 / rate,
+    )
+    results = {}
+    over_http(results)
+    report(
+        f"over HTTP: {CONNECTIONS} connections, median of {HTTP_ROUNDS}"
+        f" rounds of {ROUND_SECONDS:.0f}s",
+        results,
+        "CPU us",
+        lambda micros: micros,
+    )
+
+
+if __name__ == "__main__":
+    main()
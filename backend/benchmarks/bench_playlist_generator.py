@@ -0,0 +1,70 @@
+"""
+Playlist generation time and duration accuracy with 100k candidate songs
+
+Run from the backend directory:
+    python -m benchmarks.bench_playlist_generator
+"""
+
+import random
+import statistics
+import time
+from app.schemas.playlist import PlaylistCreate, PlaylistGenerateRequest, SongCreate
+from app.services.playlist_generator import PlaylistGenerator
+from app.services.playlist_service import PlaylistService
+
+CANDIDATES = 100_000
+PLAYLIST_SIZE = 1_000
+GENRES = ("pop", "rock", "jazz", "sad")
+ARTISTS = 2_000
+RUNS = 50
+
+REQUESTS = {
+    "1 hour, one genre": dict(seed_categories=["pop"], target_duration=3_600),
+    "3 hours, 2:1:1 mix, <=2 per artist": dict(
+        seed_categories=["pop", "rock", "jazz"],
+        target_duration=10_800,
+        max_tracks_per_artist=2,
+        genre_mix={"pop": 2, "rock": 1, "jazz": 1},
+    ),
+    "24 hours, all genres, <=1 per artist": dict(
+        seed_categories=list(GENRES),
+        target_duration=86_400,
+        max_tracks_per_artist=1,
+    ),
+}
+
+
+def main():
+    rng = random.Random(3)
+    service = PlaylistService()
+    for start in range(0, CANDIDATES, PLAYLIST_SIZE):
+        songs = [
+            SongCreate(
+                title=f"Track {number}",
+                artist=f"Artist {rng.randrange(ARTISTS)}",
+                genre=rng.choice(GENRES),
+                duration=rng.randint(90, 420),
+            )
+            for number in range(start, start + PLAYLIST_SIZE)
+        ]
+        service.create_playlist(PlaylistCreate(name="catalog", songs=songs))
+
+    generator = PlaylistGenerator(service)
+    print(f"{'request':>38} {'p50 ms':>8} {'max ms':>8} {'mean gap s':>11}")
+    for name, fields in REQUESTS.items():
+        timings = []
+        gaps = []
+        for seed in range(RUNS):
+            request = PlaylistGenerateRequest(seed=seed, **fields)
+            start = time.perf_counter()
+            songs = generator.select_songs(request)
+            timings.append((time.perf_counter() - start) * 1000)
+            gaps.append(request.target_duration - sum(song.duration for song in songs))
+        print(
+            f"{name:>38} {statistics.median(timings):8.1f} {max(timings):8.1f}"
+            f" {statistics.mean(gaps):11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
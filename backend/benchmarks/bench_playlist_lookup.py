@@ -0,0 +1,48 @@
+"""
+Micro-benchmark for playlist get/update/delete by ID as the store grows
+
+Run from the backend directory:
+    python -m benchmarks.bench_playlist_lookup
+"""
+
+import random
+import time
+from app.schemas.playlist import PlaylistCreate, PlaylistUpdate
+from app.services.playlist_service import PlaylistService
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+OPERATIONS = 1_000
+
+
+def build_service(size: int) -> PlaylistService:
+    """Build a playlist service holding `size` empty playlists"""
+    service = PlaylistService()
+    for i in range(size):
+        service.create_playlist(PlaylistCreate(name=f"Playlist {i}"))
+    return service
+
+
+def time_per_op(fn, ids) -> float:
+    """Return the mean time per call of fn over ids, in microseconds"""
+    start = time.perf_counter()
+    for playlist_id in ids:
+        fn(playlist_id)
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def main():
+    update = PlaylistUpdate(name="Renamed")
+    print(f"{'playlists':>10} {'get (us)':>10} {'update (us)':>12} {'delete (us)':>12}")
+    for size in SIZES:
+        service = build_service(size)
+        ids = [p.id for p in service.get_all_playlists()]
+        sample = random.sample(ids, OPERATIONS)
+
+        get_us = time_per_op(service.get_playlist_by_id, sample)
+        update_us = time_per_op(lambda i: service.update_playlist(i, update), sample)
+        delete_us = time_per_op(service.delete_playlist, sample)
+        print(f"{size:>10} {get_us:>10.3f} {update_us:>12.3f} {delete_us:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
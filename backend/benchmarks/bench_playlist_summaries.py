@@ -0,0 +1,99 @@
+"""
+Listing benchmark: 100k playlists as summaries vs with their songs
+
+Lists every playlist of a 100k-playlist, 1M-song catalog as the summary
+listing and the full listing encode it: from PlaylistService's in-memory
+catalog, and from a shared catalog file as a reader worker serves it.
+Each shared catalog listing runs in a fresh process, and the part of the
+catalog file it read is the file's resident size in that process. The
+file is read from a warm page cache.
+
+Run from the backend directory:
+    python -m benchmarks.bench_playlist_summaries
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+from app.models.playlist import Playlist
+from app.serialization import dump_playlist_summaries, dump_playlists
+from app.services.catalog_publisher import save_snapshot
+from app.services.playlist_service import PlaylistService
+from app.services.shared_catalog import SharedCatalog, set_current
+from benchmarks.bench_recommendations import build_playlists
+from benchmarks.bench_snapshot_startup import _ListRepository
+
+PLAYLIST_SIZE = 10
+LISTINGS = {
+    "summaries": dump_playlist_summaries,
+    "include_songs=false": lambda playlists: dump_playlists(playlists, False),
+    "full": dump_playlists,
+}
+
+
+def mapped_kb(path: str) -> int:
+    """Resident size of this process's mappings of a file, in kB"""
+    total = 0
+    in_file = False
+    with open("/proc/self/smaps") as smaps:
+        for line in smaps:
+            fields = line.split()
+            if "-" in fields[0] and ":" not in fields[0]:
+                in_file = fields[-1] == path
+            elif in_file and fields[0] == "Rss:":
+                total += int(fields[1])
+    return total
+
+
+def list_shared(directory: str, listing: str, results):
+    catalog = SharedCatalog(directory)
+    start = time.perf_counter()
+    body = LISTINGS[listing](catalog.iter_playlists())
+    elapsed = time.perf_counter() - start
+    read = mapped_kb(os.path.join(directory, "catalog.bin")) / 1024
+    results.put((elapsed, len(body), read))
+
+
+def main():
+    # 100k playlists: regroup the 1M songs into shorter playlists
+    songs = [song for playlist in build_playlists() for song in playlist.songs]
+    playlists = [
+        Playlist(
+            id=number + 1,
+            name=f"Playlist {number + 1}",
+            songs=songs[start : start + PLAYLIST_SIZE],
+        )
+        for number, start in enumerate(range(0, len(songs), PLAYLIST_SIZE))
+    ]
+    service = PlaylistService(_ListRepository(playlists))
+    print(f"{len(playlists)} playlists, {len(songs)} songs")
+    print(f"{'catalog':>8} {'listing':>20} {'seconds':>8} {'MB out':>7} {'MB read':>8}")
+    for listing, encode in LISTINGS.items():
+        start = time.perf_counter()
+        body = encode(service.iter_playlists())
+        elapsed = time.perf_counter() - start
+        print(f"{'memory':>8} {listing:>20} {elapsed:>8.2f} {len(body) / 2**20:>7.1f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "catalog.bin")
+        save_snapshot(service, path)
+        set_current(directory, "catalog.bin")
+        print(f"catalog file {os.path.getsize(path) / 2**20:.1f} MB")
+        context = multiprocessing.get_context("fork")
+        for listing in LISTINGS:
+            results = context.Queue()
+            process = context.Process(
+                target=list_shared, args=(directory, listing, results)
+            )
+            process.start()
+            elapsed, size, read = results.get()
+            process.join()
+            print(
+                f"{'shared':>8} {listing:>20} {elapsed:>8.2f}"
+                f" {size / 2**20:>7.1f} {read:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
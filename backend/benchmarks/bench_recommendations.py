@@ -0,0 +1,72 @@
+"""
+Latency benchmark for the recommendation engine on a synthetic 1M-song catalog
+
+Run from the backend directory:
+    python -m benchmarks.bench_recommendations
+"""
+
+import random
+import time
+import numpy as np
+from app.models.playlist import Playlist, Song
+from app.services.recommendation_engine import RecommendationEngine
+
+SONGS = 1_000_000
+PLAYLIST_SIZE = 50
+GENRES = 30
+ARTISTS = 50_000
+QUERIES = 2_000
+LIMIT = 20
+
+
+def build_playlists():
+    """Playlists of random songs; each artist mostly sticks to one genre"""
+    rng = random.Random(42)
+    playlists = []
+    song_id = 1
+    for playlist_id in range(1, SONGS // PLAYLIST_SIZE + 1):
+        songs = []
+        for _ in range(PLAYLIST_SIZE):
+            artist = rng.randrange(ARTISTS)
+            genre = artist % GENRES if rng.random() < 0.8 else rng.randrange(GENRES)
+            songs.append(
+                Song(
+                    id=song_id,
+                    title=f"Song {song_id}",
+                    artist=f"Artist {artist}",
+                    genre=f"genre {genre}",
+                    duration=rng.randint(90, 420),
+                )
+            )
+            song_id += 1
+        playlists.append(
+            Playlist(id=playlist_id, name=f"Playlist {playlist_id}", songs=songs)
+        )
+    return playlists
+
+
+def main():
+    playlists = build_playlists()
+    start = time.perf_counter()
+    engine = RecommendationEngine(playlists)
+    print(
+        f"built engine over {len(engine.songs)} songs in {time.perf_counter() - start:.2f}s"
+    )
+
+    rng = random.Random(7)
+    for label, make_query in (
+        ("genre", lambda: f"genre {rng.randrange(GENRES)}"),
+        ("artist", lambda: f"artist {rng.randrange(ARTISTS)}"),
+    ):
+        latencies = []
+        for _ in range(QUERIES):
+            category = make_query()
+            start = time.perf_counter()
+            engine.recommend(category, LIMIT)
+            latencies.append((time.perf_counter() - start) * 1000)
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"{label:>7} queries: p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Recommendation latency while playlists are being written
+
+Requests for genre and artist recommendations run against a 200k-song
+catalog, first alone and then while a writer thread creates a playlist
+every WRITE_INTERVAL seconds. Each write makes the recommendation engine
+stale. The time of one full engine build is reported alongside, since it
+is what a request that had to wait for a rebuild would pay.
+
+Run from the backend directory:
+    python -m benchmarks.bench_recommendations_under_writes
+"""
+
+import random
+import threading
+import time
+import numpy as np
+from app.models.playlist import Playlist, Song
+from app.schemas.playlist import PlaylistCreate, SongCreate
+from app.schemas.recommendation import RecommendationRequest
+from app.services.playlist_service import PlaylistService
+from app.services.recommendation_engine import RecommendationEngine
+from app.services.recommendation_service import RecommendationService
+from benchmarks.bench_snapshot_startup import _ListRepository
+
+SONGS = 200_000
+PLAYLIST_SIZE = 50
+GENRES = 30
+ARTISTS = 10_000
+ROUND_SECONDS = 5.0
+WRITE_INTERVAL = 0.05
+LIMIT = 10
+
+
+class _MemoryRepository(_ListRepository):
+    """Serves the built playlists and drops writes, timing memory only"""
+
+    def save_playlist(self, playlist):
+        pass
+
+
+def build_playlists():
+    rng = random.Random(42)
+    playlists = []
+    song_id = 1
+    for playlist_id in range(1, SONGS // PLAYLIST_SIZE + 1):
+        songs = []
+        for _ in range(PLAYLIST_SIZE):
+            artist = rng.randrange(ARTISTS)
+            songs.append(
+                Song(
+                    id=song_id,
+                    title=f"Song {song_id}",
+                    artist=f"Artist {artist}",
+                    genre=f"genre {artist % GENRES}",
+                    duration=rng.randint(90, 420),
+                )
+            )
+            song_id += 1
+        playlists.append(
+            Playlist(id=playlist_id, name=f"Playlist {playlist_id}", songs=songs)
+        )
+    return playlists
+
+
+def write(service: PlaylistService, stop: threading.Event, rng: random.Random):
+    number = 0
+    while not stop.wait(WRITE_INTERVAL):
+        number += 1
+        songs = [
+            SongCreate(
+                title=f"New {number}/{offset}",
+                artist=f"Artist {rng.randrange(ARTISTS)}",
+                genre=f"genre {rng.randrange(GENRES)}",
+                duration=rng.randint(90, 420),
+            )
+            for offset in range(PLAYLIST_SIZE)
+        ]
+        service.create_playlist(PlaylistCreate(name=f"New {number}", songs=songs))
+
+
+def run_round(
+    service: PlaylistService, recommendations: RecommendationService, writes: bool
+):
+    """Time requests for ROUND_SECONDS; returns latencies in ms and writes made"""
+    rng = random.Random(7)
+    stop = threading.Event()
+    version = service.version
+    writer = threading.Thread(target=write, args=(service, stop, random.Random(1)))
+    if writes:
+        writer.start()
+    latencies = []
+    deadline = time.perf_counter() + ROUND_SECONDS
+    while time.perf_counter() < deadline:
+        if rng.random() < 0.5:
+            category = f"genre {rng.randrange(GENRES)}"
+        else:
+            category = f"artist {rng.randrange(ARTISTS)}"
+        request = RecommendationRequest(category=category, limit=LIMIT)
+        start = time.perf_counter()
+        recommendations.get_recommendations(request)
+        latencies.append((time.perf_counter() - start) * 1000)
+    stop.set()
+    if writes:
+        writer.join()
+    return latencies, service.version - version
+
+
+def main():
+    playlists = build_playlists()
+    start = time.perf_counter()
+    RecommendationEngine(playlists)
+    build_ms = (time.perf_counter() - start) * 1000
+    service = PlaylistService(_MemoryRepository(playlists))
+    recommendations = RecommendationService(service)
+    recommendations.get_engine()
+    print(f"{SONGS} songs, one engine build {build_ms:.0f} ms")
+    print(f"{'':>14} {'requests':>8} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7}")
+    for label, writes in (("no writes", False), ("writes", True)):
+        latencies, written = run_round(service, recommendations, writes)
+        p50, p99 = np.percentile(latencies, [50, 99])
+        if writes:
+            label = f"{written / ROUND_SECONDS:.0f} writes/s"
+        print(
+            f"{label:>14} {len(latencies):>8} {p50:7.2f} {p99:7.2f}"
+            f" {max(latencies):7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Search index build time, update cost and query latency on 500k tracks
+
+Run from the backend directory:
+    python -m benchmarks.bench_search
+"""
+
+import random
+import statistics
+import time
+from itertools import accumulate
+from app.services.search_index import SearchIndex
+
+TRACKS = 500_000
+VOCABULARY = 50_000
+ARTISTS = 20_000
+QUERIES = 2_000
+
+
+def make_words(rng: random.Random, count: int):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return [
+        "".join(rng.choice(letters) for _ in range(rng.randint(3, 9)))
+        for _ in range(count)
+    ]
+
+
+def percentile(samples, fraction):
+    return sorted(samples)[int(fraction * (len(samples) - 1))]
+
+
+def main():
+    rng = random.Random(11)
+    words = make_words(rng, VOCABULARY)
+    artists = [" ".join(rng.sample(words, 2)) for _ in range(ARTISTS)]
+    # Zipf-like word popularity, as in real titles
+    weights = list(accumulate(1 / (rank + 1) for rank in range(VOCABULARY)))
+    titles = [
+        " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(1, 4)))
+        for _ in range(TRACKS)
+    ]
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    for doc_id, title in enumerate(titles):
+        index.add(doc_id, title, artists[doc_id % ARTISTS])
+    print(f"indexed {len(index)} tracks in {time.perf_counter() - start:.2f}s")
+
+    workloads = {}
+    for length in (1, 2, 3, 5):
+        workloads[f"title prefix, {length} chars"] = [
+            rng.choice(titles).split()[0][:length] for _ in range(QUERIES)
+        ]
+    workloads["two words, last partial"] = [
+        f"{title.split()[0]} {artists[doc_id % ARTISTS].split()[0][:3]}"
+        for doc_id, title in (
+            (doc_id, titles[doc_id]) for doc_id in rng.sample(range(TRACKS), QUERIES)
+        )
+    ]
+
+    print(f"{'query':>26} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, queries in workloads.items():
+        samples = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, 10)
+            samples.append((time.perf_counter() - start) * 1000)
+        print(
+            f"{name:>26} {statistics.median(samples):8.3f}"
+            f" {percentile(samples, 0.99):8.3f}"
+        )
+
+    samples = []
+    for doc_id in rng.sample(range(TRACKS), QUERIES):
+        start = time.perf_counter()
+        index.remove(doc_id)
+        index.add(doc_id, titles[doc_id], artists[doc_id % ARTISTS])
+        samples.append((time.perf_counter() - start) * 1000)
+    print(
+        f"{'re-index one track':>26} {statistics.median(samples):8.3f}"
+        f" {percentile(samples, 0.99):8.3f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Serialization benchmark: encoding 10k-song responses with and without Pydantic models
+
+Compares FastAPI's response_model path, validating into response models
+and dumping them, and the direct encoder in app.serialization. Every path
+must produce the same document.
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialization
+"""
+
+import json
+import statistics
+import time
+from datetime import datetime
+from typing import List
+from pydantic import TypeAdapter
+from app.models.playlist import Playlist, Song
+from app.schemas.playlist import PlaylistResponse, SongResponse
+from app.serialization import dump_playlist, dump_songs
+
+SONGS = 10_000
+RUNS = 30
+
+_SONG_LIST = TypeAdapter(List[SongResponse])
+
+
+def build_playlist() -> Playlist:
+    songs = [
+        Song(
+            id=song_id,
+            title=f"Song {song_id}",
+            artist=f"Artist {song_id % 500}",
+            genre=f"genre {song_id % 30}" if song_id % 10 else None,
+            duration=90 + song_id % 330,
+        )
+        for song_id in range(1, SONGS + 1)
+    ]
+    now = datetime.now()
+    return Playlist(
+        id=1, name="Big playlist", songs=songs, created_at=now, updated_at=now
+    )
+
+
+def response_model_json(model) -> bytes:
+    """What FastAPI does for a response_model: dump to Python, then json.dumps"""
+    return json.dumps(
+        model.model_dump(mode="json"), ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def timed(encode) -> float:
+    """Median milliseconds per call"""
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        encode()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    playlist = build_playlist()
+    songs = playlist.songs
+    cases = {
+        "playlist": [
+            (
+                "response_model",
+                lambda: response_model_json(PlaylistResponse.model_validate(playlist)),
+            ),
+            (
+                "validate + dump_json",
+                lambda: PlaylistResponse.model_validate(playlist)
+                .model_dump_json()
+                .encode(),
+            ),
+            ("dump_playlist", lambda: dump_playlist(playlist)),
+        ],
+        "song list": [
+            (
+                "validate + dump_json",
+                lambda: _SONG_LIST.dump_json(
+                    _SONG_LIST.validate_python(songs, from_attributes=True)
+                ),
+            ),
+            ("dump_songs", lambda: dump_songs(songs)),
+        ],
+    }
+
+    print(f"{SONGS} songs, median of {RUNS} runs")
+    print(f"{'response':>10} {'path':>22} {'ms':>7} {'speedup':>8} {'KB':>6}")
+    for name, paths in cases.items():
+        bodies = [encode() for _, encode in paths]
+        assert all(
+            json.loads(body) == json.loads(bodies[0]) for body in bodies
+        ), f"{name} paths disagree"
+        baseline = timed(paths[0][1])
+        for (label, encode), body in zip(paths, bodies):
+            took = timed(encode)
+            print(
+                f"{name:>10} {label:>22} {took:>7.2f} {baseline / took:>7.1f}x"
+                f" {len(body) / 1024:>6.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Shared catalog benchmark: publish cost, reader memory and read throughput by reader count
+
+Run from the backend directory:
+    python -m benchmarks.bench_shared_catalog
+"""
+
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from app.schemas.playlist import PlaylistCreate, PlaylistResponse, SongCreate
+from app.services.catalog_publisher import CatalogPublisher
+from app.services.playlist_service import PlaylistService
+from app.services.shared_catalog import SharedCatalog, generation_file_name
+from benchmarks.bench_recommendations import build_playlists
+
+READER_COUNTS = (1, 2, 4)
+SECONDS = 5
+
+
+def memory_kb():
+    """Resident, proportional and private memory of this process, in kB"""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as smaps:
+        for line in smaps:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "private": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def serve_reads(catalog, playlist_ids) -> int:
+    """Random playlist reads, serialized like GET /playlists/{id}, for SECONDS"""
+    rng = random.Random()
+    deadline = time.perf_counter() + SECONDS
+    reads = 0
+    while time.perf_counter() < deadline:
+        playlist = catalog.get_playlist_by_id(rng.choice(playlist_ids))
+        PlaylistResponse.model_validate(playlist).model_dump_json()
+        reads += 1
+    return reads
+
+
+def reader(directory, start, results):
+    """Attach to the catalog, touch every column, then serve random playlist reads"""
+    baseline = memory_kb()
+    catalog = SharedCatalog(directory)
+    for genre in catalog.get_genres():
+        catalog.get_songs_by_genre(genre)
+    catalog.get_all_playlists()
+    playlist_ids = list(catalog.snapshot().playlists)
+    attached = memory_kb()
+
+    start.wait()
+    results.put(
+        {
+            "reads": serve_reads(catalog, playlist_ids),
+            "private": attached["private"] - baseline["private"],
+            "pss": attached["pss"] - baseline["pss"],
+        }
+    )
+
+
+def main():
+    before = memory_kb()["rss"]
+    service = PlaylistService()
+    for playlist in build_playlists():
+        service.create_playlist(
+            PlaylistCreate(
+                name=playlist.name,
+                songs=[
+                    SongCreate(
+                        title=song.title,
+                        artist=song.artist,
+                        genre=song.genre,
+                        duration=song.duration,
+                    )
+                    for song in playlist.songs
+                ],
+            )
+        )
+    in_process_mb = (memory_kb()["rss"] - before) / 1024
+    songs = sum(len(p.songs) for p in service.get_all_playlists())
+    print(f"{songs} songs; in-process PlaylistService: {in_process_mb:.0f} MB")
+    reads = serve_reads(service, [p.id for p in service.get_all_playlists()])
+    print(f"in-process reads: {reads / SECONDS:.0f}/s")
+
+    directory = tempfile.mkdtemp(prefix="shared-catalog-")
+    publisher = CatalogPublisher(service, directory)
+    start = time.perf_counter()
+    publisher.publish()
+    elapsed = time.perf_counter() - start
+    path = os.path.join(directory, generation_file_name(publisher.generation))
+    file_mb = os.path.getsize(path) / 2**20
+    print(f"publish: {elapsed:.2f}s, catalog file {file_mb:.0f} MB")
+
+    start = time.perf_counter()
+    SharedCatalog(directory)
+    print(f"attach: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(
+        f"{'readers':>8} {'reads/s':>10} {'per reader':>11}"
+        f" {'private MB/reader':>18} {'PSS MB total':>13}"
+    )
+    context = multiprocessing.get_context("spawn")
+    for count in READER_COUNTS:
+        # Reads start once every reader has attached
+        start_barrier = context.Barrier(count + 1)
+        results = context.Queue()
+        processes = [
+            context.Process(target=reader, args=(directory, start_barrier, results))
+            for _ in range(count)
+        ]
+        for process in processes:
+            process.start()
+        start_barrier.wait()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        reads = sum(outcome["reads"] for outcome in outcomes) / SECONDS
+        private = max(outcome["private"] for outcome in outcomes) / 1024
+        pss = sum(outcome["pss"] for outcome in outcomes) / 1024
+        print(
+            f"{count:>8} {reads:>10.0f} {reads / count:>11.0f}"
+            f" {private:>18.0f} {pss:>13.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
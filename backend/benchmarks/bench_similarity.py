@@ -0,0 +1,116 @@
+"""
+Recall and latency of the IVF similarity index against brute-force search
+
+First checks that IDs removed and then added again, with new vectors, are
+stored and returned once. Exits with status 1 if they are not.
+
+Run from the backend directory:
+    python -m benchmarks.bench_similarity
+"""
+
+import random
+import sys
+import time
+from typing import List
+import numpy as np
+from app.models.playlist import Song
+from app.services.ann_index import IVFIndex
+from app.services.similarity_service import SongEmbedder
+
+SONGS = 500_000
+PLAYLIST_SIZE = 50
+GENRES = 30
+ARTISTS = 20_000
+NLIST = 512
+QUERIES = 500
+K = 10
+
+
+def build_vectors(embedder: SongEmbedder) -> np.ndarray:
+    rng = random.Random(42)
+    chunks = []
+    for playlist_id in range(SONGS // PLAYLIST_SIZE):
+        songs = []
+        for _ in range(PLAYLIST_SIZE):
+            artist = rng.randrange(ARTISTS)
+            songs.append(
+                Song(
+                    id=0,
+                    title="",
+                    artist=f"Artist {artist}",
+                    genre=f"genre {artist % GENRES}",
+                    duration=rng.randint(90, 420),
+                )
+            )
+        chunks.append(embedder.embed(songs, playlist_id))
+    return np.concatenate(chunks)
+
+
+def check_readd(embedder: SongEmbedder) -> List[str]:
+    """Remove IDs, add them back embedded in another playlist, and search for them"""
+    songs = [
+        Song(id=0, title="", artist=f"Artist {n % 50}", genre=f"genre {n % 7}")
+        for n in range(2_000)
+    ]
+    vectors = embedder.embed(songs, 1)
+    ids = np.arange(len(songs), dtype=np.int64)
+    index = IVFIndex.train(vectors, 16)
+    index.add(ids, vectors)
+    readded = ids[:200]
+    index.remove(readded[:100].tolist())
+    index.remove(readded[100:].tolist())
+    new_vectors = embedder.embed(songs[:200], 2)
+    index.add(readded, new_vectors)
+
+    errors = []
+    stored = np.concatenate([inverted.ids[: inverted.size] for inverted in index.lists])
+    if len(index) != len(songs) or len(stored) != len(np.unique(stored)):
+        errors.append(f"{len(stored)} vectors stored for {len(songs)} IDs")
+    for song_id, vector in zip(readded.tolist(), new_vectors):
+        result = [match for match, _ in index.search(vector, 20, index.nlist)]
+        if len(result) != len(set(result)):
+            errors.append(f"ID {song_id} search returned an ID twice")
+        if song_id not in result:
+            errors.append(f"re-added ID {song_id} is not found by its new vector")
+    return errors
+
+
+def main():
+    errors = check_readd(SongEmbedder())
+    for error in errors[:10]:
+        print(f"  {error}")
+    print("re-added IDs:", f"{len(errors)} errors" if errors else "stored once")
+    if errors:
+        sys.exit(1)
+
+    vectors = build_vectors(SongEmbedder())
+    ids = np.arange(len(vectors), dtype=np.int64)
+    start = time.perf_counter()
+    index = IVFIndex.train(vectors, NLIST)
+    index.add(ids, vectors)
+    print(f"indexed {len(index)} vectors in {time.perf_counter() - start:.2f}s")
+
+    queries = vectors[np.random.default_rng(1).choice(len(vectors), QUERIES)]
+    exact = []
+    start = time.perf_counter()
+    for query in queries:
+        scores = vectors @ query
+        top = np.argpartition(-scores, K)[:K]
+        exact.append(set(top.tolist()))
+    brute_ms = (time.perf_counter() - start) / QUERIES * 1000
+    print(f"{'method':>14} {'recall@10':>10} {'latency (ms)':>13}")
+    print(f"{'brute force':>14} {1.0:>10.3f} {brute_ms:>13.3f}")
+
+    for nprobe in (1, 4, 8, 16, 32, 64):
+        found = 0
+        start = time.perf_counter()
+        results = [index.search(query, K, nprobe) for query in queries]
+        latency_ms = (time.perf_counter() - start) / QUERIES * 1000
+        for truth, result in zip(exact, results):
+            found += len(truth & {song_id for song_id, _ in result})
+        recall = found / (K * QUERIES)
+        print(f"{f'ivf nprobe={nprobe}':>14} {recall:>10.3f} {latency_ms:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
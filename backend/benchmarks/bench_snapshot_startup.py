@@ -0,0 +1,151 @@
+"""
+Startup benchmark: time to first served read from JSON, SQLite and a catalog snapshot
+
+Each load runs in a fresh process on a synthetic 1M-song catalog. Files
+are read from a warm page cache.
+
+Run from the backend directory:
+    python -m benchmarks.bench_snapshot_startup
+"""
+
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import datetime
+from app.models.playlist import Playlist, Song
+from app.repositories.sqlite_repository import SQLitePlaylistRepository
+from app.services.catalog_publisher import save_snapshot
+from app.services.playlist_service import PlaylistService
+from app.services.shared_catalog import SharedCatalog, set_current
+from benchmarks.bench_recommendations import GENRES, build_playlists
+from benchmarks.bench_shared_catalog import memory_kb
+
+
+class _JsonRepository:
+    """Loads playlists from a JSON document shaped like the API's responses"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load_playlists(self):
+        with open(self.path) as file:
+            for playlist in json.load(file):
+                yield Playlist(
+                    id=playlist["id"],
+                    name=playlist["name"],
+                    description=playlist["description"],
+                    songs=[Song(**song) for song in playlist["songs"]],
+                    created_at=datetime.fromisoformat(playlist["created_at"]),
+                    updated_at=datetime.fromisoformat(playlist["updated_at"]),
+                )
+
+
+class _ListRepository:
+    """Serves an already built list of playlists to PlaylistService"""
+
+    def __init__(self, playlists):
+        self.playlists = playlists
+
+    def load_playlists(self):
+        return iter(self.playlists)
+
+
+def first_reads(catalog):
+    """The reads a freshly started server would answer first"""
+    catalog.get_playlist_by_id(1)
+    catalog.get_songs_by_genre("genre 0")
+
+
+def start(kind, path, results):
+    begin = time.perf_counter()
+    if kind == "json":
+        catalog = PlaylistService(_JsonRepository(path))
+    elif kind == "sqlite":
+        catalog = PlaylistService(SQLitePlaylistRepository(f"sqlite:///{path}"))
+    else:
+        catalog = SharedCatalog(path)
+    ready = time.perf_counter()
+    first_reads(catalog)
+    served = time.perf_counter()
+    # A genre listing over the whole catalog touches most of a snapshot's pages
+    for genre in range(GENRES):
+        catalog.get_songs_by_genre(f"genre {genre}")
+    results.put((ready - begin, served - begin, memory_kb()["rss"] / 1024))
+
+
+def main():
+    playlists = build_playlists()
+    service = PlaylistService(_ListRepository(playlists))
+    directory = tempfile.mkdtemp(prefix="snapshot-startup-")
+    paths = {
+        "json": os.path.join(directory, "catalog.json"),
+        "sqlite": os.path.join(directory, "catalog.db"),
+        "snapshot": os.path.join(directory, "catalog_snapshot.bin"),
+    }
+
+    saved = {}
+    begin = time.perf_counter()
+    with open(paths["json"], "w") as file:
+        json.dump(
+            [
+                {
+                    "id": playlist.id,
+                    "name": playlist.name,
+                    "description": playlist.description,
+                    "created_at": playlist.created_at.isoformat(),
+                    "updated_at": playlist.updated_at.isoformat(),
+                    "songs": [
+                        {
+                            "id": song.id,
+                            "title": song.title,
+                            "artist": song.artist,
+                            "genre": song.genre,
+                            "duration": song.duration,
+                        }
+                        for song in playlist.songs
+                    ],
+                }
+                for playlist in playlists
+            ],
+            file,
+        )
+    saved["json"] = time.perf_counter() - begin
+    begin = time.perf_counter()
+    repository = SQLitePlaylistRepository(f"sqlite:///{paths['sqlite']}")
+    repository.replace_playlists(playlists)
+    repository.close()
+    saved["sqlite"] = time.perf_counter() - begin
+    begin = time.perf_counter()
+    save_snapshot(service, paths["snapshot"])
+    saved["snapshot"] = time.perf_counter() - begin
+    # Readers find the snapshot through a shared directory's pointer
+    shared = os.path.join(directory, "shared")
+    os.makedirs(shared)
+    set_current(shared, paths["snapshot"])
+
+    songs = sum(len(playlist.songs) for playlist in playlists)
+    print(f"{songs} songs")
+    print(
+        f"{'format':>9} {'size MB':>8} {'save s':>7} {'ready s':>8}"
+        f" {'first read s':>13} {'RSS MB':>7}"
+    )
+    context = multiprocessing.get_context("spawn")
+    for kind in ("json", "sqlite", "snapshot"):
+        results = context.Queue()
+        process = context.Process(
+            target=start,
+            args=(kind, shared if kind == "snapshot" else paths[kind], results),
+        )
+        process.start()
+        ready, served, rss = results.get()
+        process.join()
+        print(
+            f"{kind:>9} {os.path.getsize(paths[kind]) / 2**20:>8.0f}"
+            f" {saved[kind]:>7.2f} {ready:>8.3f} {served:>13.3f} {rss:>7.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
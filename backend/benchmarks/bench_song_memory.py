@@ -0,0 +1,71 @@
+"""
+Memory benchmark: bytes per song for a synthetic 1M-song catalog
+
+Compares the original dict-backed Song class, the slotted/interned Song
+model and the columnar SongColumns store.
+
+Run from the backend directory:
+    python -m benchmarks.bench_song_memory
+"""
+
+import gc
+import tracemalloc
+from app.models.playlist import Song
+from app.models.song_columns import SongColumns
+
+SONGS = 1_000_000
+ARTISTS = 20_000
+GENRES = ["pop", "rock", "sad", "jazz", "hip hop", "classical", "electronic"]
+
+
+class DictSong:
+    """The Song model as it was before __slots__ and interning"""
+
+    def __init__(self, id, title, artist, genre=None, duration=None):
+        self.id = id
+        self.title = title
+        self.artist = artist
+        self.genre = genre
+        self.duration = duration
+
+
+def rows():
+    """Yield song fields with freshly allocated strings, as a JSON parser would"""
+    for i in range(SONGS):
+        yield (
+            i,
+            f"Song {i}",
+            f"Artist {i % ARTISTS}",
+            (GENRES[i % len(GENRES)] + " ").rstrip(),
+            120 + i % 300,
+        )
+
+
+def measure(build) -> int:
+    """Return the bytes still allocated by the structure `build` returns"""
+    gc.collect()
+    tracemalloc.start()
+    structure = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del structure
+    return current
+
+
+def main():
+    results = {
+        "dict Song": measure(lambda: [DictSong(*row) for row in rows()]),
+        "slotted Song": measure(lambda: [Song(*row) for row in rows()]),
+        "SongColumns": measure(
+            lambda: SongColumns.from_songs(Song(*row) for row in rows())
+        ),
+    }
+    baseline = results["dict Song"]
+    print(f"{'representation':>15} {'bytes/song':>11} {'vs dict':>8}")
+    for name, total in results.items():
+        print(f"{name:>15} {total / SONGS:>11.1f} {total / baseline:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
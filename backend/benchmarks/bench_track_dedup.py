@@ -0,0 +1,102 @@
+"""
+Memory and write cost of canonical tracks against a copy per playlist entry
+
+Builds a catalog of 20k playlists of 30 songs drawn from 50k tracks with
+skewed popularity, as writes through PlaylistService, so each track is
+held once however many playlists add it. The same entries are then loaded
+with a separate Song per entry, as they were stored before songs were
+merged. Reports the memory of each catalog with its indexes, the largest
+genre category, and the cost of creating a playlist.
+
+Run from the backend directory:
+    python -m benchmarks.bench_track_dedup
+"""
+
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+from app.models.playlist import Playlist, Song
+from app.schemas.playlist import PlaylistCreate, SongCreate
+from app.services.playlist_service import PlaylistService
+from benchmarks.bench_snapshot_startup import _ListRepository
+
+PLAYLISTS = 20_000
+PLAYLIST_SIZE = 30
+TRACKS = 50_000
+GENRES = 20
+CREATES = 500
+
+
+def track(rng: random.Random) -> SongCreate:
+    number = int(TRACKS * rng.random() ** 2)
+    return SongCreate(
+        title=f"Track {number}",
+        artist=f"Artist {number % 5_000}",
+        genre=f"genre {number % GENRES}",
+        duration=120 + number % 240,
+    )
+
+
+def measure(build):
+    """Return what `build` returns and the bytes it still holds"""
+    gc.collect()
+    tracemalloc.start()
+    structure = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return structure, current
+
+
+def with_copies(service: PlaylistService) -> PlaylistService:
+    """The same catalog with one Song per playlist entry"""
+    song_id = 0
+    playlists = []
+    for playlist in service.get_all_playlists():
+        songs = []
+        for song in playlist.songs:
+            song_id += 1
+            songs.append(
+                Song(song_id, song.title, song.artist, song.genre, song.duration)
+            )
+        playlists.append(Playlist(id=playlist.id, name=playlist.name, songs=songs))
+    return PlaylistService(_ListRepository(playlists))
+
+
+def main():
+    rng = random.Random(7)
+    payloads = [[track(rng) for _ in range(PLAYLIST_SIZE)] for _ in range(PLAYLISTS)]
+
+    def build() -> PlaylistService:
+        service = PlaylistService()
+        for number, songs in enumerate(payloads):
+            service.create_playlist(PlaylistCreate(name=f"p{number}", songs=songs))
+        return service
+
+    canonical, canonical_bytes = measure(build)
+    copies, copies_bytes = measure(lambda: with_copies(canonical))
+    entries = sum(playlist.song_count for playlist in canonical.get_all_playlists())
+    print(f"{PLAYLISTS} playlists, {entries} entries, {canonical.track_count} tracks")
+    for name, service, size in (
+        ("per entry", copies, copies_bytes),
+        ("canonical", canonical, canonical_bytes),
+    ):
+        largest = max(len(songs) for songs in service.snapshot().genre_index.values())
+        print(f"{name:>10}: {size / 2**20:7.1f} MB, largest genre {largest} songs")
+    print(f"saved {(copies_bytes - canonical_bytes) / 2**20:.1f} MB")
+
+    samples = []
+    for number in range(CREATES):
+        songs = [track(rng) for _ in range(PLAYLIST_SIZE)]
+        start = time.perf_counter()
+        canonical.create_playlist(PlaylistCreate(name=f"new {number}", songs=songs))
+        samples.append((time.perf_counter() - start) * 1000)
+    print(
+        f"create a {PLAYLIST_SIZE}-song playlist p50 {statistics.median(samples):.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
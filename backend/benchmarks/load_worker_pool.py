@@ -0,0 +1,129 @@
+"""
+Load test: latency of /health and small GETs while heavy requests are in flight
+
+Heavy category listings run continuously from several clients while a probe
+client polls cheap endpoints. With the worker pool disabled the heavy work
+runs on the event loop and the probes queue behind it.
+
+Run from the backend directory:
+    python -m benchmarks.load_worker_pool
+"""
+
+import asyncio
+import random
+import time
+import httpx
+import numpy as np
+from app.dependencies import (
+    get_category_service,
+    get_playlist_service,
+    get_worker_pool,
+)
+from app.main import app
+from app.schemas.playlist import PlaylistCreate, SongCreate
+from app.services.category_service import CategoryService
+from app.services.playlist_service import PlaylistService
+from app.worker_pool import WorkerPool
+
+SONGS = 200_000
+PLAYLIST_SIZE = 1_000
+GENRES = 20
+HEAVY_CLIENTS = 8
+DURATION = 10.0
+PROBE_INTERVAL = 0.005
+
+
+def provide(value):
+    """Async dependency override, like the app's own providers"""
+
+    async def dependency():
+        return value
+
+    return dependency
+
+
+def build_catalog() -> PlaylistService:
+    rng = random.Random(5)
+    service = PlaylistService()
+    for start in range(0, SONGS, PLAYLIST_SIZE):
+        service.create_playlist(
+            PlaylistCreate(
+                name=f"Playlist {start}",
+                songs=[
+                    SongCreate(
+                        title=f"Song {number}",
+                        artist=f"Artist {rng.randrange(5_000)}",
+                        genre=f"genre {rng.randrange(GENRES)}",
+                        duration=rng.randint(90, 420),
+                    )
+                    for number in range(start, start + PLAYLIST_SIZE)
+                ],
+            )
+        )
+    return service
+
+
+async def heavy_client(client: httpx.AsyncClient, deadline: float, counts: dict):
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        response = await client.get(
+            f"/api/v1/categories/genre/genre {rng.randrange(GENRES)}"
+        )
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+        if response.status_code == 429:
+            await asyncio.sleep(float(response.headers["retry-after"]))
+
+
+async def probe(client: httpx.AsyncClient, path: str, deadline: float):
+    """Poll path on a fixed schedule, timing each call from when it was due
+
+    Timing from the scheduled send time counts the delay before a stalled
+    event loop gets around to sending, not just the request itself.
+    """
+    latencies = []
+    scheduled = time.perf_counter()
+    while scheduled < deadline:
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        await client.get(path)
+        latencies.append((time.perf_counter() - scheduled) * 1000)
+        scheduled = max(scheduled + PROBE_INTERVAL, time.perf_counter())
+    return latencies
+
+
+async def run(pool: WorkerPool):
+    app.dependency_overrides[get_worker_pool] = provide(pool)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        deadline = time.perf_counter() + DURATION
+        counts: dict = {}
+        results = await asyncio.gather(
+            probe(client, "/health", deadline),
+            probe(client, "/api/v1/playlists/1", deadline),
+            *(heavy_client(client, deadline, counts) for _ in range(HEAVY_CLIENTS)),
+        )
+    for name, latencies in zip(("/health", "GET playlist"), results[:2]):
+        p50, p99, worst = np.percentile(latencies, [50, 99, 100])
+        print(
+            f"  {name:>13}: {len(latencies):5d} probes  p50 {p50:7.2f} ms"
+            f"  p99 {p99:7.2f} ms  max {worst:7.2f} ms"
+        )
+    print(f"  heavy responses by status: {counts}")
+    pool.shutdown()
+
+
+def main():
+    playlist_service = build_catalog()
+    category_service = CategoryService(playlist_service)
+    app.dependency_overrides[get_playlist_service] = provide(playlist_service)
+    app.dependency_overrides[get_category_service] = provide(category_service)
+    for label, pool in (
+        ("inline (WORKER_POOL_SIZE=0)", WorkerPool(0)),
+        ("worker pool, 4 workers, queue 64", WorkerPool(4, 64)),
+        ("worker pool, 2 workers, queue 2", WorkerPool(2, 2)),
+    ):
+        print(label)
+        asyncio.run(run(pool))
+
+
+if __name__ == "__main__":
+    main()
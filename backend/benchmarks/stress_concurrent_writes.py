@@ -0,0 +1,368 @@
+"""
+Stress test for concurrent catalog writes, with read throughput under write load
+
+Writer threads create, update, append to, patch and delete their own
+playlists while reader threads read playlists and categories and check
+what they see:
+  - a playlist's name, description and songs come from the same write
+  - a category's song_count matches the songs it lists, all of which
+    belong to it
+  - no read fails, e.g. with "dictionary changed size during iteration"
+Afterwards the catalog is checked against the writers' own record of their
+playlists: every entry of a track refers to one canonical song, no track
+outlives its last entry, every track points at a playlist that still
+holds it, and the song and category indexes match the playlists exactly.
+Half of the songs written come from a pool of shared tracks, so writers
+keep adding and dropping references to the same ones.
+
+The check runs with a very short thread switch interval, so threads
+interleave far more often than in a server. Read throughput is then
+measured at the default interval, alone and with the writers running.
+
+Run from the backend directory:
+    python -m benchmarks.stress_concurrent_writes
+"""
+
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+from app.schemas.playlist import (
+    PlaylistCreate,
+    PlaylistUpdate,
+    SongCreate,
+    TrackOperation,
+)
+from app.models.playlist import track_fingerprint
+from app.serialization import dump_category, dump_category_list, dump_playlist
+from app.services.category_service import CategoryService
+from app.services.playlist_service import PlaylistService
+
+WRITERS = 4
+READERS = 4
+PLAYLISTS_PER_WRITER = 4
+PLAYLIST_SIZE = 20
+GENRES = 10
+ARTISTS = 50
+STRESS_SECONDS = 5.0
+ROUND_SECONDS = 3.0
+STRESS_SWITCH_INTERVAL = 1e-6
+SHARED_TRACKS = 50
+SHARED_PREFIX = "shared/"
+
+
+def song_data(stamp: str, count: int, rng: random.Random) -> List[SongCreate]:
+    """Shared tracks, and songs whose titles carry the stamp of the write that made them"""
+    songs = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            track = rng.randrange(SHARED_TRACKS)
+            songs.append(
+                SongCreate(
+                    title=f"{SHARED_PREFIX}{track}",
+                    artist=f"Artist {track % ARTISTS}",
+                    genre=f"Genre {track % GENRES}",
+                    duration=90 + track,
+                )
+            )
+        else:
+            songs.append(
+                SongCreate(
+                    title=f"{stamp}/{rng.randrange(10**6)}",
+                    artist=f"Artist {rng.randrange(ARTISTS)}",
+                    genre=f"Genre {rng.randrange(GENRES)}",
+                    duration=rng.randint(90, 420),
+                )
+            )
+    return songs
+
+
+class Writer:
+    """Writes to its own playlists and records what each should now hold
+
+    Every write stamps the playlist's name and description, and the titles
+    of the songs it adds, with the stamp of the playlist's last full update.
+    """
+
+    def __init__(self, number: int, service: PlaylistService):
+        self.number = number
+        self.service = service
+        self.rng = random.Random(number)
+        self.writes = 0
+        self.errors: List[str] = []
+        # Playlist ID -> (stamp, song count)
+        self.playlists: Dict[int, tuple] = {}
+
+    def stamp(self) -> str:
+        self.writes += 1
+        return f"w{self.number}-{self.writes}"
+
+    def create(self):
+        stamp = self.stamp()
+        playlist = self.service.create_playlist(
+            PlaylistCreate(
+                name=stamp,
+                description=stamp,
+                songs=song_data(stamp, PLAYLIST_SIZE, self.rng),
+            )
+        )
+        self.playlists[playlist.id] = (stamp, PLAYLIST_SIZE)
+
+    def update(self, playlist_id: int):
+        stamp = self.stamp()
+        size = self.rng.randint(1, PLAYLIST_SIZE)
+        self.service.update_playlist(
+            playlist_id,
+            PlaylistUpdate(
+                name=stamp, description=stamp, songs=song_data(stamp, size, self.rng)
+            ),
+        )
+        self.playlists[playlist_id] = (stamp, size)
+
+    def append(self, playlist_id: int):
+        stamp, size = self.playlists[playlist_id]
+        self.writes += 1
+        added = self.rng.randint(1, 5)
+        self.service.append_songs(playlist_id, song_data(stamp, added, self.rng))
+        self.playlists[playlist_id] = (stamp, size + added)
+
+    def patch(self, playlist_id: int):
+        stamp, size = self.playlists[playlist_id]
+        self.writes += 1
+        operations = [
+            TrackOperation(
+                op="insert", position=0, song=song_data(stamp, 1, self.rng)[0]
+            )
+        ]
+        if size:
+            operations.append(TrackOperation(op="move", position=size, to_position=0))
+            operations.append(TrackOperation(op="remove", position=1))
+        self.service.patch_playlist_songs(playlist_id, operations)
+        self.playlists[playlist_id] = (stamp, size + 1 - (1 if size else 0))
+
+    def delete(self, playlist_id: int):
+        self.writes += 1
+        self.service.delete_playlist(playlist_id)
+        del self.playlists[playlist_id]
+
+    def run(self, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                # Creates and deletes balance out and appends are capped, so
+                # the catalog stays about the same size however long this runs
+                roll = self.rng.random()
+                if not self.playlists or (
+                    roll < 0.15 and len(self.playlists) < 2 * PLAYLISTS_PER_WRITER
+                ):
+                    self.create()
+                    continue
+                playlist_id = self.rng.choice(list(self.playlists))
+                size = self.playlists[playlist_id][1]
+                if roll < 0.3 and len(self.playlists) > PLAYLISTS_PER_WRITER // 2:
+                    self.delete(playlist_id)
+                elif roll < 0.6 or size >= 2 * PLAYLIST_SIZE:
+                    self.update(playlist_id)
+                elif roll < 0.8:
+                    self.append(playlist_id)
+                else:
+                    self.patch(playlist_id)
+            except Exception as e:
+                self.errors.append(f"writer {self.number}: {e!r}")
+                return
+
+
+class Reader:
+    """Reads playlists and categories as the routes do, checking each result"""
+
+    def __init__(
+        self, number: int, service: PlaylistService, categories: CategoryService
+    ):
+        self.service = service
+        self.categories = categories
+        self.rng = random.Random(1000 + number)
+        self.reads = 0
+        self.errors: List[str] = []
+        self.highest_id = 1
+
+    def check_playlist(self, playlist: dict):
+        name = playlist["name"]
+        if playlist["description"] != name:
+            self.errors.append(f"playlist {playlist['id']}: torn name/description")
+        if playlist["song_count"] != len(playlist["songs"]):
+            self.errors.append(f"playlist {playlist['id']}: song_count mismatch")
+        for song in playlist["songs"]:
+            if not song["title"].startswith((name + "/", SHARED_PREFIX)):
+                self.errors.append(
+                    f"playlist {playlist['id']} named {name} has song {song['title']}"
+                )
+                break
+        self.highest_id = max(self.highest_id, playlist["id"])
+
+    def check_category(self, category: dict):
+        if category["song_count"] != len(category["songs"]):
+            self.errors.append(
+                f"category {category['name']}: song_count {category['song_count']}"
+                f" but {len(category['songs'])} songs"
+            )
+        field = category["type"]
+        for song in category["songs"]:
+            if (song[field] or "").lower() != category["name"]:
+                self.errors.append(
+                    f"{field} {category['name']} lists a song of {song[field]}"
+                )
+                break
+
+    def read(self):
+        roll = self.rng.random()
+        if roll < 0.35:
+            playlist = self.service.get_playlist_by_id(
+                self.rng.randint(1, self.highest_id + 10)
+            )
+            if playlist is not None:
+                self.check_playlist(json.loads(dump_playlist(playlist)))
+        elif roll < 0.5:
+            after_id = self.rng.randint(0, self.highest_id)
+            playlists, _ = self.service.get_playlists_page(10, after_id)
+            for playlist in playlists:
+                self.check_playlist(json.loads(dump_playlist(playlist)))
+        elif roll < 0.7:
+            name = f"genre {self.rng.randrange(GENRES)}"
+            category = self.categories.find_category(name)
+            if category is not None:
+                self.check_category(json.loads(dump_category(*category)))
+        elif roll < 0.85:
+            name = f"artist {self.rng.randrange(ARTISTS)}"
+            category = self.categories.get_category_by_name(name)
+            if category is not None:
+                self.check_category(category.model_dump())
+        else:
+            offset = self.rng.randrange(GENRES + ARTISTS)
+            buckets = self.categories.get_category_buckets(offset, 5)
+            listing = json.loads(dump_category_list(buckets, 0, None))
+            for category in listing["categories"]:
+                self.check_category(category)
+
+    def run(self, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                self.read()
+            except Exception as e:
+                self.errors.append(f"read failed: {e!r}")
+            self.reads += 1
+
+
+def check_catalog(service: PlaylistService, writers: List[Writer]) -> List[str]:
+    """Compare the catalog with the writers' records once they have stopped"""
+    errors = []
+    expected = {}
+    for writer in writers:
+        expected.update(writer.playlists)
+    playlists = service.get_all_playlists()
+    if sorted(p.id for p in playlists) != sorted(expected):
+        errors.append("the catalog's playlists differ from the writers' records")
+    if [p.id for p in service.iter_playlists()] != sorted(expected):
+        errors.append("iter_playlists does not list every playlist in ID order")
+    for playlist in playlists:
+        stamp, size = expected.get(playlist.id, (None, None))
+        if (playlist.name, playlist.song_count) != (stamp, size):
+            errors.append(
+                f"playlist {playlist.id}: {playlist.name} with {playlist.song_count}"
+                f" songs, expected {stamp} with {size}"
+            )
+
+    tracks = {}
+    for playlist in playlists:
+        for song in playlist.songs:
+            if tracks.setdefault(track_fingerprint(song), song) is not song:
+                errors.append(
+                    f"song {song.id} duplicates song {tracks[track_fingerprint(song)].id}"
+                )
+            if service.get_song_by_id(song.id) is not song:
+                errors.append(f"song {song.id} is missing from the song index")
+            else:
+                holder = service.get_playlist_by_id(
+                    service.get_song_playlist_id(song.id) or 0
+                )
+                if holder is None or song not in holder.songs:
+                    errors.append(f"song {song.id} points at a playlist without it")
+    if service.track_count != len(tracks):
+        errors.append(
+            f"{service.track_count} tracks are held, {len(tracks)} are in playlists"
+        )
+
+    catalog = service.snapshot()
+    for index, field in (
+        (catalog.genre_index, "genre"),
+        (catalog.artist_index, "artist"),
+    ):
+        rebuilt: Dict[str, set] = {}
+        for playlist in playlists:
+            for song in playlist.songs:
+                rebuilt.setdefault(getattr(song, field).lower(), set()).add(song.id)
+        indexed = {name: set(songs) for name, songs in index.items()}
+        if indexed != rebuilt:
+            errors.append(f"the {field} index does not match the playlists")
+    return errors
+
+
+def run_round(readers: List[Reader], writers: List[Writer], seconds: float):
+    """Run readers and writers for `seconds`; returns reads and writes per second"""
+    reads = sum(reader.reads for reader in readers)
+    writes = sum(writer.writes for writer in writers)
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=worker.run, args=(stop,))
+        for worker in readers + writers
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return (
+        (sum(reader.reads for reader in readers) - reads) / elapsed,
+        (sum(writer.writes for writer in writers) - writes) / elapsed,
+    )
+
+
+def main():
+    service = PlaylistService()
+    # Drop the sample playlist so every playlist belongs to a writer
+    for playlist in service.get_all_playlists():
+        service.delete_playlist(playlist.id)
+    categories = CategoryService(service)
+    writers = [Writer(number, service) for number in range(WRITERS)]
+    for writer in writers:
+        for _ in range(PLAYLISTS_PER_WRITER):
+            writer.create()
+    readers = [Reader(number, service, categories) for number in range(READERS)]
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(STRESS_SWITCH_INTERVAL)
+    reads, writes = run_round(readers, writers, STRESS_SECONDS)
+    sys.setswitchinterval(switch_interval)
+    errors = [error for worker in readers + writers for error in worker.errors]
+    errors += check_catalog(service, writers)
+    print(
+        f"stress: {WRITERS} writers, {READERS} readers for {STRESS_SECONDS:.0f}s,"
+        f" {reads:.0f} reads/s, {writes:.0f} writes/s"
+    )
+    for error, count in Counter(errors).most_common(10):
+        print(f"  {count:>6} x {error}")
+    print("  invariants hold" if not errors else f"  {len(errors)} violations")
+
+    print(f"read throughput, {READERS} readers, {ROUND_SECONDS:.0f}s rounds")
+    for label, round_writers in (("no writes", []), (f"{WRITERS} writers", writers)):
+        reads, writes = run_round(readers, round_writers, ROUND_SECONDS)
+        print(f"{label:>12} {reads:>9.0f} reads/s {writes:>7.0f} writes/s")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Script to save, load and inspect memory-mapped catalog snapshots
+
+Usage:
+    python catalog_snapshot.py save [catalog_snapshot.bin]
+    python catalog_snapshot.py load [catalog_snapshot.bin]
+    python catalog_snapshot.py info [catalog_snapshot.bin]
+    python catalog_snapshot.py replay [catalog_snapshot.bin]
+
+`save` writes the catalog in DATABASE_URL to a snapshot, `load` replaces
+the database contents with a snapshot and `info` prints a snapshot's header.
+`replay` replaces the database contents with a snapshot plus the changes
+logged in CHANGE_LOG_DIR after it was saved.
+"""
+
+import argparse
+import os
+import sys
+import time
+from app.config import settings
+from app.dependencies import change_log, playlist_repository
+from app.models.catalog_file import FORMAT_VERSION, CatalogFile
+from app.services.catalog_publisher import save_snapshot
+from app.services.change_log import replay_catalog
+from app.services.playlist_service import PlaylistService
+
+
+def save(path: str):
+    start = time.perf_counter()
+    # Without the change log, which the running server may hold
+    service = PlaylistService(playlist_repository())
+    loaded = time.perf_counter()
+    save_snapshot(service, path)
+    print(
+        f"Saved {len(service.get_all_playlists())} playlists to {path} "
+        f"({os.path.getsize(path) / 2**20:.1f} MB) in "
+        f"{time.perf_counter() - loaded:.2f}s after loading for {loaded - start:.2f}s"
+    )
+
+
+def load(path: str):
+    start = time.perf_counter()
+    snapshot = CatalogFile(path)
+    playlists = [snapshot.playlist(row) for row in range(len(snapshot.playlist_ids))]
+    playlist_repository().replace_playlists(playlists)
+    print(
+        f"Loaded {len(playlists)} playlists "
+        f"({sum(len(playlist.songs) for playlist in playlists)} songs) "
+        f"into the database in {time.perf_counter() - start:.2f}s"
+    )
+
+
+def replay(path: str):
+    start = time.perf_counter()
+    log = change_log()
+    if log is None:
+        raise ValueError("The change log is disabled; set CHANGE_LOG_DIR")
+    try:
+        playlists = replay_catalog(path, log)
+        replayed = log.last_seq - CatalogFile(path).metadata["change_seq"]
+    finally:
+        log.close()
+    playlist_repository().replace_playlists(playlists)
+    print(
+        f"Replayed {replayed} changes onto {path} and loaded "
+        f"{len(playlists)} playlists into the database in "
+        f"{time.perf_counter() - start:.2f}s"
+    )
+
+
+def info(path: str):
+    snapshot = CatalogFile(path)
+    print(f"{path}: format version {FORMAT_VERSION}")
+    for key, value in snapshot.metadata.items():
+        print(f"  {key}: {value}")
+    print(f"  playlists: {len(snapshot.playlist_ids)}")
+    print(f"  songs: {len(snapshot.song_ids)}")
+    print(f"  genres: {len(snapshot.genre_categories)}")
+    print(f"  artists: {len(snapshot.artist_categories)}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Save, load or inspect catalog snapshots"
+    )
+    parser.add_argument("command", choices=("save", "load", "info", "replay"))
+    parser.add_argument(
+        "path",
+        nargs="?",
+        default=settings.CATALOG_SNAPSHOT_PATH,
+        help="Snapshot file (default: CATALOG_SNAPSHOT_PATH)",
+    )
+    args = parser.parse_args()
+    if not args.path:
+        print(
+            "No snapshot path given and CATALOG_SNAPSHOT_PATH is empty", file=sys.stderr
+        )
+        return 1
+
+    try:
+        if args.command == "info":
+            info(args.path)
+            return 0
+        try:
+            if args.command == "save":
+                save(args.path)
+            elif args.command == "replay":
+                replay(args.path)
+            else:
+                load(args.path)
+        finally:
+            playlist_repository().close()
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
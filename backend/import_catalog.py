@@ -0,0 +1,86 @@
+"""
+Script to bulk import songs from an NDJSON or CSV file
+
+Usage:
+    python import_catalog.py songs.ndjson
+    python import_catalog.py songs.csv --playlist-id 3 --batch-size 10000
+
+The songs are written to DATABASE_URL (and CHANGE_LOG_DIR) directly, so
+run it with the server stopped: a running server would not see them and
+could hand out the same IDs. With the change log enabled, the import
+refuses to start while a server holds it.
+"""
+
+import argparse
+import sys
+from app.dependencies import change_log, playlist_repository, playlist_service
+from app.services.import_service import IMPORT_FORMATS, ImportService
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bulk import songs into a playlist")
+    parser.add_argument("path", help="NDJSON or CSV file; '-' reads standard input")
+    parser.add_argument(
+        "--format",
+        choices=IMPORT_FORMATS,
+        help="Input format (default: guessed from the file extension)",
+    )
+    parser.add_argument("--playlist-id", type=int, help="Playlist to append to")
+    parser.add_argument(
+        "--name", default="Imported songs", help="Name of the playlist to create"
+    )
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    format = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    try:
+        log = change_log()
+    except OSError as e:
+        # The change log is locked by a running server
+        print(f"{e}; stop the server before importing", file=sys.stderr)
+        return 1
+    source = None
+    try:
+        # newline="" keeps line endings inside quoted CSV fields
+        source = (
+            sys.stdin
+            if args.path == "-"
+            else open(args.path, encoding="utf-8", newline="")
+        )
+        importer = ImportService(
+            playlist_service(),
+            format,
+            playlist_id=args.playlist_id,
+            playlist_name=args.name,
+            batch_size=args.batch_size,
+        )
+        importer.import_lines(enumerate(source, start=1))
+    except LookupError as e:
+        # Covers ImportAborted, a playlist deleted mid-import
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        if source is not None and source is not sys.stdin:
+            source.close()
+        if log is not None:
+            log.close()
+        playlist_repository().close()
+
+    report = importer.report()
+    target = (
+        f"playlist {report.playlist_id}"
+        if report.playlist_id is not None
+        else "no playlist"
+    )
+    print(
+        f"Imported {report.rows_imported} songs into {target} "
+        f"in {report.elapsed_seconds}s ({report.rows_per_second} rows/s), "
+        f"{report.rows_failed} rows failed"
+    )
+    for error in report.errors:
+        print(f"  line {error.line}: {error.error}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Script to merge duplicate songs in the database into canonical tracks
+
+Usage:
+    python merge_songs.py
+
+Songs with the same normalized title, artist, genre and duration are
+merged into the one with the lowest ID, which every playlist entry of the
+track then refers to. Run it once against DATABASE_URL, with the server
+stopped, on databases written before songs were shared between playlists.
+It reports how much memory the loaded catalog takes before and after.
+"""
+
+import sys
+import time
+import tracemalloc
+from typing import Tuple
+from app.dependencies import playlist_repository
+from app.repositories.sqlite_repository import SQLitePlaylistRepository
+
+
+def catalog_memory(repository: SQLitePlaylistRepository) -> Tuple[int, int]:
+    """Bytes the playlists and songs take once loaded, and the number of playlists"""
+    tracemalloc.start()
+    try:
+        playlists = list(repository.load_playlists())
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return size, len(playlists)
+
+
+def main() -> int:
+    repository = playlist_repository()
+    try:
+        before, playlists = catalog_memory(repository)
+        start = time.perf_counter()
+        songs, tracks = repository.merge_duplicate_songs()
+        elapsed = time.perf_counter() - start
+        after, _ = catalog_memory(repository)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        repository.close()
+    print(
+        f"Merged {songs} songs in {playlists} playlists into {tracks} tracks "
+        f"in {elapsed:.2f}s"
+    )
+    print(
+        f"Catalog in memory: {before / 2**20:.1f} MB before, "
+        f"{after / 2**20:.1f} MB after, {max(before - after, 0) / 2**20:.1f} MB saved"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
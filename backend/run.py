@@ -1,13 +1,81 @@
 """
 Script to run the FastAPI server
+
+`python run.py` starts a single auto-reloading development server.
+`python run.py --workers N` starts the multi-worker mode: one writer
+process owns the catalog and publishes it to CATALOG_SHARED_DIR, and N
+reader workers map the published catalog, serve playlist and category
+reads from it, and forward everything else to the writer. If the writer
+saved a catalog snapshot when it last stopped, readers start serving it
+straight away while the writer loads.
 """
 
+import argparse
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
 import uvicorn
+from app.config import settings
+from app.services.shared_catalog import POINTER_NAME, set_current
+
+
+def run_workers(host: str, port: int, workers: int):
+    """Start the writer and serve with readers once there is a catalog to read"""
+    writer_url = urlsplit(settings.CATALOG_WRITER_URL)
+    pointer = os.path.join(settings.CATALOG_SHARED_DIR, POINTER_NAME)
+    snapshot = settings.CATALOG_SNAPSHOT_PATH
+    if snapshot and os.path.exists(snapshot):
+        os.makedirs(settings.CATALOG_SHARED_DIR, exist_ok=True)
+        set_current(settings.CATALOG_SHARED_DIR, os.path.abspath(snapshot))
+    elif os.path.exists(pointer):
+        # Do not let readers attach to a catalog left behind by an earlier run
+        os.unlink(pointer)
+
+    writer = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            writer_url.hostname,
+            "--port",
+            str(writer_url.port),
+        ],
+        env={**os.environ, "CATALOG_ROLE": "writer"},
+    )
+    try:
+        while not os.path.exists(pointer):
+            if writer.poll() is not None:
+                sys.exit("The catalog writer exited during startup")
+            time.sleep(0.1)
+        os.environ["CATALOG_ROLE"] = "reader"
+        uvicorn.run("app.main:app", host=host, port=port, workers=workers)
+    finally:
+        writer.terminate()
+        writer.wait()
+
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,  # Enable auto-reload during development
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Reader worker processes; 0 runs the development server",
     )
+    args = parser.parse_args()
+
+    if args.workers:
+        run_workers(args.host, args.port, args.workers)
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host=args.host,
+            port=args.port,
+            reload=True,  # Enable auto-reload during development
+        )